@@ -0,0 +1,220 @@
+"""Запросы в секунду и p99 горячих GET-эндпоинтов при 1000 одновременных
+соединений: синхронные вьюсеты под WSGI против асинхронных обработчиков
+чтения под ASGI.
+
+Серверов нет: WSGI-приложение выполняется пулом из --wsgi-threads потоков
+(как gthread-воркер), ASGI-приложение — на событийном цикле с
+API_ASYNC_READS_CONCURRENCY одновременными чтениями. Клиенты — корутины,
+задержка считается от отправки запроса, включая ожидание в очереди.
+
+--db-latency-ms добавляет к каждому запросу к БД задержку сети до сервера
+БД (на локальном сокете она близка к нулю).
+
+Запуск: python -m benchmarks.async_reads [--connections 1000] [--requests 10000]
+    [--db-latency-ms 0]
+"""
+
+import argparse
+import asyncio
+import io
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.db.backends import utils
+from django.utils import timezone
+
+from benchmarks.utils import test_database
+from events.models import Event, Tag
+from notifications.models import Notification
+from users.models import User
+
+
+def add_db_latency(ms):
+    execute = utils.CursorWrapper._execute
+
+    def delayed(self, *args, **kwargs):
+        time.sleep(ms / 1000)
+        return execute(self, *args, **kwargs)
+
+    utils.CursorWrapper._execute = delayed
+
+
+def make_requests(count, events, tokens):
+    """Смесь горячих чтений: анонимные список и карточки мероприятий, теги,
+    уведомления и предстоящие мероприятия пользователя."""
+    rng = random.Random(1)
+    requests = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.3:
+            requests.append(("/api/events/", f"page={rng.randint(1, 5)}", None))
+        elif kind < 0.5:
+            requests.append((f"/api/events/{rng.choice(events)}/", "", None))
+        elif kind < 0.6:
+            requests.append(("/api/tags/", "", None))
+        elif kind < 0.85:
+            requests.append(("/api/notifications/", "", rng.choice(tokens)))
+        else:
+            requests.append(("/api/events/my_upcoming_events/", "", rng.choice(tokens)))
+    return requests
+
+
+def wsgi_call(handler, path, query, token):
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.url_scheme": "http",
+    }
+    if token:
+        environ["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    status = []
+    body = b"".join(handler(environ, lambda s, headers: status.append(s)))
+    assert status[0].startswith("200"), (status, path, body[:200])
+
+
+async def asgi_call(application, path, query, token):
+    headers = [(b"host", b"localhost")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": headers,
+        "server": ("localhost", 80),
+    }
+    sent = False
+    disconnected = asyncio.Event()
+    messages = []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b""}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    disconnected.set()
+    assert messages[0]["status"] == 200, (messages[0], path, messages[1:2])
+
+
+async def drive(requests, connections, call):
+    """connections клиентов по очереди отправляют запросы из общего списка."""
+    latencies = []
+    pending = iter(requests)
+
+    async def client():
+        for request in pending:
+            began = time.perf_counter()
+            await call(*request)
+            latencies.append(time.perf_counter() - began)
+
+    began = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    elapsed = time.perf_counter() - began
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p99": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def run_wsgi(requests, connections, threads):
+    handler = WSGIHandler()
+    executor = ThreadPoolExecutor(max_workers=threads)
+
+    async def call(*request):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, wsgi_call, handler, *request)
+
+    try:
+        asyncio.run(drive(requests[:connections], connections, call))
+        return asyncio.run(drive(requests, connections, call))
+    finally:
+        executor.shutdown()
+
+
+def run_asgi(requests, connections):
+    from config.asgi import application
+
+    async def call(*request):
+        await asgi_call(application, *request)
+
+    async def both():
+        await drive(requests[:connections], connections, call)
+        return await drive(requests, connections, call)
+
+    return asyncio.run(both())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--wsgi-threads", type=int, default=50)
+    parser.add_argument("--db-latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    with test_database():
+        users = User.objects.bulk_create(
+            User(username=f"bench{i}", email=f"bench{i}@example.com")
+            for i in range(100)
+        )
+        tags = Tag.objects.bulk_create(Tag(name=f"тег{i}") for i in range(20))
+        events = []
+        for i in range(50):
+            event = Event.objects.create(
+                title=f"Мероприятие {i}",
+                description="Описание",
+                start_time=timezone.now() + timezone.timedelta(days=i + 1),
+                location="Москва",
+                seats=100,
+                organizer=users[i % len(users)],
+            )
+            event.tags.set(tags[i % 20 : i % 20 + 3])
+            event.bookings.create(user=users[i % len(users)])
+            events.append(event.id)
+        Notification.objects.bulk_create(
+            Notification(user=user, type="booking", message=f"Уведомление {i}")
+            for user in users
+            for i in range(20)
+        )
+        tokens = [str(AccessToken.for_user(user)) for user in users]
+        requests = make_requests(args.requests, events, tokens)
+        if args.db_latency_ms:
+            add_db_latency(args.db_latency_ms)
+
+        sync = run_wsgi(requests, args.connections, args.wsgi_threads)
+        print(
+            f"WSGI, синхронные вьюсеты, {args.wsgi_threads} потоков: "
+            f"{sync['rps']:.0f} запросов/с, p50 {sync['p50']:.0f} мс, "
+            f"p99 {sync['p99']:.0f} мс"
+        )
+        concurrent = run_asgi(requests, args.connections)
+        print(
+            f"ASGI, асинхронные обработчики: {concurrent['rps']:.0f} запросов/с, "
+            f"p50 {concurrent['p50']:.0f} мс, p99 {concurrent['p99']:.0f} мс"
+        )
+
+
+if __name__ == "__main__":
+    main()
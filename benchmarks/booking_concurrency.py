@@ -0,0 +1,97 @@
+"""Параллельное бронирование одного мероприятия в режимах lock и conditional.
+
+Запуск: python -m benchmarks.booking_concurrency [--requests 500] [--seats 100]
+"""
+
+import argparse
+import sys
+import time
+
+from django.utils import timezone
+
+from benchmarks.utils import run_in_threads, test_database
+from events.exceptions import BookingError
+from events.models import Booking, Event
+from events.services import book_conditionally, book_with_lock
+from notifications.tasks import relay_outbox
+from users.models import User
+
+MODES = {"lock": book_with_lock, "conditional": book_conditionally}
+
+
+def run(mode, users, seats, workers):
+    organizer = users[0]
+    event = Event.objects.create(
+        title=f"Бенчмарк {mode}",
+        description="",
+        start_time=timezone.now() + timezone.timedelta(days=1),
+        location="Москва",
+        seats=seats,
+        organizer=organizer,
+    )
+    book = MODES[mode]
+
+    def attempt(user):
+        try:
+            book(user, event.id)
+            return True
+        except BookingError:
+            return False
+
+    results, elapsed = run_in_threads(attempt, users, workers)
+    event.refresh_from_db()
+    booked = Booking.objects.filter(event=event).count()
+    return {
+        "mode": mode,
+        "requests": len(results),
+        "booked": booked,
+        "counter": event.booked_seats,
+        "overbooked": booked > seats or event.booked_seats != booked,
+        "rps": len(results) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--seats", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument(
+        "--broker-latency-ms",
+        type=float,
+        default=0,
+        help="задержка постановки задачи в очередь (RTT до брокера)",
+    )
+    args = parser.parse_args()
+
+    if args.broker_latency_ms:
+        delay = relay_outbox.delay
+
+        def delay_with_latency(*task_args):
+            time.sleep(args.broker_latency_ms / 1000)
+            return delay(*task_args)
+
+        relay_outbox.delay = delay_with_latency
+
+    with test_database():
+        users = User.objects.bulk_create(
+            User(username=f"bench{i}") for i in range(args.requests)
+        )
+        reports = [run(mode, users, args.seats, args.workers) for mode in MODES]
+
+    for report in reports:
+        print(
+            f"{report['mode']:>12}: {report['requests']} запросов, "
+            f"забронировано {report['booked']}/{args.seats} "
+            f"(счётчик {report['counter']}), {report['rps']:.0f} броней/с"
+        )
+    lock, conditional = reports
+    print(f"ускорение conditional: x{conditional['rps'] / lock['rps']:.2f}")
+
+    if any(report["overbooked"] for report in reports):
+        print("ОШИБКА: обнаружен овербукинг")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
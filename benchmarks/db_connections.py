@@ -0,0 +1,108 @@
+"""Запросы в секунду и число подключений к Postgres при трёх режимах
+POSTGRES_CONNECTIONS: новое соединение на запрос, постоянные соединения и
+пул psycopg 3.
+
+Запросы GET /api/events/my_upcoming_events/ с JWT выполняются через
+WSGI-обработчик в --threads потоках, как в gthread-воркере: Django
+закрывает или возвращает в пул соединение в конце каждого запроса.
+
+Запуск: python -m benchmarks.db_connections [--requests 2000] [--threads 10]
+"""
+
+import argparse
+import io
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.utils import timezone
+
+from benchmarks.utils import run_in_threads, test_database
+from events.models import Event
+from users.models import User
+
+MODES = ("none", "persistent", "pool")
+
+
+def sessions():
+    """Число подключений к БД с начала работы сервера (pg_stat_database)."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_stat_clear_snapshot()")
+        cursor.execute(
+            "SELECT sessions FROM pg_stat_database WHERE datname = current_database()"
+        )
+        return cursor.fetchone()[0]
+
+
+def configure(mode, threads):
+    database = settings.DATABASES["default"]
+    database["CONN_MAX_AGE"] = 60 if mode == "persistent" else 0
+    database["OPTIONS"] = (
+        {"pool": {"min_size": threads, "max_size": threads}} if mode == "pool" else {}
+    )
+
+
+def run(mode, handler, token, requests, threads):
+    def request(_):
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": "/api/events/my_upcoming_events/",
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "HTTP_AUTHORIZATION": f"Bearer {token}",
+            "wsgi.input": io.BytesIO(),
+            "wsgi.url_scheme": "http",
+        }
+        status = []
+        b"".join(handler(environ, lambda s, headers: status.append(s)))
+        assert status[0].startswith("200"), status
+
+    connection.close()
+    configure(mode, threads)
+    before = sessions()
+    connection.close()
+    try:
+        _, elapsed = run_in_threads(request, range(requests), threads)
+    finally:
+        if mode == "pool":
+            connection.close_pool()
+        configure("none", threads)
+    # Завершившиеся процессы сервера сбрасывают счётчики с задержкой;
+    # соединение самого замера тоже считается.
+    time.sleep(1)
+    return requests / elapsed, sessions() - before - 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=10)
+    args = parser.parse_args()
+
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    with test_database():
+        user = User.objects.create_user(username="bench", password="bench")
+        for i in range(10):
+            event = Event.objects.create(
+                title=f"Мероприятие {i}",
+                description="Описание",
+                start_time=timezone.now() + timezone.timedelta(days=i + 1),
+                location="Москва",
+                organizer=user,
+            )
+            event.bookings.create(user=user)
+        token = str(AccessToken.for_user(user))
+        handler = WSGIHandler()
+
+        for mode in MODES:
+            rps, opened = run(mode, handler, token, args.requests, args.threads)
+            print(
+                f"{mode}: {rps:.0f} запросов/с, "
+                f"открыто соединений с БД {opened} на {args.requests} запросов"
+            )
+
+
+if __name__ == "__main__":
+    main()
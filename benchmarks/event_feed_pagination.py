@@ -0,0 +1,94 @@
+"""Задержка первой и глубокой страницы ленты мероприятий при постраничной
+(page number) и keyset (cursor) пагинации.
+
+Запуск: python -m benchmarks.event_feed_pagination [--events 100000] [--page 10000]
+"""
+
+import argparse
+import statistics
+import time
+from base64 import b64encode
+from urllib.parse import urlencode
+
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+
+from benchmarks.utils import test_database
+from events.models import Event, feed_key
+from events.pagination import EventFeedCursorPagination
+from users.models import User
+
+
+def create_events(count, organizer):
+    now = timezone.now()
+    batch = []
+    for i in range(count):
+        start_time = now + timezone.timedelta(minutes=i - count // 2)
+        status = "upcoming" if start_time > now else "finished"
+        batch.append(
+            Event(
+                title=f"Мероприятие {i}",
+                description="Описание",
+                start_time=start_time,
+                location="Москва",
+                seats=100,
+                status=status,
+                organizer=organizer,
+                feed_key=feed_key(status, start_time, 0.0),
+            )
+        )
+    Event.objects.bulk_create(batch, batch_size=5000)
+
+
+def cursor_for_page(page, page_size):
+    if page == 1:
+        return None
+    feed_key_value = Event.objects.order_by("feed_key", "id").values_list(
+        "feed_key", flat=True
+    )[(page - 1) * page_size - 1]
+    query = urlencode({"p": str(feed_key_value)})
+    return b64encode(query.encode("ascii")).decode("ascii")
+
+
+def measure(client, params, repeat):
+    timings = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        response = client.get("/api/events/", params)
+        timings.append(time.perf_counter() - began)
+        assert response.status_code == 200, response.data
+        assert response.data["results"]
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--page", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from rest_framework.test import APIClient
+
+    setup_test_environment()
+    page_size = EventFeedCursorPagination.page_size
+    deep_page = min(args.page, args.events // page_size)
+    with test_database():
+        organizer = User.objects.create(username="bench")
+        create_events(args.events, organizer)
+        client = APIClient()
+        for page in (1, deep_page):
+            offset_ms = measure(client, {"page": page}, args.repeat)
+            params = {"pagination": "cursor"}
+            cursor = cursor_for_page(page, page_size)
+            if cursor:
+                params["cursor"] = cursor
+            cursor_ms = measure(client, params, args.repeat)
+            print(
+                f"страница {page:>6}: page number {offset_ms:7.1f} мс, "
+                f"cursor {cursor_ms:7.1f} мс"
+            )
+
+
+if __name__ == "__main__":
+    main()
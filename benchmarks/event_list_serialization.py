@@ -0,0 +1,86 @@
+"""Время сборки страницы списка мероприятий: EventListSerializer по
+объектам с prefetch_related против строк values() (events.projection) на
+страницах 10, 100 и 1000 мероприятий. Замер включает запросы к БД и
+рендеринг JSON; перед замером проверяется, что ответы совпадают байт в байт.
+
+Запуск: python -m benchmarks.event_list_serialization [--repeat 20]
+"""
+
+import argparse
+import statistics
+import time
+
+from django.utils import timezone
+
+from benchmarks.utils import test_database
+from events.models import Event, Tag
+from users.models import User
+
+PAGE_SIZES = (10, 100, 1000)
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - began)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from rest_framework.renderers import JSONRenderer
+
+    from events.projection import rows, serialize
+    from events.serializers import EventListSerializer
+    from events.views import EventViewSet
+
+    with test_database():
+        users = User.objects.bulk_create(
+            User(username=f"bench{i}", email=f"bench{i}@example.com") for i in range(50)
+        )
+        tags = Tag.objects.bulk_create(Tag(name=f"тег{i}") for i in range(30))
+        now = timezone.now()
+        events = Event.objects.bulk_create(
+            Event(
+                title=f"Мероприятие {i}",
+                description="Описание",
+                start_time=now + timezone.timedelta(hours=i + 1),
+                location="Москва",
+                organizer=users[i % len(users)],
+                avg_rating=(i % 50) / 10,
+            )
+            for i in range(max(PAGE_SIZES))
+        )
+        Event.tags.through.objects.bulk_create(
+            Event.tags.through(event_id=event.id, tag_id=tags[(i + j) % 30].id)
+            for i, event in enumerate(events)
+            for j in range(3)
+        )
+        queryset = EventViewSet.queryset.order_by("feed_key", "id")
+        renderer = JSONRenderer()
+
+        for size in PAGE_SIZES:
+
+            def drf(size=size):
+                page = list(queryset[:size])
+                return renderer.render(EventListSerializer(page, many=True).data)
+
+            def projected(size=size):
+                return renderer.render(serialize(rows(queryset)[:size]))
+
+            assert drf() == projected()
+            slow = measure(drf, args.repeat)
+            fast = measure(projected, args.repeat)
+            print(
+                f"{size} мероприятий: сериализатор {slow:.1f} мс, "
+                f"values() {fast:.1f} мс, быстрее в {slow / fast:.1f} раза"
+            )
+
+
+if __name__ == "__main__":
+    main()
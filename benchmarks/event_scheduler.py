@@ -0,0 +1,104 @@
+"""Опрос таблицы Event периодическими задачами против диспетчера таблицы
+сроков ScheduledJob при большом числе будущих мероприятий.
+
+Запуск: python -m benchmarks.event_scheduler [--events 1000000] [--due 1000]
+"""
+
+import argparse
+import statistics
+import time
+from unittest import mock
+
+from django.db import connection
+from django.utils import timezone
+
+from benchmarks.utils import test_database
+from events import scheduler
+from events.models import Event, ScheduledJob, feed_key
+from events.tasks import dispatch_scheduled_jobs, run_scheduled_job, update_event_status
+from notifications.tasks import send_event_reminders, send_reminder_notifications
+from users.models import User
+
+
+def create_events(count, due, organizer, batch_size=10_000):
+    now = timezone.now()
+    for offset in range(0, count, batch_size):
+        batch = []
+        for i in range(offset, min(offset + batch_size, count)):
+            # Первые due мероприятий начинаются через час: их напоминания
+            # уже наступили, остальные разнесены на годы вперёд.
+            if i < due:
+                start_time = now + timezone.timedelta(hours=1)
+            else:
+                start_time = now + timezone.timedelta(days=1, minutes=i)
+            batch.append(
+                Event(
+                    title=f"Мероприятие {i}",
+                    description="",
+                    start_time=start_time,
+                    location="Москва",
+                    organizer=organizer,
+                    feed_key=feed_key("upcoming", start_time, 0.0),
+                )
+            )
+        events = Event.objects.bulk_create(batch)
+        ScheduledJob.objects.bulk_create(
+            ScheduledJob(event_id=event.id, kind=kind, due_at=due_at)
+            for event in events
+            for kind, due_at in scheduler.due_times(event.start_time).items()
+        )
+        print(f"создано {offset + len(batch)} мероприятий", end="\r", flush=True)
+    print()
+    with connection.cursor() as cursor:
+        cursor.execute("VACUUM ANALYZE events_event")
+        cursor.execute("VACUUM ANALYZE events_scheduledjob")
+
+
+def polling():
+    update_event_status()
+    send_reminder_notifications()
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - began)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--due", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    queued = []
+    with (
+        test_database(),
+        mock.patch.object(send_event_reminders, "delay", queued.append),
+        mock.patch.object(
+            run_scheduled_job, "apply_async", lambda args, eta: queued.append(args)
+        ),
+    ):
+        organizer = User.objects.create(username="bench")
+        create_events(args.events, args.due, organizer)
+
+        old_ms = measure(polling, args.repeat)
+        queued.clear()
+        began = time.perf_counter()
+        dispatch_scheduled_jobs()
+        first_ms = (time.perf_counter() - began) * 1000
+        dispatched = len(queued)
+        idle_ms = measure(dispatch_scheduled_jobs, args.repeat)
+        print(
+            f"опрос Event: {old_ms:8.1f} мс за запуск; "
+            f"диспетчер: {first_ms:8.1f} мс на {dispatched} сроков, "
+            f"{idle_ms:6.1f} мс без наступивших сроков"
+        )
+
+
+if __name__ == "__main__":
+    main()
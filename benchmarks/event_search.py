@@ -0,0 +1,110 @@
+"""Поиск мероприятий: SearchFilter (ILIKE по полям и тегам) против
+полнотекстового поиска по Event.search_vector.
+
+Запуск: python -m benchmarks.event_search [--events 1000000] [--repeat 5]
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from django.db import connection
+from django.utils import timezone
+
+from benchmarks.utils import test_database
+from events.models import Event, Tag, feed_key
+from events.search import EventSearchFilter, search_vector_expression
+from users.models import User
+
+WORDS = (
+    "концерт лекция выставка спектакль фестиваль мастер-класс встреча турнир "
+    "музыка театр кино живопись история наука город парк музей клуб вечер "
+    "джаз рок классика поэзия танцы кулинария шахматы фотография"
+).split()
+SEARCHES = ("шахматы", "джаз концерты", "экскурсия по набережной")
+
+
+def create_events(count, organizer, batch_size=10_000):
+    rng = random.Random(0)
+    tags = Tag.objects.bulk_create(Tag(name=name) for name in WORDS[-8:])
+    now = timezone.now()
+    through = Event.tags.through
+    for offset in range(0, count, batch_size):
+        batch = []
+        for i in range(offset, min(offset + batch_size, count)):
+            start_time = now + timezone.timedelta(minutes=i)
+            title = " ".join(rng.sample(WORDS, 3)).capitalize()
+            if i % 10_000 == 0:
+                title += " экскурсия по набережной"
+            batch.append(
+                Event(
+                    title=title,
+                    description=" ".join(rng.choices(WORDS, k=30)),
+                    start_time=start_time,
+                    location="Москва",
+                    organizer=organizer,
+                    feed_key=feed_key("upcoming", start_time, 0.0),
+                )
+            )
+        events = Event.objects.bulk_create(batch)
+        through.objects.bulk_create(
+            through(event_id=event.id, tag_id=rng.choice(tags).id)
+            for event in events
+            if rng.random() < 0.3
+        )
+        Event.objects.filter(id__gte=events[0].id, id__lte=events[-1].id).update(
+            search_vector=search_vector_expression()
+        )
+        print(f"создано {offset + len(batch)} мероприятий", end="\r", flush=True)
+    print()
+    with connection.cursor() as cursor:
+        cursor.execute("VACUUM ANALYZE events_event")
+        cursor.execute("ANALYZE events_event_tags")
+
+
+class OldSearchView:
+    search_fields = ["title", "description", "tags__name"]
+
+
+def first_page(backend, view, terms):
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    request = Request(APIRequestFactory().get("/api/events/", {"search": terms}))
+    queryset = Event.objects.order_by("feed_key", "id")
+    queryset = backend().filter_queryset(request, queryset, view)
+    return queryset.count(), list(queryset[:10])
+
+
+def measure(backend, view, terms, repeat):
+    timings = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        count, _ = first_page(backend, view, terms)
+        timings.append(time.perf_counter() - began)
+    return count, statistics.median(timings) * 1000
+
+
+def main():
+    from rest_framework.filters import SearchFilter
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with test_database():
+        organizer = User.objects.create(username="bench")
+        create_events(args.events, organizer)
+        for terms in SEARCHES:
+            old_count, old_ms = measure(SearchFilter, OldSearchView, terms, args.repeat)
+            new_count, new_ms = measure(EventSearchFilter, None, terms, args.repeat)
+            print(
+                f"{terms!r:>28}: SearchFilter {old_ms:8.1f} мс ({old_count}), "
+                f"search_vector {new_ms:8.1f} мс ({new_count})"
+            )
+
+
+if __name__ == "__main__":
+    main()
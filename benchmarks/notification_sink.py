@@ -0,0 +1,72 @@
+"""Запись уведомлений задачей send_notification: по строке на задачу
+("direct") против буфера процесса с пачечной записью ("sink").
+
+Тело задачи вызывается напрямую, без брокера, поэтому результат — верхняя
+граница пропускной способности одного воркера на стороне БД.
+
+Запуск: python -m benchmarks.notification_sink [--notifications 50000]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from django.test import override_settings
+from django.utils import timezone
+
+from benchmarks.utils import test_database
+from events.models import Event
+from notifications import sink
+from notifications.models import Notification
+from notifications.tasks import send_notification
+from users.models import User
+
+
+def measure(mode, count, user_ids, event_id, batch_size):
+    Notification.objects.all().delete()
+    with (
+        override_settings(
+            NOTIFICATIONS_WRITE_MODE=mode, NOTIFICATIONS_SINK_BATCH_SIZE=batch_size
+        ),
+        contextlib.redirect_stdout(io.StringIO()),
+    ):
+        began = time.perf_counter()
+        for i in range(count):
+            send_notification.run(
+                user_ids[i % len(user_ids)], event_id, "booking", f"Бронь №{i}"
+            )
+        sink.flush()
+        elapsed = time.perf_counter() - began
+    assert Notification.objects.count() == count
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--notifications", type=int, default=50_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    with test_database():
+        users = User.objects.bulk_create(
+            User(username=f"bench{i}", email=f"bench{i}@example.com")
+            for i in range(1000)
+        )
+        event = Event.objects.create(
+            title="Бенчмарк уведомлений",
+            description="",
+            start_time=timezone.now() + timezone.timedelta(days=1),
+            location="Москва",
+            organizer=users[0],
+        )
+        user_ids = [user.id for user in users]
+        for mode in ("direct", "sink"):
+            rate = measure(
+                mode, args.notifications, user_ids, event.id, args.batch_size
+            )
+            print(f"{mode:>6}: {rate:10.0f} уведомлений/с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Память на открытое соединение потока /api/notifications/stream/ и время
+доставки уведомления всем подключённым клиентам.
+
+ASGI-приложение вызывается в процессе без сервера, поэтому в замер не входят
+буферы сокетов сервера. Пользователь у каждого соединения свой.
+
+Запуск: python -m benchmarks.notification_stream [--connections 1000]
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+import tracemalloc
+
+from asgiref.testing import ApplicationCommunicator
+
+from benchmarks.utils import test_database
+from config.asgi import application
+from notifications.live import hub
+from users.models import User
+
+
+def rss():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * 4096
+
+
+async def connect(token):
+    communicator = ApplicationCommunicator(
+        application,
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/notifications/stream/",
+            "query_string": f"access_token={token}".encode(),
+            "headers": [],
+        },
+    )
+    await communicator.send_input({"type": "http.request", "body": b""})
+    start = await communicator.receive_output(30)
+    assert start["status"] == 200, start
+    return communicator
+
+
+async def run(users):
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    tokens = [str(AccessToken.for_user(user)) for user in users]
+    # Разогрев: первый запрос загружает модули и URL-конфигурацию.
+    warmup = await connect(tokens[0])
+    await warmup.send_input({"type": "http.disconnect"})
+    await warmup.wait(5)
+
+    threads, memory = threading.active_count(), rss()
+    tracemalloc.start()
+    began = time.perf_counter()
+    communicators = [await connect(token) for token in tokens]
+    connect_s = time.perf_counter() - began
+    heap, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    memory = rss() - memory
+    threads = threading.active_count() - threads
+
+    began = time.perf_counter()
+    for user in users:
+        hub.dispatch(user.id, {"id": 1, "message": "Новое уведомление"})
+    for communicator in communicators:
+        await communicator.receive_output(30)
+    deliver_s = time.perf_counter() - began
+
+    for communicator in communicators:
+        await communicator.send_input({"type": "http.disconnect"})
+    for communicator in communicators:
+        await communicator.wait(30)
+
+    count = len(users)
+    print(
+        f"{count} соединений: открытие {connect_s * 1000 / count:.2f} мс на "
+        f"соединение, Python-куча {heap / count / 1024:.1f} КиБ, RSS "
+        f"{memory / count / 1024:.1f} КиБ и {threads / count:.1f} потока на "
+        f"соединение; доставка всем {deliver_s * 1000:.1f} мс; "
+        f"после отключения открыто {hub.connections()}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=1000)
+    args = parser.parse_args()
+
+    with test_database():
+        users = User.objects.bulk_create(
+            User(username=f"bench{i}", email=f"bench{i}@example.com")
+            for i in range(args.connections)
+        )
+        asyncio.run(run(users))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Напоминания о мероприятии: задача send_notification на каждую бронь
+против одной задачи send_event_reminders на мероприятие.
+
+Сообщения брокеру подсчитываются по вызовам .delay, каждая задача выполняется
+сразу в том же процессе, запросы к БД считаются вместе с задачами.
+
+Запуск: python -m benchmarks.reminder_fanout [--attendees 1000 10000]
+"""
+
+import argparse
+import time
+from unittest import mock
+
+from django.db import connection
+from django.utils import timezone
+
+from benchmarks.utils import test_database
+from events.models import Booking, Event, feed_key
+from notifications import tasks
+from notifications.models import Notification
+from users.models import User
+
+
+def create_event(attendees, organizer):
+    start_time = timezone.now() + timezone.timedelta(minutes=30)
+    event = Event.objects.create(
+        title="Бенчмарк напоминаний",
+        description="",
+        start_time=start_time,
+        location="Москва",
+        seats=attendees * 2,
+        organizer=organizer,
+        feed_key=feed_key("upcoming", start_time, 0.0),
+    )
+    users = User.objects.bulk_create(
+        User(username=f"bench-{event.id}-{i}", email=f"{event.id}-{i}@bench")
+        for i in range(attendees)
+    )
+    Booking.objects.bulk_create(
+        Booking(user=user, event=event, quantity=1 + i % 2)
+        for i, user in enumerate(users)
+    )
+    return event
+
+
+def legacy_reminders(event_id):
+    # Прежняя реализация: брони с пользователями и задача на каждую из них.
+    event = Event.objects.prefetch_related("bookings__user").get(id=event_id)
+    for booking in event.bookings.all():
+        message = (
+            f"Напоминание: мероприятие {event.title} начнется через час."
+            f"Время начала мероприятия: {timezone.localtime(event.start_time).strftime('%H:%M')}."
+        )
+        if booking.quantity > 1:
+            message += f" Забронировано мест: {booking.quantity}."
+        tasks.send_notification.delay(booking.user.id, event.id, "reminder", message)
+
+
+def bulk_reminders(event_id):
+    tasks.send_event_reminders.delay(event_id)
+
+
+def measure(fanout, event_id):
+    messages = 0
+    queries = 0
+
+    def count_queries(execute, *args):
+        nonlocal queries
+        queries += 1
+        return execute(*args)
+
+    def eager(task):
+        def delay(*args, **kwargs):
+            nonlocal messages
+            messages += 1
+            return task.run(*args, **kwargs)
+
+        return delay
+
+    Notification.objects.filter(event_id=event_id).delete()
+    with (
+        mock.patch.object(
+            tasks.send_notification, "delay", eager(tasks.send_notification)
+        ),
+        mock.patch.object(
+            tasks.send_event_reminders, "delay", eager(tasks.send_event_reminders)
+        ),
+        mock.patch("builtins.print"),
+        connection.execute_wrapper(count_queries),
+    ):
+        began = time.perf_counter()
+        fanout(event_id)
+        elapsed = time.perf_counter() - began
+    created = Notification.objects.filter(event_id=event_id).count()
+    return messages, queries, elapsed * 1000, created
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--attendees", type=int, nargs="+", default=[1000, 10_000])
+    args = parser.parse_args()
+
+    with test_database():
+        organizer = User.objects.create(username="bench")
+        for attendees in args.attendees:
+            event = create_event(attendees, organizer)
+            for name, fanout in (
+                ("по задаче на бронь", legacy_reminders),
+                ("пачками", bulk_reminders),
+            ):
+                messages, queries, ms, created = measure(fanout, event.id)
+                per_thousand = 1000 / attendees
+                print(
+                    f"{attendees:>6} участников, {name:>18}: "
+                    f"{messages * per_thousand:7.1f} сообщений и "
+                    f"{queries * per_thousand:7.1f} запросов на 1000 участников, "
+                    f"{ms:9.1f} мс, создано {created}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.db import connection  # noqa: E402
+
+
+@contextmanager
+def test_database():
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def run_in_threads(func, items, workers):
+    """Выполняет func для каждого элемента в пуле потоков с постоянными
+    соединениями к БД и возвращает (результаты, затраченное время)."""
+    tasks = queue.Queue()
+    for item in items:
+        tasks.put(item)
+    results = []
+    lock = threading.Lock()
+    start = threading.Barrier(workers + 1)
+
+    def worker():
+        start.wait()
+        try:
+            while True:
+                try:
+                    item = tasks.get_nowait()
+                except queue.Empty:
+                    return
+                result = func(item)
+                with lock:
+                    results.append(result)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - began
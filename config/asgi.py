@@ -13,4 +13,39 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Импорт после настройки Django
+from django.conf import settings  # noqa: E402
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler  # noqa: E402
+from django.core.handlers.asgi import ASGIRequest  # noqa: E402
+
+from events import live as seats_stream  # noqa: E402
+from notifications import stream as notifications_stream  # noqa: E402
+
+
+class AsyncReadsRequest(ASGIRequest):
+    # Маршруты с асинхронными обработчиками чтения
+    urlconf = "config.asgi_urls"
+
+
+if settings.API_ASYNC_READS:
+    django_application.request_class = AsyncReadsRequest
+
+if settings.DEBUG:
+    # Как runserver, в отладке отдаёт статику админки и Swagger.
+    django_application = ASGIStaticFilesHandler(django_application)
+
+# Потоки обслуживаются без стека Django, чтобы открытое соединение не
+# занимало поток.
+STREAMS = [seats_stream]
+if settings.NOTIFICATIONS_STREAM:
+    STREAMS.insert(0, notifications_stream)
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http":
+        for stream in STREAMS:
+            if stream.PATH.match(scope["path"]):
+                return await stream.application(scope, receive, send)
+    return await django_application(scope, receive, send)
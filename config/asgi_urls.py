@@ -0,0 +1,15 @@
+"""URL-конфигурация запросов под ASGI: перед обычными маршрутами стоят
+асинхронные обработчики чтения. Под WSGI используется config.urls."""
+
+from django.urls import include, path
+
+from events.urls import async_urlpatterns as event_reads
+from notifications.urls import async_urlpatterns as notification_reads
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path("api/", include(event_reads)),
+    path("api/notifications/", include(notification_reads)),
+    *sync_urlpatterns,
+]
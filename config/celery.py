@@ -1,9 +1,25 @@
 import os
 
 from celery import Celery
+from celery.signals import task_postrun, worker_init
+
+# Модуль загружается каждым процессом проекта, поэтому здесь же
+# подключается отчёт о пуле соединений после запросов.
+from . import db_pool
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 app = Celery("config")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+
+@worker_init.connect
+def use_worker_pool_sizes(**kwargs):
+    # До fork процессов пула Celery, пока соединения с БД не открыты.
+    db_pool.use_worker_sizes()
+
+
+@task_postrun.connect
+def report_pool_stats(**kwargs):
+    db_pool.report()
@@ -0,0 +1,115 @@
+"""Пул соединений с БД (POSTGRES_CONNECTIONS=pool) и его статистика.
+
+Пул psycopg 3 свой у каждого процесса: веб-процессы используют размеры
+POSTGRES_POOL_*, процессы Celery — POSTGRES_WORKER_POOL_*. Раз в
+REPORT_INTERVAL секунд процесс записывает статистику своих пулов в Redis,
+команда db_pool_stats показывает её по всем процессам."""
+
+import json
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connections
+from django.dispatch import receiver
+
+from .redis import get_redis
+
+STATS_KEY = "db:pool:stats"
+REPORT_INTERVAL = 10
+# Запись процесса, который давно не отчитывался, считается устаревшей.
+STALE_AFTER = 60
+
+_role = "web"
+_reported_at = float("-inf")
+
+
+def use_worker_sizes():
+    """Переключает пулы процесса на размеры для Celery. Вызывается до первого
+    обращения к БД, пока пулы ещё не созданы."""
+    global _role
+    _role = "celery"
+    for database in settings.DATABASES.values():
+        pool = database.get("OPTIONS", {}).get("pool")
+        if pool:
+            pool["min_size"] = settings.POSTGRES_WORKER_POOL_MIN_SIZE
+            pool["max_size"] = settings.POSTGRES_WORKER_POOL_MAX_SIZE
+
+
+def pool_stats(pool):
+    """Состояние пула psycopg_pool: соединений занято и свободно, сколько
+    запросов ждут соединения сейчас, сколько ждали (не нашли свободного),
+    суммарное и среднее ожидание, отказы по таймауту."""
+    raw = pool.get_stats()
+    size = raw.get("pool_size", 0)
+    requests = raw.get("requests_num", 0)
+    wait_ms = raw.get("requests_wait_ms", 0)
+    return {
+        "min_size": raw.get("pool_min", 0),
+        "max_size": raw.get("pool_max", 0),
+        "size": size,
+        "in_use": size - raw.get("pool_available", 0),
+        "waiting": raw.get("requests_waiting", 0),
+        "requests": requests,
+        "queued": raw.get("requests_queued", 0),
+        "wait_ms": wait_ms,
+        "avg_wait_ms": wait_ms / requests if requests else 0.0,
+        "timeouts": raw.get("requests_errors", 0),
+        "connections_lost": raw.get("connections_lost", 0),
+    }
+
+
+def get_stats():
+    """Статистика пулов текущего процесса по алиасам БД."""
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], "pool", None)
+        if pool is not None:
+            stats[alias] = pool_stats(pool)
+    return stats
+
+
+def report(force=False):
+    """Записывает статистику пулов процесса в Redis не чаще раза в
+    REPORT_INTERVAL секунд."""
+    global _reported_at
+    if settings.POSTGRES_CONNECTIONS != "pool":
+        return
+    now = time.monotonic()
+    if not force and now - _reported_at < REPORT_INTERVAL:
+        return
+    _reported_at = now
+
+    client = get_redis()
+    if client is None:
+        return
+    process = f"{_role}:{socket.gethostname()}:{os.getpid()}"
+    client.hset(
+        STATS_KEY, process, json.dumps({"at": time.time(), "pools": get_stats()})
+    )
+
+
+def collect():
+    """Статистика, записанная процессами за последние STALE_AFTER секунд.
+    Записи завершившихся процессов удаляются."""
+    client = get_redis()
+    if client is None:
+        return {}
+    processes = {}
+    stale = []
+    for process, payload in client.hgetall(STATS_KEY).items():
+        entry = json.loads(payload)
+        if entry["at"] < time.time() - STALE_AFTER:
+            stale.append(process)
+        else:
+            processes[process] = entry["pools"]
+    if stale:
+        client.hdel(STATS_KEY, *stale)
+    return dict(sorted(processes.items()))
+
+
+@receiver(request_finished)
+def report_after_request(**kwargs):
+    report()
@@ -0,0 +1,152 @@
+"""Чтение API с реплик основной БД.
+
+На реплику (алиасы из DATABASE_REPLICAS) уходят чтения GET- и HEAD-запросов
+к /api/ вне транзакции. Основную БД используют: запись и select_for_update,
+запросы других методов, задачи Celery и команды, заполнение кэшей, а также
+чтения пользователя в течение DATABASE_REPLICA_PIN_SECONDS после его записи,
+чтобы он сразу видел свои брони."""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.decorators import sync_and_async_middleware
+
+READ_METHODS = ("GET", "HEAD")
+
+_reads = ContextVar("replica_reads", default=None)
+
+
+def _pin_key(user_id):
+    return f"db:pinned:{user_id}"
+
+
+def _token_user_id(request):
+    """Пользователь из JWT запроса без обращения к БД."""
+    from rest_framework_simplejwt.exceptions import InvalidToken
+    from rest_framework_simplejwt.settings import api_settings
+
+    from users.authentication import JWTAuthentication
+
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = header and authentication.get_raw_token(header)
+    if not raw_token:
+        return None
+    try:
+        token = authentication.get_validated_token(raw_token)
+    except InvalidToken:
+        return None
+    return token.get(api_settings.USER_ID_CLAIM)
+
+
+class ReplicaReads:
+    """Выбор БД для чтений одного запроса. Реплика выбирается один раз,
+    чтобы все чтения запроса видели одно состояние."""
+
+    def __init__(self, request):
+        self.request = request
+        self.alias = None
+
+    def db(self):
+        if self.alias is None:
+            user_id = _token_user_id(self.request)
+            if user_id is not None and cache.get(_pin_key(user_id)):
+                self.alias = DEFAULT_DB_ALIAS
+            else:
+                self.alias = random.choice(settings.DATABASE_REPLICAS)
+        return self.alias
+
+    def pin(self):
+        self.alias = DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def primary():
+    """Чтения внутри блока идут в основную БД. Нужен там, где прочитанное
+    попадает в кэш: отставшая реплика положила бы туда устаревшие данные."""
+    token = _reads.set(None)
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+def pin(user):
+    """Направляет чтения пользователя в основную БД на
+    DATABASE_REPLICA_PIN_SECONDS секунд."""
+    if user is not None and user.is_authenticated:
+        cache.set(_pin_key(user.pk), 1, settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+def _replica_reads(request):
+    if (
+        settings.DATABASE_REPLICAS
+        and request.method in READ_METHODS
+        and request.path.startswith("/api/")
+    ):
+        return ReplicaReads(request)
+    return None
+
+
+def _wrote(request):
+    return bool(settings.DATABASE_REPLICAS) and request.method not in READ_METHODS
+
+
+@sync_and_async_middleware
+def replica_reads_middleware(get_response):
+    """Включает чтение с реплик для запроса и закрепляет пользователя за
+    основной БД после записи."""
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            token = _reads.set(_replica_reads(request))
+            try:
+                response = await get_response(request)
+            finally:
+                _reads.reset(token)
+            if _wrote(request):
+                await sync_to_async(pin)(getattr(request, "user", None))
+            return response
+
+    else:
+
+        def middleware(request):
+            token = _reads.set(_replica_reads(request))
+            try:
+                response = get_response(request)
+            finally:
+                _reads.reset(token)
+            if _wrote(request):
+                pin(getattr(request, "user", None))
+            return response
+
+    return middleware
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        reads = _reads.get()
+        if reads is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return reads.db()
+
+    def db_for_write(self, model, **hints):
+        # Последующие чтения запроса должны видеть эту запись.
+        reads = _reads.get()
+        if reads is not None:
+            reads.pin()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,16 @@
+"""Клиент Redis процесса (REDIS_URL), общий для пула мест, инвалидации
+кэша мероприятий, потоков server-sent events и статистики пула соединений
+с БД."""
+
+import redis
+from django.conf import settings
+
+_client = None
+
+
+def get_redis():
+    """Клиент Redis или None, если REDIS_URL не задан."""
+    global _client
+    if _client is None and settings.REDIS_URL:
+        _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
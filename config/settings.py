@@ -25,6 +25,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "django_filters",
     "rest_framework_simplejwt",
@@ -43,6 +44,7 @@ MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "config.db_router.replica_reads_middleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -67,9 +69,7 @@ TEMPLATES = [
 WSGI_APPLICATION = "config.wsgi.application"
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("users.authentication.TokenUserAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
@@ -84,15 +84,61 @@ REST_FRAMEWORK = {
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "django.db.backends.postgresql",
         "NAME": os.getenv("POSTGRES_DB"),
         "USER": os.getenv("POSTGRES_USER"),
         "HOST": os.getenv("POSTGRES_HOST"),
         "PORT": os.getenv("POSTGRES_PORT"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Соединения с БД: "none" — новое на каждый запрос, "persistent" — держать
+# до POSTGRES_CONN_MAX_AGE секунд (только под WSGI), "pool" — пул psycopg 3
+# в каждом процессе
+POSTGRES_CONNECTIONS = os.getenv("POSTGRES_CONNECTIONS", "none")
+POSTGRES_CONN_MAX_AGE = int(os.getenv("POSTGRES_CONN_MAX_AGE", 60))
+# Размеры пула веб-процесса и процесса Celery; сколько секунд запрос ждёт
+# свободного соединения, прежде чем завершиться ошибкой
+POSTGRES_POOL_MIN_SIZE = int(os.getenv("POSTGRES_POOL_MIN_SIZE", 2))
+POSTGRES_POOL_MAX_SIZE = int(os.getenv("POSTGRES_POOL_MAX_SIZE", 10))
+POSTGRES_WORKER_POOL_MIN_SIZE = int(os.getenv("POSTGRES_WORKER_POOL_MIN_SIZE", 1))
+POSTGRES_WORKER_POOL_MAX_SIZE = int(os.getenv("POSTGRES_WORKER_POOL_MAX_SIZE", 2))
+POSTGRES_POOL_TIMEOUT = float(os.getenv("POSTGRES_POOL_TIMEOUT", 10))
+
+if POSTGRES_CONNECTIONS == "persistent":
+    DATABASES["default"]["CONN_MAX_AGE"] = POSTGRES_CONN_MAX_AGE
+elif POSTGRES_CONNECTIONS == "pool":
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": POSTGRES_POOL_MIN_SIZE,
+            "max_size": POSTGRES_POOL_MAX_SIZE,
+            "timeout": POSTGRES_POOL_TIMEOUT,
+        }
+    }
+
+# Реплики для чтения API: адреса host[:port] через запятую, имя БД и учётные
+# данные — как у основной. В тестах реплики подменяются основной БД.
+DATABASE_REPLICAS = []
+for number, address in enumerate(
+    filter(None, os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",")), start=1
+):
+    host, _, port = address.strip().partition(":")
+    alias = f"replica{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["config.db_router.ReplicaRouter"]
+
+# Сколько секунд после записи чтения пользователя идут в основную БД
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv("DATABASE_REPLICA_PIN_SECONDS", 5))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -129,6 +175,89 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
 }
 
+# "lock" — select_for_update на строке мероприятия, "conditional" — место
+# занимается одним условным UPDATE счётчика booked_seats без блокировки заранее
+EVENTS_BOOKING_MODE = os.getenv("EVENTS_BOOKING_MODE", "lock")
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Кэш ответов API: Redis, если задан REDIS_URL, иначе память процесса
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Время жизни закэшированных ответов для анонимных запросов, секунды
+EVENTS_CACHE_LIST_TTL = int(os.getenv("EVENTS_CACHE_LIST_TTL", 30))
+EVENTS_CACHE_DETAIL_TTL = int(os.getenv("EVENTS_CACHE_DETAIL_TTL", 60))
+
+# Кэш объектов мероприятий: запись в Redis живёт EVENTS_OBJECT_CACHE_TTL секунд,
+# локальная копия в процессе — EVENTS_OBJECT_CACHE_LOCAL_TTL секунд,
+# в процессе хранится не больше EVENTS_OBJECT_CACHE_LOCAL_SIZE мероприятий
+EVENTS_OBJECT_CACHE_TTL = int(os.getenv("EVENTS_OBJECT_CACHE_TTL", 300))
+EVENTS_OBJECT_CACHE_LOCAL_TTL = float(os.getenv("EVENTS_OBJECT_CACHE_LOCAL_TTL", 2))
+EVENTS_OBJECT_CACHE_LOCAL_SIZE = int(os.getenv("EVENTS_OBJECT_CACHE_LOCAL_SIZE", 256))
+
+# Снимок пользователя для аутентификации по JWT: запись в Redis живёт
+# USERS_CACHE_TTL секунд, локальная копия в процессе — USERS_CACHE_LOCAL_TTL
+# секунд, в процессе хранится не больше USERS_CACHE_LOCAL_SIZE пользователей
+USERS_CACHE_TTL = int(os.getenv("USERS_CACHE_TTL", 300))
+USERS_CACHE_LOCAL_TTL = float(os.getenv("USERS_CACHE_LOCAL_TTL", 2))
+USERS_CACHE_LOCAL_SIZE = int(os.getenv("USERS_CACHE_LOCAL_SIZE", 1024))
+
+# Заявки из пула мест мероприятий с высоким спросом записываются в БД либо
+# сразу ("inline"), либо через очередь Celery ("celery", ответ 202)
+EVENTS_FLASH_SALE_PERSIST = os.getenv("EVENTS_FLASH_SALE_PERSIST", "celery")
+
+# Сколько заявок листа ожидания переводится в брони за один запуск задачи
+EVENTS_WAITLIST_BATCH_SIZE = int(os.getenv("EVENTS_WAITLIST_BATCH_SIZE", 100))
+
+# Запись уведомлений задачей send_notification: "direct" — по одной строке
+# на задачу, "sink" — без запросов пользователя и мероприятия, через буфер
+# процесса, который сбрасывается пачкой каждые NOTIFICATIONS_SINK_BATCH_SIZE
+# уведомлений или NOTIFICATIONS_SINK_FLUSH_MS миллисекунд
+NOTIFICATIONS_WRITE_MODE = os.getenv("NOTIFICATIONS_WRITE_MODE", "direct")
+NOTIFICATIONS_SINK_BATCH_SIZE = int(os.getenv("NOTIFICATIONS_SINK_BATCH_SIZE", 500))
+NOTIFICATIONS_SINK_FLUSH_MS = int(os.getenv("NOTIFICATIONS_SINK_FLUSH_MS", 200))
+
+# Напоминания и завершение мероприятий хранятся в таблице сроков; в Celery с
+# ETA передаются сроки ближайших EVENTS_SCHEDULER_LOOKAHEAD секунд. Диспетчер
+# запускается каждые EVENTS_SCHEDULER_INTERVAL секунд, интервал должен быть
+# меньше горизонта
+EVENTS_SCHEDULER_LOOKAHEAD = int(os.getenv("EVENTS_SCHEDULER_LOOKAHEAD", 120))
+EVENTS_SCHEDULER_INTERVAL = int(os.getenv("EVENTS_SCHEDULER_INTERVAL", 60))
+
+# Поток уведомлений /api/notifications/stream/; 0 — эндпоинт не обслуживается,
+# и записанные уведомления не публикуются
+NOTIFICATIONS_STREAM = os.getenv("NOTIFICATIONS_STREAM", "1") == "1"
+# Интервал комментария-пинга потока в секундах, размер очереди непрочитанных
+# клиентом сообщений (при переполнении поток закрывается) и по сколько
+# пропущенных уведомлений читается из БД за раз при возобновлении
+NOTIFICATIONS_STREAM_HEARTBEAT = int(os.getenv("NOTIFICATIONS_STREAM_HEARTBEAT", 15))
+NOTIFICATIONS_STREAM_QUEUE_SIZE = int(os.getenv("NOTIFICATIONS_STREAM_QUEUE_SIZE", 100))
+NOTIFICATIONS_STREAM_BACKLOG = int(os.getenv("NOTIFICATIONS_STREAM_BACKLOG", 100))
+
+# Асинхронные обработчики чтения под ASGI (список и карточка мероприятий,
+# my_upcoming_events, уведомления, теги); 0 — только синхронные вьюсеты
+API_ASYNC_READS = os.getenv("API_ASYNC_READS", "1") == "1"
+# Сколько асинхронных чтений процесс выполняет одновременно: каждое держит
+# своё соединение с БД, поэтому значение на все процессы должно оставаться
+# ниже max_connections Postgres
+API_ASYNC_READS_CONCURRENCY = int(os.getenv("API_ASYNC_READS_CONCURRENCY", 50))
+
+# Поток свободных мест /api/events/<id>/seats/stream/: подписчик получает не
+# больше одного обновления за столько миллисекунд
+EVENTS_SEATS_STREAM_INTERVAL_MS = int(os.getenv("EVENTS_SEATS_STREAM_INTERVAL_MS", 500))
+
 CORS_ALLOWED_ORIGINS = [
     "https://localhost:8000",
     "https://127.0.0.1:8000",
@@ -152,8 +281,14 @@ CELERY_TIMEZONE = TIME_ZONE
 
 CELERY_TASK_ROUTES = {
     "events.tasks.update_event_status": {"queue": "high_priority"},
+    "events.tasks.persist_pool_booking": {"queue": "high_priority"},
+    "events.tasks.promote_waitlist": {"queue": "high_priority"},
+    "events.tasks.dispatch_scheduled_jobs": {"queue": "high_priority"},
+    "events.tasks.run_scheduled_job": {"queue": "high_priority"},
     "notifications.tasks.send_notification": {"queue": "low_priority"},
+    "notifications.tasks.relay_outbox": {"queue": "low_priority"},
     "notifications.tasks.send_reminder_notifications": {"queue": "default"},
+    "notifications.tasks.send_event_reminders": {"queue": "default"},
 }
 
 CELERY_TASK_DEFAULT_QUEUE = "default"
@@ -173,12 +308,13 @@ CELERY_TASK_QUEUES = {
 }
 
 CELERY_BEAT_SCHEDULE = {
-    "update_event_status_every_3_hours": {
-        "task": "events.tasks.update_event_status",
-        "schedule": 3 * 60 * 60,
+    "dispatch_scheduled_jobs": {
+        "task": "events.tasks.dispatch_scheduled_jobs",
+        "schedule": EVENTS_SCHEDULER_INTERVAL,
     },
-    "send_reminder_notifications_every_10_minutes": {
-        "task": "notifications.tasks.send_reminder_notifications",
-        "schedule": 10 * 60,
+    # Страховка на случай, если задача переноса не была поставлена после коммита
+    "relay_notification_outbox": {
+        "task": "notifications.tasks.relay_outbox",
+        "schedule": 60,
     },
 }
@@ -1,7 +1,7 @@
 from django.contrib import admin
-from django.db.models import Avg, Count, ExpressionWrapper, F, IntegerField
+from django.db.models import ExpressionWrapper, F, IntegerField
 
-from events.models import Booking, Event, Rating, Tag
+from events.models import Booking, Event, Rating, Tag, WaitlistEntry
 
 
 class FreeSeatsFilter(admin.SimpleListFilter):
@@ -16,9 +16,8 @@ class FreeSeatsFilter(admin.SimpleListFilter):
 
     def queryset(self, request, queryset):
         queryset = queryset.annotate(
-            booked_seats=Count("bookings"),
             free_seats_calc=ExpressionWrapper(
-                F("seats") - Count("bookings"), output_field=IntegerField()
+                F("seats") - F("booked_seats"), output_field=IntegerField()
             ),
         )
         if self.value() == "yes":
@@ -40,9 +39,8 @@ class AvgRatingFilter(admin.SimpleListFilter):
         ]
 
     def queryset(self, request, queryset):
-        queryset = queryset.annotate(avg_rating=Avg("ratings__score"))
         value = self.value()
-        if value == "<3":
+        if value == "<3.0":
             return queryset.filter(avg_rating__lt=3.0)
         if value == "3.0-4.0":
             return queryset.filter(avg_rating__gte=3.0, avg_rating__lt=4.0)
@@ -64,6 +62,7 @@ class EventAdmin(admin.ModelAdmin):
     )
     list_filter = (
         "status",
+        "high_demand",
         "start_time",
         "organizer",
         "location",
@@ -78,6 +77,7 @@ class BookingAdmin(admin.ModelAdmin):
     list_display = (
         "user",
         "event",
+        "quantity",
         "booked_at",
     )
     list_filter = (
@@ -90,6 +90,29 @@ class BookingAdmin(admin.ModelAdmin):
         "event",
     )
 
+    # Брони создаются и меняются только через API, которое сдвигает счётчик
+    # занятых мест мероприятия; удаление освобождает места сигналом.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = (
+        "user",
+        "event",
+        "quantity",
+        "created_at",
+    )
+    list_filter = ("event",)
+    search_fields = (
+        "user__username",
+        "event__title",
+    )
+
 
 @admin.register(Rating)
 class RatingAdmin(admin.ModelAdmin):
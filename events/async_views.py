@@ -0,0 +1,167 @@
+"""Асинхронные обработчики чтения поверх вьюсетов DRF.
+
+DRF не умеет асинхронные представления, поэтому async_read собирает
+URL-обработчик сам: GET и HEAD идут в метод вьюсета a<action> с теми же
+аутентификацией, правами, фильтрами и сериализаторами, а запросы к БД
+выполняются через async ORM. Остальные методы обслуживает обычный
+синхронный вьюсет."""
+
+import asyncio
+from weakref import WeakKeyDictionary
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+# Неограниченные выборки читаются пачками, а не целиком в память.
+BATCH_SIZE = 1000
+
+READ_METHODS = ("GET", "HEAD")
+
+_slots = WeakKeyDictionary()
+
+
+def _read_slots():
+    """Ограничение одновременных асинхронных чтений процесса. Запросы async
+    ORM выполняются в отдельном потоке каждого запроса со своим соединением
+    с БД, и без ограничения всплеск запросов открыл бы столько же соединений."""
+    loop = asyncio.get_running_loop()
+    slots = _slots.get(loop)
+    if slots is None:
+        slots = _slots[loop] = asyncio.Semaphore(settings.API_ASYNC_READS_CONCURRENCY)
+    return slots
+
+
+async def afetch(queryset):
+    """Материализует выборку с учётом prefetch_related. Срез (страница)
+    читается одним запросом, неограниченная выборка — aiterator пачками."""
+    if queryset.query.is_sliced:
+        return [obj async for obj in queryset]
+    return [obj async for obj in queryset.aiterator(chunk_size=BATCH_SIZE)]
+
+
+async def authenticate(request):
+    """Асинхронный аналог Request._authenticate: аутентификаторы с
+    aauthenticate ожидаются, остальные (например, принудительная
+    аутентификация тестового клиента) вызываются как есть."""
+    for authenticator in request.authenticators:
+        try:
+            if hasattr(authenticator, "aauthenticate"):
+                user_auth = await authenticator.aauthenticate(request)
+            else:
+                user_auth = authenticator.authenticate(request)
+        except exceptions.APIException:
+            request._not_authenticated()
+            raise
+        if user_auth is not None:
+            request._authenticator = authenticator
+            request.user, request.auth = user_auth
+            return
+    request._not_authenticated()
+
+
+def async_read(viewset, actions, **initkwargs):
+    """URL-обработчик для маршрута вьюсета: действие actions["get"]
+    выполняется асинхронным методом a<действие>, прочие методы — синхронно."""
+    sync_view = viewset.as_view(actions, **initkwargs)
+    action = actions["get"]
+
+    async def view(request, *args, **kwargs):
+        if request.method not in READ_METHODS:
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+        self = viewset(**initkwargs)
+        self.action_map = {"get": action, "head": action}
+        self.args = args
+        self.kwargs = kwargs
+        self.headers = self.default_response_headers
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        try:
+            async with _read_slots():
+                await authenticate(request)
+                self.initial(request, *args, **kwargs)
+                response = await getattr(self, f"a{action}")(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    view.cls = viewset
+    view.initkwargs = initkwargs
+    view.actions = actions
+    return csrf_exempt(view)
+
+
+class AsyncReadMixin:
+    """Асинхронные list и retrieve для async_read."""
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(await afetch(queryset), many=True)
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        return Response(self.get_serializer(instance).data)
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await queryset.filter(**filter_kwargs).afirst()
+        except (TypeError, ValueError, exceptions.ValidationError):
+            obj = None
+        if obj is None:
+            raise NotFound()
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        paginator = self.paginator
+        if paginator is None:
+            return None
+        if isinstance(paginator, PageNumberPagination):
+            return await _apaginate_pages(paginator, queryset, self.request)
+        # Курсорная пагинация читает страницу одним запросом внутри своей
+        # логики; async ORM выполнил бы его так же, через sync_to_async.
+        return await sync_to_async(paginator.paginate_queryset)(
+            queryset, self.request, view=self
+        )
+
+
+async def _apaginate_pages(paginator, queryset, request):
+    """PageNumberPagination.paginate_queryset с acount и асинхронным чтением
+    страницы."""
+    page_size = paginator.get_page_size(request)
+    if not page_size:
+        return None
+
+    django_paginator = paginator.django_paginator_class(queryset, page_size)
+    django_paginator.count = await queryset.acount()
+    page_number = paginator.get_page_number(request, django_paginator)
+    try:
+        page = django_paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(
+            paginator.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+        )
+    page.object_list = await afetch(page.object_list)
+
+    if django_paginator.num_pages > 1 and paginator.template is not None:
+        paginator.display_page_controls = True
+    paginator.page = page
+    paginator.request = request
+    return list(page)
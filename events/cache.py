@@ -0,0 +1,196 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from config import db_router
+
+from .conditional import not_modified_response, set_validators
+
+GENERATION_KEY = "events:cache:generation"
+ENDPOINTS = ("list", "retrieve")
+
+
+def _fresh_generation():
+    # Если счётчик вытеснен из кэша, новое значение не должно совпасть со
+    # старыми поколениями, ключи которых ещё живы.
+    return int(time.time() * 1000)
+
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, _fresh_generation(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+async def aget_generation():
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(GENERATION_KEY, _fresh_generation(), timeout=None)
+        generation = await cache.aget(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, _fresh_generation(), timeout=None)
+
+
+def invalidate_responses():
+    """Сбрасывает закэшированные ответы сразу и ещё раз после коммита,
+    чтобы чтение внутри незавершённой транзакции не закэшировало старые данные."""
+    bump_generation()
+    transaction.on_commit(bump_generation)
+
+
+def _count(endpoint, outcome):
+    key = f"events:cache:stats:{endpoint}:{outcome}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+async def _acount(endpoint, outcome):
+    key = f"events:cache:stats:{endpoint}:{outcome}"
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, timeout=None)
+        await cache.aincr(key)
+
+
+def get_stats():
+    keys = [
+        f"events:cache:stats:{endpoint}:{outcome}"
+        for endpoint in ENDPOINTS
+        for outcome in ("hit", "miss")
+    ]
+    values = cache.get_many(keys)
+    return {
+        endpoint: {
+            outcome: values.get(f"events:cache:stats:{endpoint}:{outcome}", 0)
+            for outcome in ("hit", "miss")
+        }
+        for endpoint in ENDPOINTS
+    }
+
+
+def _cache_key(endpoint, request, kwargs, generation):
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+    params += sorted(kwargs.items())
+    params.append(("host", request.get_host()))
+    digest = hashlib.md5(urlencode(params).encode()).hexdigest()
+    return f"events:cache:{endpoint}:{generation}:{digest}"
+
+
+def _cached_response(request, cached):
+    data, etag, timestamp = cached
+    response = None
+    if etag is not None:
+        response = not_modified_response(request, etag, timestamp)
+    if response is None:
+        response = Response(data)
+        if etag is not None:
+            set_validators(response, etag, timestamp)
+    response["X-Cache"] = "HIT"
+    return response
+
+
+def _cache_entry(response):
+    etag = response.get("ETag")
+    timestamp = parse_http_date_safe(response.get("Last-Modified"))
+    return response.data, etag, timestamp
+
+
+class AnonymousResponseCacheMixin:
+    """Кэширует ответы list и retrieve для анонимных пользователей. Ключ
+    включает нормализованные параметры запроса и номер поколения, который
+    увеличивается при любой записи, поэтому сканировать ключи не нужно."""
+
+    def _cached(self, endpoint, ttl, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        key = _cache_key(endpoint, request, kwargs, get_generation())
+        cached = cache.get(key)
+        if cached is not None:
+            _count(endpoint, "hit")
+            return _cached_response(request, cached)
+        _count(endpoint, "miss")
+        # Ответ попадёт в кэш, поэтому читается из основной БД.
+        with db_router.primary():
+            response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, _cache_entry(response), ttl)
+        response["X-Cache"] = "MISS"
+        return response
+
+    async def _acached(self, endpoint, ttl, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return await handler(request, *args, **kwargs)
+        key = _cache_key(endpoint, request, kwargs, await aget_generation())
+        cached = await cache.aget(key)
+        if cached is not None:
+            await _acount(endpoint, "hit")
+            return _cached_response(request, cached)
+        await _acount(endpoint, "miss")
+        with db_router.primary():
+            response = await handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            await cache.aset(key, _cache_entry(response), ttl)
+        response["X-Cache"] = "MISS"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(
+            "list",
+            settings.EVENTS_CACHE_LIST_TTL,
+            super().list,
+            request,
+            *args,
+            **kwargs,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(
+            "retrieve",
+            settings.EVENTS_CACHE_DETAIL_TTL,
+            super().retrieve,
+            request,
+            *args,
+            **kwargs,
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        return await self._acached(
+            "list",
+            settings.EVENTS_CACHE_LIST_TTL,
+            super().alist,
+            request,
+            *args,
+            **kwargs,
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self._acached(
+            "retrieve",
+            settings.EVENTS_CACHE_DETAIL_TTL,
+            super().aretrieve,
+            request,
+            *args,
+            **kwargs,
+        )
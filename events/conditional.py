@@ -0,0 +1,115 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import NotFound
+
+from .pagination import wants_cursor
+
+
+def _stamp():
+    return {"last_modified": Max("updated_at"), "count": Count("pk")}
+
+
+def _validators(request, queryset):
+    return _from_stamp(request, queryset.order_by().aggregate(**_stamp()))
+
+
+async def _avalidators(request, queryset):
+    return _from_stamp(request, await queryset.order_by().aaggregate(**_stamp()))
+
+
+def _from_stamp(request, stamp):
+    last_modified = stamp["last_modified"]
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    # В ETag идёт время с микросекундами: Last-Modified точен только до секунды.
+    version = last_modified.isoformat() if last_modified else ""
+    source = f"{version}:{stamp['count']}:{request.user.pk}:{request.get_full_path()}"
+    etag = quote_etag(hashlib.md5(source.encode()).hexdigest())
+    return etag, timestamp, stamp["count"]
+
+
+def object_validators(request, last_modified):
+    """Валидаторы карточки по updated_at уже прочитанного объекта: те же,
+    что дал бы агрегат по выборке из одной строки."""
+    etag, timestamp, _ = _from_stamp(
+        request, {"last_modified": last_modified, "count": 1}
+    )
+    return etag, timestamp
+
+
+def not_modified_response(request, etag, timestamp):
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, timestamp)
+    return response
+
+
+def set_validators(response, etag, timestamp):
+    response["ETag"] = etag
+    if timestamp is not None:
+        response["Last-Modified"] = http_date(timestamp)
+
+
+class ConditionalGetMixin:
+    """list и retrieve отвечают 304 Not Modified, если версия выборки не
+    изменилась. Версия — max(updated_at) и число строк отфильтрованной выборки:
+    один агрегирующий запрос вместо основного запроса и сериализации.
+    Страницы курсорной пагинации отдаются без валидаторов: агрегат по всей
+    выборке обходится дороже самой страницы, прочитанной по индексу."""
+
+    def _conditional(self, handler, queryset, request, *args, **kwargs):
+        etag, timestamp, count = _validators(request, queryset)
+        if count:
+            response = not_modified_response(request, etag, timestamp)
+            if response is not None:
+                return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            set_validators(response, etag, timestamp)
+        return response
+
+    async def _aconditional(self, handler, queryset, request, *args, **kwargs):
+        etag, timestamp, count = await _avalidators(request, queryset)
+        if count:
+            response = not_modified_response(request, etag, timestamp)
+            if response is not None:
+                return response
+        response = await handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            set_validators(response, etag, timestamp)
+        return response
+
+    def _retrieve_scope(self, kwargs):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        # Как get_object_or_404: некорректный id — 404, а не ошибка сервера.
+        try:
+            return self.get_queryset().filter(**{self.lookup_field: kwargs[lookup]})
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound
+
+    def list(self, request, *args, **kwargs):
+        if wants_cursor(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return self._conditional(super().list, queryset, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        queryset = self._retrieve_scope(kwargs)
+        return self._conditional(super().retrieve, queryset, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        if wants_cursor(request):
+            return await super().alist(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return await self._aconditional(
+            super().alist, queryset, request, *args, **kwargs
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        queryset = self._retrieve_scope(kwargs)
+        return await self._aconditional(
+            super().aretrieve, queryset, request, *args, **kwargs
+        )
@@ -0,0 +1,8 @@
+from rest_framework import status
+
+
+class BookingError(Exception):
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
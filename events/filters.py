@@ -1,6 +1,7 @@
 import django_filters
 
 from .models import Event
+from .search import normalize_tag_name
 
 
 class EventFilter(django_filters.FilterSet):
@@ -8,13 +9,18 @@ class EventFilter(django_filters.FilterSet):
     status = django_filters.CharFilter(field_name="status", lookup_expr="iexact")
     start_time = django_filters.DateFilter(field_name="start_time", lookup_expr="date")
     tag = django_filters.CharFilter(field_name="tags__name", lookup_expr="icontains")
+    tags = django_filters.CharFilter(method="filter_tags")
+    match = django_filters.ChoiceFilter(
+        choices=[("any", "Любой из тегов"), ("all", "Все теги")],
+        method="filter_match",
+    )
     free_seats = django_filters.BooleanFilter(method="filter_free_seats")
 
     avg_rating__gte = django_filters.NumberFilter(
-        field_name="average_rating", lookup_expr="gte"
+        field_name="avg_rating", lookup_expr="gte"
     )
     avg_rating__lte = django_filters.NumberFilter(
-        field_name="average_rating", lookup_expr="lte"
+        field_name="avg_rating", lookup_expr="lte"
     )
 
     class Meta:
@@ -24,6 +30,8 @@ class EventFilter(django_filters.FilterSet):
             "status",
             "start_time",
             "tag",
+            "tags",
+            "match",
             "free_seats",
             "avg_rating__gte",
             "avg_rating__lte",
@@ -33,3 +41,14 @@ class EventFilter(django_filters.FilterSet):
         if value:
             return queryset.filter(bookings__isnull=False).distinct()
         return queryset
+
+    def filter_tags(self, queryset, name, value):
+        names = [normalize_tag_name(tag) for tag in value.split(",") if tag.strip()]
+        if not names:
+            return queryset
+        if self.form.cleaned_data.get("match") == "all":
+            return queryset.filter(tag_names__contains=names)
+        return queryset.filter(tag_names__overlap=names)
+
+    def filter_match(self, queryset, name, value):
+        return queryset
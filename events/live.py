@@ -0,0 +1,137 @@
+"""Поток свободных мест мероприятия /api/events/<id>/seats/stream/
+(server-sent events).
+
+После коммита брони или отмены процесс-писатель читает из БД текущее число
+мест и публикует его в канал Redis CHANNEL. Каждый ASGI-процесс отдаёт
+подписчикам мероприятия не больше одного обновления в
+EVENTS_SEATS_STREAM_INTERVAL_MS: изменения, пришедшие за интервал,
+схлопываются в последнее."""
+
+import asyncio
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from notifications.live import Hub
+from notifications.stream import cors_headers, parse_request, pump, respond
+
+from .models import Event
+
+CHANNEL = "events:seats"
+PATH = re.compile(r"^/api/events/(?P<event_id>\d+)/seats/stream/$")
+
+
+class SeatHub(Hub):
+    """Рассылает подписчикам мероприятия последнее число свободных мест не
+    чаще раза в интервал."""
+
+    def __init__(self, channel):
+        # Клиенту нужно только последнее состояние.
+        super().__init__(channel, queue_size=1)
+        self._pending = {}
+        self._sent_at = {}
+        self._updated_at = {}
+
+    def unsubscribe(self, event_id, queue):
+        super().unsubscribe(event_id, queue)
+        if event_id not in self._queues:
+            self._pending.pop(event_id, None)
+            self._sent_at.pop(event_id, None)
+            self._updated_at.pop(event_id, None)
+
+    def dispatch(self, event_id, data):
+        if event_id not in self._queues:
+            return
+        # Публикации разных процессов могут прийти не по порядку:
+        # более старое состояние не должно затереть новое.
+        updated_at = parse_datetime(data["updated_at"])
+        if updated_at < self._updated_at.get(event_id, updated_at):
+            return
+        self._updated_at[event_id] = updated_at
+        scheduled = event_id in self._pending
+        self._pending[event_id] = data
+        if scheduled:
+            return
+        loop = asyncio.get_running_loop()
+        delay = (
+            self._sent_at.get(event_id, float("-inf"))
+            + settings.EVENTS_SEATS_STREAM_INTERVAL_MS / 1000
+            - loop.time()
+        )
+        if delay > 0:
+            loop.call_later(delay, self._flush, event_id)
+        else:
+            self._flush(event_id)
+
+    def _flush(self, event_id):
+        data = self._pending.pop(event_id, None)
+        if data is None:
+            return
+        self._sent_at[event_id] = asyncio.get_running_loop().time()
+        for queue in self._queues.get(event_id, ()):
+            # Непрочитанное клиентом состояние устарело и отбрасывается.
+            while queue.full():
+                queue.get_nowait()
+            queue.put_nowait(data)
+
+
+hub = SeatHub(CHANNEL)
+
+
+def _snapshot(event_ids):
+    rows = Event.objects.filter(id__in=event_ids).values_list(
+        "id", "seats", "booked_seats", "updated_at"
+    )
+    return [
+        (
+            event_id,
+            {
+                "event": event_id,
+                "free_seats": seats - booked_seats,
+                "updated_at": updated_at.isoformat(),
+            },
+        )
+        for event_id, seats, booked_seats, updated_at in rows
+    ]
+
+
+def seats_changed(event_ids):
+    """Публикует число свободных мест мероприятий после коммита транзакции,
+    изменившей их."""
+    event_ids = sorted({int(event_id) for event_id in event_ids})
+    if event_ids:
+        transaction.on_commit(lambda: hub.publish(_snapshot(event_ids)), robust=True)
+
+
+def _current(event_id):
+    try:
+        rows = _snapshot([event_id])
+    finally:
+        connection.close()
+    return rows[0][1] if rows else None
+
+
+def _event(data):
+    payload = json.dumps(data)
+    return f"event: seats\ndata: {payload}\n\n".encode()
+
+
+async def application(scope, receive, send):
+    """Открывает поток числа свободных мест мероприятия. Первое сообщение —
+    текущее значение, далее — изменения."""
+    headers, _ = parse_request(scope)
+    cors = cors_headers(headers)
+    event_id = int(PATH.match(scope["path"])["event_id"])
+
+    queue = hub.subscribe(event_id)
+    try:
+        current = await sync_to_async(_current, thread_sensitive=False)(event_id)
+        if current is None:
+            return await respond(send, 404, "Мероприятие не найдено.", cors)
+        await pump(receive, send, queue, cors, _event, first=_event(current))
+    finally:
+        hub.unsubscribe(event_id, queue)
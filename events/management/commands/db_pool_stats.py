@@ -0,0 +1,23 @@
+from django.core.management import BaseCommand
+
+from config.db_pool import collect
+
+
+class Command(BaseCommand):
+    help = "Показывает пулы соединений с БД веб-процессов и процессов Celery"
+
+    def handle(self, *args, **options):
+        processes = collect()
+        if not processes:
+            self.stdout.write("нет данных: пул выключен или процессы не отчитывались")
+        for process, pools in processes.items():
+            for alias, stats in pools.items():
+                self.stdout.write(
+                    f"{process} {alias}: занято {stats['in_use']} из {stats['size']} "
+                    f"(от {stats['min_size']} до {stats['max_size']}), "
+                    f"ждут {stats['waiting']}; запросов {stats['requests']}, "
+                    f"ждали свободного {stats['queued']}, "
+                    f"среднее ожидание {stats['avg_wait_ms']:.1f} мс, "
+                    f"таймаутов {stats['timeouts']}, "
+                    f"потеряно соединений {stats['connections_lost']}"
+                )
@@ -0,0 +1,16 @@
+from django.core.management import BaseCommand
+
+from events.cache import get_stats
+
+
+class Command(BaseCommand):
+    help = "Показывает попадания и промахи кэша ответов по эндпоинтам"
+
+    def handle(self, *args, **options):
+        for endpoint, counters in get_stats().items():
+            total = counters["hit"] + counters["miss"]
+            ratio = counters["hit"] / total if total else 0
+            self.stdout.write(
+                f"{endpoint}: попаданий {counters['hit']}, "
+                f"промахов {counters['miss']} ({ratio:.0%})"
+            )
@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+
+from events import seat_pool
+
+
+class Command(BaseCommand):
+    help = "Пересобирает пулы мест в Redis для мероприятий с высоким спросом"
+
+    def handle(self, *args, **options):
+        if not seat_pool.is_enabled():
+            self.stderr.write("REDIS_URL не задан")
+            return
+        rebuilt = seat_pool.rebuild_all()
+        self.stdout.write(f"Пересобрано пулов: {rebuilt}")
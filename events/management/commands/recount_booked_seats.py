@@ -0,0 +1,52 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from events import object_cache, seat_pool
+from events.cache import invalidate_responses
+from events.models import Booking, Event
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчик забронированных мест по таблице бронирований"
+
+    def add_arguments(self, parser):
+        parser.add_argument("event_ids", nargs="*", type=int)
+
+    def handle(self, *args, **options):
+        booked = (
+            Booking.objects.filter(event=OuterRef("pk"))
+            .values("event")
+            .annotate(total=Sum("quantity"))
+            .values("total")
+        )
+        events = Event.objects.all()
+        if options["event_ids"]:
+            events = events.filter(id__in=options["event_ids"])
+
+        updated = events.update(
+            booked_seats=Coalesce(
+                Subquery(booked, output_field=IntegerField()), Value(0)
+            ),
+            updated_at=timezone.now(),
+        )
+        # Счётчик меняется UPDATE'ом мимо save(): кэши и пулы мест
+        # сбрасываем сами, как это делают сигналы.
+        event_ids = list(events.values_list("id", flat=True))
+        invalidate_responses()
+        object_cache.invalidate(event_ids)
+        if seat_pool.is_enabled():
+            pool_ids = list(
+                events.filter(high_demand=True, status="upcoming").values_list(
+                    "id", flat=True
+                )
+            )
+
+            def rebuild_pools():
+                for event_id in pool_ids:
+                    seat_pool.rebuild(event_id)
+
+            transaction.on_commit(rebuild_pools)
+        self.stdout.write(f"Пересчитано мероприятий: {updated}")
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.2 on 2026-10-17 12:55
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_booked_seats(apps, schema_editor):
+    Event = apps.get_model("events", "Event")
+    Booking = apps.get_model("events", "Booking")
+    booked = (
+        Booking.objects.filter(event=OuterRef("pk"))
+        .values("event")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    Event.objects.update(
+        booked_seats=Coalesce(Subquery(booked, output_field=IntegerField()), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0006_alter_event_organizer"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="booked_seats",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_booked_seats, migrations.RunPython.noop),
+    ]
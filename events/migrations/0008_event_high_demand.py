@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0007_event_booked_seats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="high_demand",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:02
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0008_event_high_demand"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="booking",
+            name="quantity",
+            field=models.PositiveIntegerField(
+                default=1, validators=[django.core.validators.MinValueValidator(1)]
+            ),
+        ),
+    ]
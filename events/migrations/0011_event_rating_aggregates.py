@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:06
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_rating_aggregates(apps, schema_editor):
+    Event = apps.get_model("events", "Event")
+    Rating = apps.get_model("events", "Rating")
+    ratings = Rating.objects.filter(event=OuterRef("pk")).values("event")
+    Event.objects.update(
+        rating_sum=Coalesce(
+            Subquery(ratings.annotate(total=Sum("score")).values("total")),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+        rating_count=Coalesce(
+            Subquery(ratings.annotate(total=Count("id")).values("total")),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+        avg_rating=Coalesce(
+            Subquery(ratings.annotate(avg=Avg("score")).values("avg")),
+            Value(0.0),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0010_waitlistentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="avg_rating",
+            field=models.FloatField(db_index=True, default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:10
+
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import BigIntegerField, Case, F, Value, When
+from django.db.models.functions import Cast, Extract, Floor
+
+
+def fill_feed_key(apps, schema_editor):
+    # То же, что events.models.feed_key_expression с константами FEED_* на
+    # момент миграции.
+    Event = apps.get_model("events", "Event")
+    epoch = Cast(
+        Floor(Extract("start_time", "epoch", tzinfo=dt_timezone.utc)),
+        BigIntegerField(),
+    )
+    rating_part = Value(500) - Cast(Floor(F("avg_rating") * 100), BigIntegerField())
+    Event.objects.update(
+        feed_key=Case(
+            When(status="upcoming", then=epoch * 1000 + rating_part),
+            default=Value(2**62) - epoch * 1000 + rating_part,
+            output_field=BigIntegerField(),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0011_event_rating_aggregates"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="feed_key",
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_feed_key, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["feed_key", "id"], name="events_even_feed_ke_125939_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:14
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import F, OuterRef, Subquery
+
+
+def fill_search_vector(apps, schema_editor):
+    # То же, что events.search.search_vector_expression на момент миграции.
+    Event = apps.get_model("events", "Event")
+    tag_names = Subquery(
+        Event.tags.through.objects.filter(event_id=OuterRef("pk"))
+        .values("event_id")
+        .annotate(names=StringAgg("tag__name", " "))
+        .values("names")
+    )
+    vector = None
+    for config in ("russian", "english"):
+        for expression, weight in (
+            (F("title"), "A"),
+            (tag_names, "B"),
+            (F("description"), "C"),
+        ):
+            part = SearchVector(expression, config=config, weight=weight)
+            vector = part if vector is None else vector + part
+    Event.objects.update(search_vector=vector)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0012_event_feed_key"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="event",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="events_even_search__5f308c_gin"
+            ),
+        ),
+    ]
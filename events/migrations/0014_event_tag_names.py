@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:27
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Lower, Trim
+
+
+def fill_tag_names(apps, schema_editor):
+    # То же, что events.search.tag_names_expression на момент миграции.
+    Event = apps.get_model("events", "Event")
+    Event.objects.update(
+        tag_names=Coalesce(
+            Subquery(
+                Event.tags.through.objects.filter(event_id=OuterRef("pk"))
+                .values("event_id")
+                .annotate(names=ArrayAgg(Lower(Trim("tag__name")), distinct=True))
+                .values("names")
+            ),
+            Value([]),
+            output_field=django.contrib.postgres.fields.ArrayField(
+                models.CharField(max_length=50)
+            ),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0013_event_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="tag_names",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.CharField(max_length=50),
+                blank=True,
+                default=list,
+                editable=False,
+                size=None,
+            ),
+        ),
+        migrations.RunPython(fill_tag_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="event",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["tag_names"], name="events_even_tag_nam_413069_gin"
+            ),
+        ),
+    ]
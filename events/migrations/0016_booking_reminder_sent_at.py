@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:57
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_sent_reminders(apps, schema_editor):
+    # Участники мероприятий, которые уже начались или попали в окно
+    # напоминаний, получили напоминание от прежней версии задачи.
+    Booking = apps.get_model("events", "Booking")
+    now = timezone.now()
+    Booking.objects.filter(
+        event__start_time__lte=now + timezone.timedelta(hours=1)
+    ).update(reminder_sent_at=now)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0015_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="booking",
+            name="reminder_sent_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(mark_sent_reminders, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                condition=models.Q(("reminder_sent_at__isnull", True)),
+                fields=["event"],
+                name="booking_reminder_pending_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def schedule_upcoming_events(apps, schema_editor):
+    # Те же сдвиги, что в events.scheduler.OFFSETS на момент миграции.
+    Event = apps.get_model("events", "Event")
+    ScheduledJob = apps.get_model("events", "ScheduledJob")
+    now = timezone.now()
+    events = (
+        Event.objects.filter(status="upcoming")
+        .values_list("id", "start_time")
+        .iterator(chunk_size=10_000)
+    )
+    batch = []
+    for event_id, start_time in events:
+        if start_time > now:
+            batch.append(
+                ScheduledJob(
+                    event_id=event_id,
+                    kind="reminder",
+                    due_at=start_time - timezone.timedelta(hours=1),
+                )
+            )
+        batch.append(
+            ScheduledJob(
+                event_id=event_id,
+                kind="finish",
+                due_at=start_time + timezone.timedelta(hours=2),
+            )
+        )
+        if len(batch) >= 10_000:
+            ScheduledJob.objects.bulk_create(batch)
+            batch = []
+    ScheduledJob.objects.bulk_create(batch)
+
+
+def disable_polling_tasks(apps, schema_editor):
+    # django_celery_beat не удаляет из базы записи, пропавшие из
+    # CELERY_BEAT_SCHEDULE, поэтому прежние периодические опросы отключаются здесь.
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+    PeriodicTask.objects.filter(
+        task__in=[
+            "events.tasks.update_event_status",
+            "notifications.tasks.send_reminder_notifications",
+        ]
+    ).update(enabled=False)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0016_booking_reminder_sent_at"),
+        ("django_celery_beat", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScheduledJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("reminder", "Напоминание участникам"),
+                            ("finish", "Завершение мероприятия"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("due_at", models.DateTimeField(db_index=True)),
+                (
+                    "event",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scheduled_jobs",
+                        to="events.event",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Запланированная задача",
+                "verbose_name_plural": "Запланированные задачи",
+                "unique_together": {("event", "kind")},
+            },
+        ),
+        migrations.RunPython(schedule_upcoming_events, migrations.RunPython.noop),
+        migrations.RunPython(disable_polling_tasks, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,64 @@
+import math
+from datetime import timezone as dt_timezone
+
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import BigIntegerField, Case, F, Value, When
+from django.db.models.functions import Cast, Extract, Floor
 
 from users.models import User
 
+# Ключ ленты: сначала ожидаемые мероприятия по возрастанию времени начала,
+# затем прошедшие и отменённые по убыванию, внутри секунды — по убыванию оценки.
+FEED_RATING_SCALE = 1000
+FEED_MAX_RATING = 500
+FEED_PAST_BASE = 2**62
+
+# Поля Event, которые меняются только атомарными UPDATE.
+COUNTER_FIELDS = ("booked_seats", "rating_sum", "rating_count", "avg_rating")
+# Поля Event, которые пересчитывают сигналы тегов и сохранения прямо в строке.
+DERIVED_FIELDS = ("search_vector", "tag_names")
+
+
+def feed_key(status, start_time, avg_rating):
+    rating_part = FEED_MAX_RATING - int(avg_rating * 100)
+    epoch = math.floor(start_time.timestamp())
+    if status == "upcoming":
+        return epoch * FEED_RATING_SCALE + rating_part
+    return FEED_PAST_BASE - epoch * FEED_RATING_SCALE + rating_part
+
+
+def feed_key_expression(status=None, avg_rating=F("avg_rating"), start_time=None):
+    """SQL-версия feed_key для массовых UPDATE. Новый статус, выражение
+    оценки и время начала можно передать, чтобы вычислить ключ в том же
+    UPDATE."""
+    if start_time is not None:
+        epoch = Cast(Value(math.floor(start_time.timestamp())), BigIntegerField())
+    else:
+        epoch = Cast(
+            Floor(Extract("start_time", "epoch", tzinfo=dt_timezone.utc)),
+            BigIntegerField(),
+        )
+    rating_part = Value(FEED_MAX_RATING) - Cast(
+        Floor(avg_rating * 100), BigIntegerField()
+    )
+    upcoming = epoch * FEED_RATING_SCALE + rating_part
+    past = Value(FEED_PAST_BASE) - epoch * FEED_RATING_SCALE + rating_part
+    if status is not None:
+        return upcoming if status == "upcoming" else past
+    return Case(
+        When(status="upcoming", then=upcoming),
+        default=past,
+        output_field=BigIntegerField(),
+    )
+
 
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -27,28 +80,65 @@ class Event(models.Model):
     start_time = models.DateTimeField()
     location = models.CharField(max_length=255)
     seats = models.PositiveIntegerField(default=100)
+    booked_seats = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    avg_rating = models.FloatField(default=0.0, editable=False, db_index=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="upcoming")
+    high_demand = models.BooleanField(default=False)
     organizer = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="created_events"
     )
     tags = models.ManyToManyField(Tag, related_name="events", blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    feed_key = models.BigIntegerField(default=0, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    tag_names = ArrayField(
+        models.CharField(max_length=50), default=list, blank=True, editable=False
+    )
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.feed_key = feed_key(self.status, self.start_time, self.avg_rating)
+            return super().save(*args, **kwargs)
+
+        # Счётчики мест и оценок меняются только UPDATE с F() при брони,
+        # отмене и оценке, а имена тегов и поисковый вектор — сигналами.
+        # Редактирование не записывает их из прочитанного раньше объекта,
+        # иначе затрёт параллельные изменения, а ключ ленты считает по оценке
+        # в строке.
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            update_fields = {
+                field.attname
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+            } - {*COUNTER_FIELDS, *DERIVED_FIELDS}
+        kwargs["update_fields"] = {*update_fields, "feed_key", "updated_at"}
+        self.feed_key = feed_key_expression(
+            status=self.status, start_time=self.start_time
+        )
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=["feed_key", "tag_names", *COUNTER_FIELDS])
+
     @property
     def free_seats(self):
-        return self.seats - self.bookings.count()
+        return self.seats - self.booked_seats
 
     def average_rating(self):
-        average_rating = self.ratings.aggregate(models.Avg("score"))["score__avg"]
-        if average_rating is None:
-            return 0.0
-        return average_rating
+        return self.avg_rating
 
     class Meta:
         ordering = ["start_time"]
+        indexes = [
+            models.Index(fields=["feed_key", "id"]),
+            GinIndex(fields=["search_vector"]),
+            GinIndex(fields=["tag_names"]),
+        ]
         verbose_name = "Событие"
         verbose_name_plural = "События"
 
@@ -56,14 +146,44 @@ class Event(models.Model):
 class Booking(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="bookings")
+    quantity = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)])
     booked_at = models.DateTimeField(auto_now_add=True)
+    # Когда отправлено напоминание о начале мероприятия; NULL — ещё не отправлено
+    reminder_sent_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    def notification_message(self):
+        message = f'Вы успешно забронировали мероприятие "{self.event.title}"'
+        if self.quantity > 1:
+            message += f" (мест: {self.quantity})"
+        return message
 
     class Meta:
         unique_together = ("user", "event")
+        indexes = [
+            models.Index(
+                fields=["event"],
+                condition=models.Q(reminder_sent_at__isnull=True),
+                name="booking_reminder_pending_idx",
+            )
+        ]
         verbose_name = "Бронирование"
         verbose_name_plural = "Бронирования"
 
 
+class WaitlistEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="waitlist")
+    quantity = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)])
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user", "event")
+        ordering = ["id"]
+        indexes = [models.Index(fields=["event", "id"])]
+        verbose_name = "Лист ожидания"
+        verbose_name_plural = "Листы ожидания"
+
+
 class Rating(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="ratings")
@@ -76,3 +196,23 @@ class Rating(models.Model):
         unique_together = ("user", "event")
         verbose_name = "Оценка"
         verbose_name_plural = "Оценки"
+
+
+class ScheduledJob(models.Model):
+    """Отложенное действие над мероприятием, которое ещё не передано в Celery."""
+
+    KINDS = (
+        ("reminder", "Напоминание участникам"),
+        ("finish", "Завершение мероприятия"),
+    )
+
+    event = models.ForeignKey(
+        Event, on_delete=models.CASCADE, related_name="scheduled_jobs"
+    )
+    kind = models.CharField(max_length=10, choices=KINDS)
+    due_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ("event", "kind")
+        verbose_name = "Запланированная задача"
+        verbose_name_plural = "Запланированные задачи"
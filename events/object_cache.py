@@ -0,0 +1,245 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+from config import db_router
+from config.redis import get_redis
+
+from .conditional import not_modified_response, object_validators, set_validators
+
+CHANNEL = "events:object_cache:invalidate"
+
+_lock = threading.Lock()
+_local = OrderedDict()
+_inflight = {}
+_stats = {"local_hit": 0, "redis_hit": 0, "load": 0, "wait": 0, "invalidated": 0}
+_subscriber_pid = None
+# Увеличивается при каждой инвалидации: загрузка, начатая до неё, не должна
+# положить в кэш уже устаревшие данные.
+_epoch = 0
+
+
+def _redis_key(event_id):
+    return f"events:object:v2:{event_id}"
+
+
+def _lock_key(event_id):
+    return f"events:object:v2:{event_id}:loading"
+
+
+def _get_shared(event_id):
+    """Читает запись из Redis. Если её загружает другой процесс, недолго
+    ждёт его результата, а не идёт в базу параллельно."""
+    data = cache.get(_redis_key(event_id))
+    if data is not None or cache.add(_lock_key(event_id), 1, timeout=5):
+        return data
+    deadline = time.monotonic() + 1
+    while time.monotonic() < deadline:
+        time.sleep(0.02)
+        data = cache.get(_redis_key(event_id))
+        if data is not None:
+            return data
+    return None
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def _get_local(event_id):
+    with _lock:
+        entry = _local.get(event_id)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            del _local[event_id]
+            return None
+        _local.move_to_end(event_id)
+        return data
+
+
+def _set_local(event_id, data):
+    with _lock:
+        _local[event_id] = (
+            time.monotonic() + settings.EVENTS_OBJECT_CACHE_LOCAL_TTL,
+            data,
+        )
+        _local.move_to_end(event_id)
+        while len(_local) > settings.EVENTS_OBJECT_CACHE_LOCAL_SIZE:
+            _local.popitem(last=False)
+
+
+def evict_local(event_id):
+    global _epoch
+    with _lock:
+        _epoch += 1
+        if _local.pop(int(event_id), None) is not None:
+            _stats["invalidated"] += 1
+
+
+def get_or_load(event_id, loader):
+    """Возвращает данные мероприятия из локального LRU, затем из Redis.
+    При промахе загружает их через loader один раз: потоки процесса ждут
+    первого из них, процессы — того, кто взял блокировку в Redis."""
+    event_id = int(event_id)
+    _ensure_subscriber()
+    data = _get_local(event_id)
+    if data is not None:
+        _count("local_hit")
+        return data
+
+    with _lock:
+        flight = _inflight.get(event_id)
+        leader = flight is None
+        if leader:
+            flight = _inflight[event_id] = {"done": threading.Event()}
+            epoch = _epoch
+
+    if not leader:
+        _count("wait")
+        flight["done"].wait()
+        if "error" in flight:
+            raise flight["error"]
+        return flight["data"]
+
+    try:
+        data = _get_shared(event_id)
+        if data is not None:
+            _count("redis_hit")
+        else:
+            _count("load")
+            try:
+                with db_router.primary():
+                    data = loader()
+                if epoch == _epoch:
+                    cache.set(
+                        _redis_key(event_id), data, settings.EVENTS_OBJECT_CACHE_TTL
+                    )
+            finally:
+                cache.delete(_lock_key(event_id))
+        if epoch == _epoch:
+            _set_local(event_id, data)
+        flight["data"] = data
+        return data
+    except Exception as e:
+        flight["error"] = e
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(event_id, None)
+        flight["done"].set()
+
+
+def _publish(event_ids):
+    cache.delete_many([_redis_key(event_id) for event_id in event_ids])
+    client = get_redis()
+    for event_id in event_ids:
+        evict_local(event_id)
+        if client is not None:
+            client.publish(CHANNEL, event_id)
+
+
+def invalidate(event_ids):
+    """Удаляет мероприятия из кэша во всех процессах: сразу и повторно после
+    коммита, когда изменения станут видны другим соединениям."""
+    event_ids = [int(event_id) for event_id in event_ids]
+    if not event_ids:
+        return
+    _publish(event_ids)
+    transaction.on_commit(lambda: _publish(event_ids))
+
+
+async def aget_or_load(event_id, loader):
+    """get_or_load для асинхронных обработчиков: попадание в локальный LRU
+    отдаётся сразу, остальное — через get_or_load в потоке, с тем же
+    ожиданием уже идущей загрузки."""
+    event_id = int(event_id)
+    _ensure_subscriber()
+    data = _get_local(event_id)
+    if data is not None:
+        _count("local_hit")
+        return data
+    return await sync_to_async(get_or_load)(event_id, loader)
+
+
+def _listen():
+    while True:
+        try:
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CHANNEL)
+            for message in pubsub.listen():
+                evict_local(message["data"])
+        except Exception:
+            # Пока подписка восстанавливается, устаревание локальных записей
+            # ограничено EVENTS_OBJECT_CACHE_LOCAL_TTL.
+            time.sleep(1)
+
+
+def _ensure_subscriber():
+    global _subscriber_pid
+    if _subscriber_pid == os.getpid() or get_redis() is None:
+        return
+    with _lock:
+        if _subscriber_pid == os.getpid():
+            return
+        _subscriber_pid = os.getpid()
+        # После fork локальные записи родителя могли пропустить инвалидации.
+        _local.clear()
+    threading.Thread(
+        target=_listen, name="event-cache-invalidation", daemon=True
+    ).start()
+
+
+def get_stats():
+    with _lock:
+        stats = dict(_stats, pid=os.getpid(), local_size=len(_local))
+    lookups = stats["local_hit"] + stats["redis_hit"] + stats["load"] + stats["wait"]
+    stats["hit_rate"] = (
+        (stats["local_hit"] + stats["redis_hit"] + stats["wait"]) / lookups
+        if lookups
+        else 0.0
+    )
+    return stats
+
+
+class CachedRetrieveMixin:
+    """Отдаёт retrieve из кэша объектов мероприятий. Запись хранит и
+    updated_at, поэтому ETag и Last-Modified карточки, а с ними и ответ
+    304, получаются без запроса к БД. Стоит перед ConditionalGetMixin,
+    который обслуживает остальные запросы."""
+
+    def _load(self):
+        event = self.get_object()
+        return {
+            "data": dict(self.get_serializer(event).data),
+            "updated_at": event.updated_at,
+        }
+
+    def _respond(self, request, entry):
+        etag, timestamp = object_validators(request, entry["updated_at"])
+        response = not_modified_response(request, etag, timestamp)
+        if response is None:
+            response = Response(entry["data"])
+            set_validators(response, etag, timestamp)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = str(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        if not pk.isdigit():
+            return super().retrieve(request, *args, **kwargs)
+        return self._respond(request, get_or_load(pk, self._load))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        pk = str(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        if not pk.isdigit():
+            return await super().aretrieve(request, *args, **kwargs)
+        return self._respond(request, await aget_or_load(pk, self._load))
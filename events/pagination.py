@@ -0,0 +1,20 @@
+from rest_framework.pagination import CursorPagination
+from rest_framework.settings import api_settings
+
+
+class EventFeedCursorPagination(CursorPagination):
+    """Keyset-пагинация ленты по индексу (feed_key, id): страница читается
+    одним запросом без COUNT и OFFSET, на любой глубине одинаково быстро."""
+
+    ordering = ("feed_key", "id")
+
+
+def wants_cursor(request):
+    """Результаты поиска упорядочены по релевантности, которой нет в ключе
+    курсора, поэтому с ?search= pagination=cursor игнорируется и выдача
+    остаётся постраничной."""
+    params = request.query_params
+    return (
+        params.get("pagination") == "cursor"
+        and not params.get(api_settings.SEARCH_PARAM, "").strip()
+    )
@@ -4,5 +4,6 @@ from rest_framework import permissions
 class IsOrganizerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         return (
-            request.method in permissions.SAFE_METHODS or obj.organizer == request.user
+            request.method in permissions.SAFE_METHODS
+            or obj.organizer_id == request.user.id
         )
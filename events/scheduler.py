@@ -0,0 +1,114 @@
+"""Планировщик действий над мероприятиями: напоминания участникам и
+завершения. Сроки хранятся в ScheduledJob с индексом по due_at, а в Celery
+с ETA передаются только те, что наступят в ближайшие
+EVENTS_SCHEDULER_LOOKAHEAD секунд."""
+
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.tasks import send_event_reminders
+
+from .models import Event, ScheduledJob
+
+REMINDER = "reminder"
+FINISH = "finish"
+
+# Срок действия относительно начала мероприятия
+OFFSETS = {
+    REMINDER: -timezone.timedelta(hours=1),
+    FINISH: timezone.timedelta(hours=2),
+}
+
+BATCH_SIZE = 1000
+
+
+def due_times(start_time):
+    return {kind: start_time + offset for kind, offset in OFFSETS.items()}
+
+
+def _horizon():
+    return timezone.now() + timezone.timedelta(
+        seconds=settings.EVENTS_SCHEDULER_LOOKAHEAD
+    )
+
+
+def plan(event):
+    """Пересчитывает сроки мероприятия после создания или изменения.
+    Возвращает пары (вид, срок), которые наступят в пределах горизонта и
+    должны быть сразу переданы в Celery; остальные сохраняются в ScheduledJob."""
+    if event.status != "upcoming":
+        ScheduledJob.objects.filter(event_id=event.id).delete()
+        return []
+
+    horizon = _horizon()
+    jobs, immediate = [], []
+    for kind, due_at in due_times(event.start_time).items():
+        if kind == REMINDER and event.start_time <= timezone.now():
+            continue
+        if due_at <= horizon:
+            immediate.append((kind, due_at))
+        else:
+            jobs.append(ScheduledJob(event_id=event.id, kind=kind, due_at=due_at))
+
+    ScheduledJob.objects.filter(event_id=event.id).exclude(
+        kind__in=[job.kind for job in jobs]
+    ).delete()
+    ScheduledJob.objects.bulk_create(
+        jobs,
+        update_conflicts=True,
+        unique_fields=["event", "kind"],
+        update_fields=["due_at"],
+    )
+    return immediate
+
+
+def claim_due(enqueue):
+    """Передаёт в enqueue задания со сроком в пределах горизонта и удаляет их.
+    Отправка происходит до коммита: при сбое задание останется в таблице и
+    будет отправлено повторно, а не потеряно. Параллельный диспетчер
+    пропускает заблокированные строки. Возвращает число заданий."""
+    with transaction.atomic():
+        jobs = list(
+            ScheduledJob.objects.filter(due_at__lte=_horizon())
+            .select_for_update(skip_locked=True)
+            .order_by("due_at")
+            .values_list("id", "event_id", "kind", "due_at")[:BATCH_SIZE]
+        )
+        for _, event_id, kind, due_at in jobs:
+            enqueue(event_id, kind, due_at)
+        ScheduledJob.objects.filter(id__in=[job[0] for job in jobs]).delete()
+    return len(jobs)
+
+
+def is_current(event_id, kind, due_at):
+    """Проверяет, что задание не устарело: мероприятие ещё ожидается и его
+    срок с момента планирования не сдвинулся."""
+    start_time = (
+        Event.objects.filter(id=event_id, status="upcoming")
+        .values_list("start_time", flat=True)
+        .first()
+    )
+    if start_time is None:
+        return False
+    return due_times(start_time)[kind] == datetime.fromisoformat(due_at)
+
+
+def remind_late_bookings(events):
+    """Ставит напоминания по новым броням мероприятий, срок напоминания
+    которых уже прошёл: запланированное задание эти брони не застало.
+    Отметка Booking.reminder_sent_at не даёт напомнить дважды."""
+    now = timezone.now()
+    event_ids = {
+        event.id
+        for event in events
+        if event.status == "upcoming"
+        and event.start_time + OFFSETS[REMINDER] <= now < event.start_time
+    }
+    for event_id in sorted(event_ids):
+        transaction.on_commit(
+            lambda event_id=event_id: send_event_reminders.delay(event_id),
+            robust=True,
+        )
@@ -0,0 +1,92 @@
+from django.contrib.postgres.aggregates import ArrayAgg, StringAgg
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import CharField, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Lower, Trim
+from django.utils import timezone
+from rest_framework.filters import SearchFilter
+
+from .models import Event
+
+SEARCH_CONFIGS = ("russian", "english")
+
+
+def _tag_names():
+    return Subquery(
+        Event.tags.through.objects.filter(event_id=OuterRef("pk"))
+        .values("event_id")
+        .annotate(names=StringAgg("tag__name", " "))
+        .values("names")
+    )
+
+
+def search_vector_expression():
+    """Документ мероприятия: название (вес A), теги (B) и описание (C)
+    в русской и английской конфигурациях."""
+    vector = None
+    for config in SEARCH_CONFIGS:
+        for expression, weight in (
+            (F("title"), "A"),
+            (_tag_names(), "B"),
+            (F("description"), "C"),
+        ):
+            part = SearchVector(expression, config=config, weight=weight)
+            vector = part if vector is None else vector + part
+    return vector
+
+
+def update_search_vector(event_ids):
+    Event.objects.filter(id__in=event_ids).update(
+        search_vector=search_vector_expression()
+    )
+
+
+def tag_names_expression():
+    return Coalesce(
+        Subquery(
+            Event.tags.through.objects.filter(event_id=OuterRef("pk"))
+            .values("event_id")
+            .annotate(names=ArrayAgg(Lower(Trim("tag__name")), distinct=True))
+            .values("names")
+        ),
+        Value([]),
+        output_field=ArrayField(CharField(max_length=50)),
+    )
+
+
+def normalize_tag_name(name):
+    return name.strip().lower()
+
+
+def update_event_tags(event_ids):
+    """Пересчитывает всё, что зависит от тегов мероприятия: поисковый
+    документ и денормализованный массив имён тегов."""
+    Event.objects.filter(id__in=event_ids).update(
+        search_vector=search_vector_expression(),
+        tag_names=tag_names_expression(),
+        updated_at=timezone.now(),
+    )
+
+
+def build_search_query(terms):
+    query = None
+    for config in SEARCH_CONFIGS:
+        part = SearchQuery(terms, config=config, search_type="websearch")
+        query = part if query is None else query | part
+    return query
+
+
+class EventSearchFilter(SearchFilter):
+    """Полнотекстовый поиск по Event.search_vector (GIN-индекс) вместо
+    ILIKE по полям и тегам. Результаты упорядочены по релевантности."""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = " ".join(self.get_search_terms(request))
+        if not terms:
+            return queryset
+        query = build_search_query(terms)
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(search_rank=SearchRank(F("search_vector"), query))
+            .order_by("-search_rank", *queryset.query.order_by)
+        )
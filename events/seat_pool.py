@@ -0,0 +1,189 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from config.redis import get_redis
+from notifications.tasks import notify
+
+from .exceptions import BookingError
+from .models import Booking, Event
+
+CLAIMED = 1
+SOLD_OUT = 0
+DUPLICATE = -1
+NOT_LOADED = -2
+
+PENDING = "pending"
+CONFIRMED = "confirmed"
+FAILED = "failed"
+
+# Заявка хранится в хеше как "<статус>:<количество мест>".
+
+# KEYS: счётчик мест, хеш заявок user_id -> заявка; ARGV: user_id, количество мест
+CLAIM_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -2
+end
+local claim = redis.call('HGET', KEYS[2], ARGV[1])
+if claim and string.match(claim, '^(%a+):') ~= 'failed' then
+    return -1
+end
+local quantity = tonumber(ARGV[2])
+if redis.call('DECRBY', KEYS[1], quantity) < 0 then
+    redis.call('INCRBY', KEYS[1], quantity)
+    return 0
+end
+redis.call('HSET', KEYS[2], ARGV[1], 'pending:' .. quantity)
+return 1
+"""
+
+# KEYS: счётчик мест, хеш заявок; ARGV: user_id
+RELEASE_SCRIPT = """
+local claim = redis.call('HGET', KEYS[2], ARGV[1])
+if not claim then
+    return 0
+end
+local state, quantity = string.match(claim, '^(%a+):(%d+)$')
+if state == 'failed' then
+    return 0
+end
+redis.call('HDEL', KEYS[2], ARGV[1])
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('INCRBY', KEYS[1], quantity)
+end
+return 1
+"""
+
+# KEYS: счётчик мест, хеш заявок;
+# ARGV: свободные места по БД, затем пары user_id, количество мест из Booking
+REBUILD_SCRIPT = """
+local pending = 0
+local claims = redis.call('HGETALL', KEYS[2])
+for i = 1, #claims, 2 do
+    local state, quantity = string.match(claims[i + 1], '^(%a+):(%d+)$')
+    if state == 'pending' then
+        pending = pending + tonumber(quantity)
+    else
+        redis.call('HDEL', KEYS[2], claims[i])
+    end
+end
+for i = 2, #ARGV, 2 do
+    redis.call('HSET', KEYS[2], ARGV[i], 'confirmed:' .. ARGV[i + 1])
+end
+local free = tonumber(ARGV[1]) - pending
+if free < 0 then
+    free = 0
+end
+redis.call('SET', KEYS[1], free)
+return free
+"""
+
+
+class PoolNotLoaded(Exception):
+    pass
+
+
+class SeatsExhausted(Exception):
+    pass
+
+
+def is_enabled():
+    return get_redis() is not None
+
+
+def _keys(event_id):
+    return [f"seat_pool:{event_id}", f"seat_pool:{event_id}:claims"]
+
+
+def claim(event_id, user_id, quantity=1):
+    client = get_redis()
+    script = client.register_script(CLAIM_SCRIPT)
+    return script(keys=_keys(event_id), args=[user_id, quantity])
+
+
+def release(event_id, user_id):
+    client = get_redis()
+    script = client.register_script(RELEASE_SCRIPT)
+    return bool(script(keys=_keys(event_id), args=[user_id]))
+
+
+def claim_status(event_id, user_id):
+    claim = get_redis().hget(_keys(event_id)[1], user_id)
+    if claim is None:
+        return None
+    return claim.split(":")[0]
+
+
+def _set_claim(event_id, user_id, state, quantity):
+    get_redis().hset(_keys(event_id)[1], user_id, f"{state}:{quantity}")
+
+
+def rebuild(event_id):
+    """Заполняет пул свободными местами по строкам Booking с учётом заявок,
+    которые ещё не записаны в БД."""
+    seats, booked_seats = Event.objects.values_list("seats", "booked_seats").get(
+        id=event_id
+    )
+    bookings = Booking.objects.filter(event_id=event_id).values_list(
+        "user_id", "quantity"
+    )
+    client = get_redis()
+    script = client.register_script(REBUILD_SCRIPT)
+    return script(
+        keys=_keys(event_id),
+        args=[seats - booked_seats, *(value for row in bookings for value in row)],
+    )
+
+
+def drop(event_id):
+    get_redis().delete(*_keys(event_id))
+
+
+def rebuild_all():
+    event_ids = Event.objects.filter(high_demand=True, status="upcoming").values_list(
+        "id", flat=True
+    )
+    for event_id in event_ids:
+        rebuild(event_id)
+    return len(event_ids)
+
+
+def persist_claim(event_id, user_id, quantity=1):
+    """Записывает выигравшую заявку в Booking. Postgres остаётся источником
+    истины: если мест по БД уже нет, заявка отклоняется."""
+    from . import waitlist
+
+    try:
+        with transaction.atomic():
+            booking, created = Booking.objects.get_or_create(
+                user_id=user_id, event_id=event_id, defaults={"quantity": quantity}
+            )
+            if created:
+                claimed = Event.objects.filter(
+                    id=event_id,
+                    status="upcoming",
+                    booked_seats__lte=F("seats") - quantity,
+                ).update(
+                    booked_seats=F("booked_seats") + quantity, updated_at=timezone.now()
+                )
+                if not claimed:
+                    raise SeatsExhausted(event_id)
+                try:
+                    waitlist.take_turn(event_id, user_id, quantity)
+                except BookingError:
+                    # Место остаётся занятым в пуле, пока его не получит
+                    # очередь: promote пересоберёт пул после перевода.
+                    raise SeatsExhausted(event_id)
+                notify(user_id, event_id, "booking", booking.notification_message())
+    except SeatsExhausted:
+        _set_claim(event_id, user_id, FAILED, quantity)
+        return None
+    except IntegrityError:
+        release(event_id, user_id)
+        _set_claim(event_id, user_id, FAILED, quantity)
+        return None
+
+    if not created:
+        release(event_id, user_id)
+    _set_claim(event_id, user_id, CONFIRMED, booking.quantity)
+    return booking
@@ -1,8 +1,10 @@
+from django.db import transaction
 from rest_framework import serializers
 
 from users.serializers import UserSerializer
 
 from .models import Booking, Event, Rating, Tag
+from .tasks import promote_waitlist
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -48,13 +50,49 @@ class EventDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Event
-        fields = "__all__"
+        # Служебные столбцы (счётчики, ключ ленты, поисковые данные) не
+        # выводятся.
+        fields = (
+            "id",
+            "organizer",
+            "tags",
+            "free_seats",
+            "avg_rating",
+            "status",
+            "title",
+            "description",
+            "start_time",
+            "location",
+            "seats",
+            "high_demand",
+            "created_at",
+        )
 
 
 class EventCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Event
-        exclude = ("organizer",)
+        fields = (
+            "id",
+            "title",
+            "description",
+            "start_time",
+            "location",
+            "seats",
+            "status",
+            "high_demand",
+            "created_at",
+            "tags",
+        )
+
+    def update(self, instance, validated_data):
+        old_seats = instance.seats
+        instance = super().update(instance, validated_data)
+        if instance.seats > old_seats:
+            transaction.on_commit(
+                lambda: promote_waitlist.delay(instance.id), robust=True
+            )
+        return instance
 
 
 class BookingSerializer(serializers.ModelSerializer):
@@ -70,7 +108,22 @@ class BookingSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Booking
-        fields = ("id", "event", "booked_at", "message")
+        fields = ("id", "event", "quantity", "booked_at", "message")
+
+
+class BookingItemSerializer(serializers.Serializer):
+    event = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class BulkBookingSerializer(serializers.Serializer):
+    bookings = BookingItemSerializer(many=True, allow_empty=False)
+
+    def validate_bookings(self, value):
+        event_ids = [item["event"] for item in value]
+        if len(event_ids) != len(set(event_ids)):
+            raise serializers.ValidationError("Мероприятия не должны повторяться")
+        return value
 
 
 class RatingSerializer(serializers.ModelSerializer):
@@ -0,0 +1,223 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+from rest_framework import status
+
+from notifications.tasks import notify, notify_many
+
+from . import live, scheduler, seat_pool, waitlist
+from .exceptions import BookingError
+from .models import Booking, Event, Rating, feed_key_expression
+from .tasks import persist_pool_booking
+
+# Флаг high_demand мероприятий, которые процесс уже бронировал: обычные
+# мероприятия идут сразу в БД без запроса к Redis, мероприятия с высоким
+# спросом — сразу в пул мест. Устаревший флаг исправляется на первой брони:
+# пул пропавшего мероприятия отвечает NOT_LOADED, а обычная бронь
+# мероприятия с высоким спросом — HighDemandEvent.
+_high_demand = {}
+HIGH_DEMAND_CACHE_SIZE = 10_000
+
+
+class HighDemandEvent(Exception):
+    def __init__(self, event):
+        super().__init__(event.id)
+        self.event = event
+
+
+def book_event(user, event_id, quantity=1):
+    """Возвращает бронь или None, если заявка из пула мест поставлена в очередь
+    на запись в БД."""
+    pool_checked = False
+    if seat_pool.is_enabled() and _high_demand.get(str(event_id)):
+        try:
+            return book_from_pool(user, event_id, quantity)
+        except seat_pool.PoolNotLoaded:
+            pool_checked = True
+
+    try:
+        if settings.EVENTS_BOOKING_MODE == "conditional":
+            return book_conditionally(user, event_id, quantity)
+        return book_with_lock(user, event_id, quantity)
+    except HighDemandEvent as e:
+        event_id = e.event.id
+    if not pool_checked:
+        try:
+            return book_from_pool(user, event_id, quantity)
+        except seat_pool.PoolNotLoaded:
+            pass
+    # Пул мест пропал (например, после перезапуска Redis) — собираем заново.
+    seat_pool.rebuild(event_id)
+    return book_from_pool(user, event_id, quantity)
+
+
+def book_from_pool(user, event_id, quantity=1):
+    result = seat_pool.claim(event_id, user.id, quantity)
+    if result == seat_pool.NOT_LOADED:
+        raise seat_pool.PoolNotLoaded(event_id)
+    if result == seat_pool.DUPLICATE:
+        raise BookingError("Вы уже зарегистрированы")
+    if result == seat_pool.SOLD_OUT:
+        raise BookingError("Нет свободных мест")
+
+    if settings.EVENTS_FLASH_SALE_PERSIST != "inline":
+        try:
+            persist_pool_booking.delay(event_id, user.id, quantity)
+            return None
+        except OperationalError:
+            # Брокер недоступен: заявка записывается сразу, чтобы занятое в
+            # пуле место не потерялось до пересборки пула.
+            pass
+    try:
+        booking = seat_pool.persist_claim(event_id, user.id, quantity)
+    except Exception:
+        seat_pool.release(event_id, user.id)
+        raise
+    if booking is None:
+        raise BookingError("Нет свободных мест")
+    return booking
+
+
+def _check_regular(event):
+    if len(_high_demand) >= HIGH_DEMAND_CACHE_SIZE:
+        _high_demand.clear()
+    _high_demand[str(event.id)] = event.high_demand
+    if event.high_demand and seat_pool.is_enabled():
+        raise HighDemandEvent(event)
+
+
+def book_with_lock(user, event_id, quantity=1):
+    with transaction.atomic():
+        try:
+            event = Event.objects.select_for_update().get(id=event_id)
+        except Event.DoesNotExist:
+            raise BookingError("Мероприятие не найдено", status.HTTP_404_NOT_FOUND)
+
+        if event.status != "upcoming":
+            raise BookingError("Нельзя бронировать прошедшие/отменённые мероприятия")
+        _check_regular(event)
+
+        if event.free_seats < quantity:
+            raise BookingError("Нет свободных мест")
+
+        booking, created = Booking.objects.get_or_create(
+            user=user, event=event, defaults={"quantity": quantity}
+        )
+        if not created:
+            raise BookingError("Вы уже зарегистрированы")
+        Event.objects.filter(id=event.id).update(
+            booked_seats=F("booked_seats") + quantity, updated_at=timezone.now()
+        )
+        waitlist.take_turn(event.id, user.id, quantity)
+
+        notify(user.id, event.id, "booking", booking.notification_message())
+    return booking
+
+
+def book_conditionally(user, event_id, quantity=1):
+    # Места занимаются одним условным UPDATE без select_for_update: строка
+    # мероприятия блокируется только от UPDATE до COMMIT, а от повторной брони
+    # защищает unique_together на Booking(user, event). Заведомо неуспешные
+    # запросы отсекаются чтением без блокировки и транзакции.
+    event = Event.objects.filter(id=event_id).first()
+    if event is None:
+        raise BookingError("Мероприятие не найдено", status.HTTP_404_NOT_FOUND)
+    if event.status != "upcoming":
+        raise BookingError("Нельзя бронировать прошедшие/отменённые мероприятия")
+    _check_regular(event)
+    if event.free_seats < quantity:
+        raise BookingError("Нет свободных мест")
+
+    try:
+        with transaction.atomic():
+            _claim_seats(event, quantity)
+            # Проверка после UPDATE: строка мероприятия заблокирована, и
+            # отмена брони с переводом из листа ожидания не вклинится.
+            waitlist.take_turn(event.id, user.id, quantity)
+            booking = Booking.objects.create(user=user, event=event, quantity=quantity)
+            notify(user.id, event.id, "booking", booking.notification_message())
+    except IntegrityError:
+        raise BookingError("Вы уже зарегистрированы")
+    return booking
+
+
+def book_events(user, items):
+    """Бронирует несколько мероприятий одной транзакцией: либо все брони
+    создаются, либо ни одной. items — пары (event_id, quantity)."""
+    items = sorted(items)
+    events = Event.objects.in_bulk([event_id for event_id, _ in items])
+    bookings = []
+    try:
+        with transaction.atomic():
+            # Места занимаются в порядке id мероприятий, чтобы параллельные
+            # групповые брони не блокировали друг друга крест-накрест.
+            for event_id, quantity in items:
+                event = events.get(event_id)
+                if event is None:
+                    raise BookingError(
+                        f"Мероприятие {event_id} не найдено",
+                        status.HTTP_404_NOT_FOUND,
+                    )
+                if event.status != "upcoming":
+                    raise BookingError(
+                        "Нельзя бронировать прошедшие/отменённые мероприятия: "
+                        f'"{event.title}"'
+                    )
+                _claim_seats(event, quantity, f'Нет свободных мест: "{event.title}"')
+                waitlist.take_turn(event.id, user.id, quantity)
+                bookings.append(Booking(user=user, event=event, quantity=quantity))
+            Booking.objects.bulk_create(bookings)
+            live.seats_changed(booking.event_id for booking in bookings)
+            scheduler.remind_late_bookings(booking.event for booking in bookings)
+            notify_many(
+                (user.id, booking.event_id, "booking", booking.notification_message())
+                for booking in bookings
+            )
+    except IntegrityError:
+        raise BookingError("Вы уже зарегистрированы на одно из мероприятий")
+
+    for booking in bookings:
+        event_id = booking.event_id
+        if booking.event.high_demand and seat_pool.is_enabled():
+            transaction.on_commit(lambda event_id=event_id: seat_pool.rebuild(event_id))
+    return bookings
+
+
+def _claim_seats(event, quantity, error="Нет свободных мест"):
+    claimed = Event.objects.filter(
+        id=event.id, status="upcoming", booked_seats__lte=F("seats") - quantity
+    ).update(booked_seats=F("booked_seats") + quantity, updated_at=timezone.now())
+    if not claimed:
+        raise BookingError(error)
+
+
+def rate_event(user, event, score):
+    """Сохраняет оценку и сдвигает сумму и число оценок мероприятия на дельту
+    одним UPDATE, без пересчёта среднего по всем оценкам."""
+    with transaction.atomic():
+        rating = (
+            Rating.objects.select_for_update().filter(user=user, event=event).first()
+        )
+        if rating is None:
+            rating = Rating.objects.create(user=user, event=event, score=score)
+            score_delta, count_delta = score, 1
+        else:
+            score_delta, count_delta = score - rating.score, 0
+            rating.score = score
+            rating.save(update_fields=["score"])
+
+        if score_delta or count_delta:
+            avg_rating = Cast(F("rating_sum") + score_delta, FloatField()) / (
+                F("rating_count") + count_delta
+            )
+            Event.objects.filter(id=event.id).update(
+                rating_sum=F("rating_sum") + score_delta,
+                rating_count=F("rating_count") + count_delta,
+                avg_rating=avg_rating,
+                feed_key=feed_key_expression(avg_rating=avg_rating),
+                updated_at=timezone.now(),
+            )
+    return rating
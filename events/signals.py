@@ -0,0 +1,142 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from users.models import TokenUser, User
+
+from . import live, object_cache, scheduler, seat_pool
+from .cache import invalidate_responses
+from .models import Booking, Event, Rating, Tag
+from .search import update_event_tags, update_search_vector
+from .tasks import enqueue_job
+
+
+@receiver(post_save, sender=Event)
+def sync_seat_pool(sender, instance, **kwargs):
+    if not seat_pool.is_enabled():
+        return
+    if instance.high_demand and instance.status == "upcoming":
+        transaction.on_commit(lambda: seat_pool.rebuild(instance.id))
+    else:
+        transaction.on_commit(lambda: seat_pool.drop(instance.id))
+
+
+@receiver(post_save, sender=Event)
+def schedule_event_jobs(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not {"start_time", "status"} & set(update_fields):
+        return
+    for kind, due_at in scheduler.plan(instance):
+        transaction.on_commit(
+            lambda kind=kind, due_at=due_at: enqueue_job(instance.id, kind, due_at),
+            robust=True,
+        )
+
+
+@receiver(post_save, sender=Booking)
+def remind_late_booking(sender, instance, created, **kwargs):
+    if created:
+        scheduler.remind_late_bookings([instance.event])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=TokenUser)
+def touch_organized_events(sender, instance, created, update_fields=None, **kwargs):
+    # Списки и карточки мероприятий содержат имя и email организатора: их
+    # изменение должно менять версию выборки (ETag) и сбрасывать кэши.
+    if created or (update_fields and not {"username", "email"} & set(update_fields)):
+        return
+    event_ids = list(instance.created_events.values_list("id", flat=True))
+    if not event_ids:
+        return
+    Event.objects.filter(id__in=event_ids).update(updated_at=timezone.now())
+    invalidate_responses()
+    object_cache.invalidate(event_ids)
+
+
+@receiver(post_delete, sender=Booking)
+def release_booked_seats(sender, instance, **kwargs):
+    # Удаление брони любым путём — отменой, в админке или каскадом от
+    # пользователя — освобождает её места в счётчике мероприятия и в пуле
+    # мест, где заявка иначе осталась бы подтверждённой.
+    Event.objects.filter(id=instance.event_id).update(
+        booked_seats=F("booked_seats") - instance.quantity, updated_at=timezone.now()
+    )
+    if (
+        seat_pool.is_enabled()
+        and Event.objects.filter(id=instance.event_id, high_demand=True).exists()
+    ):
+        event_id, user_id = instance.event_id, instance.user_id
+        transaction.on_commit(lambda: seat_pool.release(event_id, user_id))
+
+
+@receiver(post_save, sender=Event)
+def sync_event_search_vector(sender, instance, **kwargs):
+    update_search_vector([instance.id])
+
+
+def _tags_changed(event_ids):
+    event_ids = list(event_ids)
+    update_event_tags(event_ids)
+    object_cache.invalidate(event_ids)
+
+
+@receiver(m2m_changed, sender=Event.tags.through)
+def sync_event_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            _tags_changed([instance.id])
+        return
+    if action == "pre_clear":
+        instance._tagged_event_ids = list(instance.events.values_list("id", flat=True))
+    elif action == "post_clear":
+        _tags_changed(instance._tagged_event_ids)
+    elif action in ("post_add", "post_remove"):
+        _tags_changed(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+def sync_renamed_tag(sender, instance, created, **kwargs):
+    if not created:
+        _tags_changed(instance.events.values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tag_events(sender, instance, **kwargs):
+    instance._tagged_event_ids = list(instance.events.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def sync_deleted_tag(sender, instance, **kwargs):
+    _tags_changed(instance._tagged_event_ids)
+
+
+@receiver([post_save, post_delete], sender=Event)
+@receiver([post_save, post_delete], sender=Booking)
+@receiver([post_save, post_delete], sender=Rating)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver(m2m_changed, sender=Event.tags.through)
+def invalidate_response_cache(sender, **kwargs):
+    invalidate_responses()
+
+
+@receiver([post_save, post_delete], sender=Event)
+def invalidate_event_object(sender, instance, **kwargs):
+    object_cache.invalidate([instance.id])
+
+
+@receiver([post_save, post_delete], sender=Booking)
+@receiver([post_save, post_delete], sender=Rating)
+def invalidate_event_object_by_child(sender, instance, **kwargs):
+    object_cache.invalidate([instance.event_id])
+
+
+@receiver(post_save, sender=Event)
+def broadcast_event_seats(sender, instance, **kwargs):
+    live.seats_changed([instance.id])
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def broadcast_booked_seats(sender, instance, **kwargs):
+    live.seats_changed([instance.event_id])
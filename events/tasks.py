@@ -1,12 +1,81 @@
 from celery import shared_task
+from celery.signals import worker_ready
+from django.conf import settings
 from django.utils import timezone
 
-from events.models import Event
+from events import object_cache, scheduler, seat_pool, waitlist
+from events.cache import invalidate_responses
+from events.models import Event, ScheduledJob, feed_key_expression
+from notifications.tasks import send_event_reminders
+
+
+def finish_events(event_ids):
+    """Переводит ожидаемые мероприятия в завершённые."""
+    events = list(
+        Event.objects.filter(id__in=event_ids, status="upcoming").values_list(
+            "id", "high_demand"
+        )
+    )
+    finished_ids = [event_id for event_id, _ in events]
+    Event.objects.filter(id__in=finished_ids).update(
+        status="finished",
+        feed_key=feed_key_expression(status="finished"),
+        updated_at=timezone.now(),
+    )
+    ScheduledJob.objects.filter(event_id__in=finished_ids).delete()
+    if finished_ids:
+        invalidate_responses()
+        object_cache.invalidate(finished_ids)
+    if seat_pool.is_enabled():
+        for event_id, high_demand in events:
+            if high_demand:
+                seat_pool.drop(event_id)
+    return finished_ids
 
 
 @shared_task
 def update_event_status():
     threshold = timezone.now() - timezone.timedelta(hours=2)
-    Event.objects.filter(status="upcoming", start_time__lte=threshold).update(
-        status="finished"
+    finish_events(
+        Event.objects.filter(status="upcoming", start_time__lte=threshold).values_list(
+            "id", flat=True
+        )
     )
+
+
+def enqueue_job(event_id, kind, due_at):
+    run_scheduled_job.apply_async((event_id, kind, due_at.isoformat()), eta=due_at)
+
+
+@shared_task(ignore_result=True)
+def dispatch_scheduled_jobs():
+    while scheduler.claim_due(enqueue_job) == scheduler.BATCH_SIZE:
+        pass
+
+
+@shared_task(ignore_result=True)
+def run_scheduled_job(event_id, kind, due_at):
+    if not scheduler.is_current(event_id, kind, due_at):
+        return
+    if kind == scheduler.FINISH:
+        finish_events([event_id])
+    elif kind == scheduler.REMINDER:
+        send_event_reminders(event_id)
+
+
+@shared_task(ignore_result=True)
+def persist_pool_booking(event_id, user_id, quantity=1):
+    seat_pool.persist_claim(event_id, user_id, quantity)
+
+
+@shared_task(ignore_result=True)
+def promote_waitlist(event_id):
+    _, has_more = waitlist.promote(event_id, settings.EVENTS_WAITLIST_BATCH_SIZE)
+    if has_more:
+        promote_waitlist.delay(event_id)
+
+
+@worker_ready.connect
+def rebuild_seat_pools(**kwargs):
+    if seat_pool.is_enabled():
+        seat_pool.rebuild_all()
@@ -1,7 +1,8 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
 from .apps import EventsConfig
+from .async_views import async_read
 from .views import EventViewSet, TagViewSet
 
 app_name = EventsConfig.name
@@ -10,6 +11,53 @@ router = DefaultRouter()
 router.register("events", EventViewSet, basename="events")
 router.register("tags", TagViewSet, basename="tags")
 
+# Маршруты для ASGI (config.asgi_urls): чтение обслуживается асинхронно,
+# остальные методы — теми же вьюсетами.
+async_urlpatterns = [
+    path(
+        "events/",
+        async_read(
+            EventViewSet,
+            {"get": "list", "post": "create"},
+            basename="events",
+            detail=False,
+        ),
+    ),
+    path(
+        "events/my_upcoming_events/",
+        async_read(
+            EventViewSet,
+            {"get": "my_upcoming_events"},
+            basename="events",
+            detail=False,
+            **EventViewSet.my_upcoming_events.kwargs,
+        ),
+    ),
+    re_path(
+        r"^events/(?P<pk>\d+)/$",
+        async_read(
+            EventViewSet,
+            {
+                "get": "retrieve",
+                "put": "update",
+                "patch": "partial_update",
+                "delete": "destroy",
+            },
+            basename="events",
+            detail=True,
+        ),
+    ),
+    path(
+        "tags/",
+        async_read(
+            TagViewSet,
+            {"get": "list", "post": "create"},
+            basename="tags",
+            detail=False,
+        ),
+    ),
+]
+
 urlpatterns = [
     path("", include(router.urls)),
 ]
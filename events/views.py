@@ -1,21 +1,30 @@
 from django.db import IntegrityError, transaction
-from django.db.models import Avg, Case, DateTimeField, F, IntegerField, Q, Value, When
-from django.db.models.functions import Coalesce
+from django.db.models import F, Prefetch
+from django.urls import reverse
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.filters import SearchFilter
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
-from notifications.tasks import send_notification
+from notifications.tasks import notify
 
+from . import cache, object_cache, seat_pool, waitlist
+from .async_views import AsyncReadMixin, afetch
+from .cache import AnonymousResponseCacheMixin, invalidate_responses
+from .conditional import ConditionalGetMixin
+from .exceptions import BookingError
 from .filters import EventFilter
-from .models import Booking, Event, Rating, Tag
+from .models import Booking, Event, Tag, WaitlistEntry
+from .object_cache import CachedRetrieveMixin
+from .pagination import EventFeedCursorPagination, wants_cursor
 from .permissions import IsOrganizerOrReadOnly
+from .projection import ProjectedListMixin, aserialize, rows, serialize
+from .search import EventSearchFilter
 from .serializers import (
     BookingSerializer,
+    BulkBookingSerializer,
     EventCreateSerializer,
     EventDetailSerializer,
     EventListSerializer,
@@ -23,14 +32,24 @@ from .serializers import (
     TagCreateSerializer,
     TagSerializer,
 )
+from .services import book_event, book_events, rate_event
+from .tasks import promote_waitlist
 
 
-class EventViewSet(viewsets.ModelViewSet):
-    queryset = Event.objects.all().prefetch_related("tags", "organizer", "ratings")
+class EventViewSet(
+    AnonymousResponseCacheMixin,
+    CachedRetrieveMixin,
+    ConditionalGetMixin,
+    ProjectedListMixin,
+    AsyncReadMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Event.objects.all().prefetch_related(
+        Prefetch("tags", queryset=Tag.objects.order_by("id")), "organizer"
+    )
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOrganizerOrReadOnly]
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, EventSearchFilter]
     filterset_class = EventFilter
-    search_fields = ["title", "description", "tags__name"]
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -47,87 +66,37 @@ class EventViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ["update", "partial_update", "destroy"]:
             return [permissions.IsAuthenticated(), IsOrganizerOrReadOnly()]
+        if self.action == "cache_stats":
+            return [permissions.IsAdminUser()]
         return [permissions.IsAuthenticatedOrReadOnly()]
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        queryset = self.filter_queryset(queryset)
-        queryset = queryset.annotate(
-            avg_rating=Coalesce(Avg("ratings__score"), Value(0.0)),
-            status_order=Case(
-                When(status="upcoming", then=Value(0)),
-                default=Value(1),
-                output_field=IntegerField(),
-            ),
-            start_time_asc=Case(
-                When(status="upcoming", then=F("start_time")),
-                default=Value(None),
-                output_field=DateTimeField(),
-            ),
-            start_time_desc=Case(
-                When(~Q(status="upcoming"), then=F("start_time")),
-                default=Value(None),
-                output_field=DateTimeField(),
-            ),
-        ).order_by(
-            "status_order",
-            "start_time_asc",
-            "-start_time_desc",
-            "-avg_rating",
-        )
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if wants_cursor(self.request):
+                self._paginator = EventFeedCursorPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
 
-        return queryset
+    def get_queryset(self):
+        return super().get_queryset().order_by("feed_key", "id")
 
     @action(
         detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated]
     )
     def book(self, request, pk=None):
-        try:
-            with transaction.atomic():
-                event = Event.objects.select_for_update().get(id=pk)
-
-                if event.status != "upcoming":
-                    return Response(
-                        {"error": "Нельзя бронировать прошедшие/отменённые мероприятия"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                if event.free_seats <= 0:
-                    return Response(
-                        {"error": "Нет свободных мест"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                booking, created = Booking.objects.get_or_create(
-                    user=request.user, event=event
-                )
-                if not created:
-                    return Response(
-                        {"error": "Вы уже зарегистрированы"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                send_notification.delay(
-                    request.user.id,
-                    event.id,
-                    "booking",
-                    f'Вы успешно забронировали мероприятие "{event.title}"',
-                )
-                serializer = BookingSerializer(booking)
-
-                return Response(
-                    {
-                        "booking_id": serializer.data["id"],
-                        "booked_at": serializer.data["booked_at"],
-                        "message": serializer.data["message"],
-                    },
-                    status=status.HTTP_201_CREATED,
-                )
-
-        except Event.DoesNotExist:
+        quantity = self._get_quantity(request)
+        if quantity is None:
             return Response(
-                {"error": "Мероприятие не найдено"}, status=status.HTTP_404_NOT_FOUND
+                {"error": "Количество мест должно быть целым числом больше нуля"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
+
+        try:
+            booking = book_event(request.user, pk, quantity)
+        except BookingError as e:
+            return Response({"error": e.message}, status=e.status_code)
         except IntegrityError:
             return Response(
                 {"error": "Ошибка при создании бронирования"},
@@ -140,10 +109,69 @@ class EventViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+        invalidate_responses()
+        if booking is None:
+            return Response(
+                {
+                    "status": "pending",
+                    "status_url": request.build_absolute_uri(
+                        reverse("events:events-booking-status", args=[pk])
+                    ),
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
+
+        serializer = BookingSerializer(booking)
+        return Response(
+            {
+                "booking_id": serializer.data["id"],
+                "booked_at": serializer.data["booked_at"],
+                "quantity": serializer.data["quantity"],
+                "message": serializer.data["message"],
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(
+        detail=False, methods=["post"], permission_classes=[permissions.IsAuthenticated]
+    )
+    def bulk_book(self, request):
+        serializer = BulkBookingSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = [
+            (item["event"], item["quantity"])
+            for item in serializer.validated_data["bookings"]
+        ]
+        try:
+            bookings = book_events(request.user, items)
+        except BookingError as e:
+            return Response({"error": e.message}, status=e.status_code)
+
+        invalidate_responses()
+        object_cache.invalidate(booking.event_id for booking in bookings)
+        return Response(
+            {"bookings": BookingSerializer(bookings, many=True).data},
+            status=status.HTTP_201_CREATED,
+        )
+
+    def _get_quantity(self, request):
+        try:
+            quantity = int(request.data.get("quantity", 1))
+        except (TypeError, ValueError):
+            return None
+        return quantity if quantity > 0 else None
+
     @action(
         detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated]
     )
     def cancel_booking(self, request, pk=None):
+        quantity = self._get_quantity(request)
+        if quantity is None:
+            return Response(
+                {"error": "Количество мест должно быть целым числом больше нуля"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         try:
             with transaction.atomic():
                 event = Event.objects.select_for_update().get(id=pk)
@@ -156,17 +184,35 @@ class EventViewSet(viewsets.ModelViewSet):
                         status=status.HTTP_400_BAD_REQUEST,
                     )
 
-                booking.delete()
+                # Без quantity (или при отмене всех мест) бронь удаляется целиком,
+                # иначе освобождается только часть мест групповой брони.
+                # Места удалённой брони, в том числе в пуле, освобождает сигнал
+                # release_booked_seats.
+                if "quantity" not in request.data or quantity >= booking.quantity:
+                    booking.delete()
+                    message = f'Вы отменили бронирование мероприятия "{event.title}"'
+                else:
+                    booking.quantity -= quantity
+                    booking.save(update_fields=["quantity"])
+                    Event.objects.filter(id=event.id).update(
+                        booked_seats=F("booked_seats") - quantity,
+                        updated_at=timezone.now(),
+                    )
+                    message = (
+                        f"Вы отменили {quantity} из {booking.quantity + quantity} "
+                        f'мест на мероприятие "{event.title}"'
+                    )
+                if booking.pk and event.high_demand and seat_pool.is_enabled():
+                    transaction.on_commit(lambda: seat_pool.rebuild(event.id))
 
-                send_notification.delay(
-                    request.user.id,
-                    event.id,
-                    "cancel",
-                    f'Вы отменили бронирование мероприятия "{event.title}"',
-                )
+                notify(request.user.id, event.id, "cancel", message)
+                if event.waitlist.exists():
+                    transaction.on_commit(
+                        lambda: promote_waitlist.delay(event.id), robust=True
+                    )
+                invalidate_responses()
 
-                return Response({"status": "Бронь отменена"},
-                                status=status.HTTP_200_OK)
+                return Response({"status": "Бронь отменена"}, status=status.HTTP_200_OK)
 
         except Event.DoesNotExist:
             return Response(
@@ -183,18 +229,103 @@ class EventViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    @action(
+        detail=True,
+        methods=["post", "delete"],
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def waitlist(self, request, pk=None):
+        if request.method == "DELETE":
+            deleted, _ = WaitlistEntry.objects.filter(
+                user=request.user, event_id=pk
+            ).delete()
+            if not deleted:
+                return Response(
+                    {"error": "Вас нет в листе ожидания"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            return Response({"status": "Вы покинули лист ожидания"})
+
+        quantity = self._get_quantity(request)
+        if quantity is None:
+            return Response(
+                {"error": "Количество мест должно быть целым числом больше нуля"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            entry = waitlist.join(request.user, pk, quantity)
+        except BookingError as e:
+            return Response({"error": e.message}, status=e.status_code)
+
+        # Если места уже освободились, заявка будет переведена в бронь сразу.
+        transaction.on_commit(
+            lambda: promote_waitlist.delay(entry.event_id), robust=True
+        )
+        return Response(
+            {"position": waitlist.position(entry), "quantity": entry.quantity},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(
+        detail=True, methods=["get"], permission_classes=[permissions.IsAuthenticated]
+    )
+    def booking_status(self, request, pk=None):
+        if seat_pool.is_enabled():
+            claim_status = seat_pool.claim_status(pk, request.user.id)
+            if claim_status == seat_pool.PENDING:
+                return Response({"status": "pending"})
+            if claim_status == seat_pool.FAILED:
+                return Response({"status": "rejected"})
+
+        booking = Booking.objects.filter(user=request.user, event_id=pk).first()
+        if booking is None:
+            return Response(
+                {"error": "Бронирование не найдено"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(
+            {
+                "status": "confirmed",
+                "booking_id": booking.id,
+                "booked_at": BookingSerializer(booking).data["booked_at"],
+            }
+        )
+
+    @action(detail=False, methods=["get"], permission_classes=[permissions.IsAdminUser])
+    def cache_stats(self, request):
+        return Response(
+            {
+                "object_cache": object_cache.get_stats(),
+                "response_cache": cache.get_stats(),
+            }
+        )
+
     @action(
         detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated]
     )
     def my_upcoming_events(self, request):
-        events = self.queryset.filter(
-            bookings__user=request.user,
-            start_time__gte=timezone.now(),
-            status="upcoming",
-        ).distinct()
-        # serializer = EventListSerializer(events, many=True)
-        serializer = self.get_serializer(events, many=True)
-        return Response(serializer.data)
+        events = self._upcoming_events(request)
+        if wants_cursor(request):
+            page = self.paginate_queryset(events.order_by("feed_key", "id"))
+            return self.get_paginated_response(serialize(page))
+        return Response(serialize(events))
+
+    async def amy_upcoming_events(self, request):
+        events = self._upcoming_events(request)
+        if wants_cursor(request):
+            page = await self.apaginate_queryset(events.order_by("feed_key", "id"))
+            return self.get_paginated_response(await aserialize(page))
+        return Response(await aserialize(await afetch(events)))
+
+    def _upcoming_events(self, request):
+        return (
+            rows(self.queryset)
+            .filter(
+                bookings__user=request.user,
+                start_time__gte=timezone.now(),
+                status="upcoming",
+            )
+            .distinct()
+        )
 
     @action(
         detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated]
@@ -219,9 +350,14 @@ class EventViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        rating, _ = Rating.objects.update_or_create(
-            user=request.user, event=event, defaults={"score": score}
-        )
+        try:
+            rating = rate_event(request.user, event, int(score))
+        except IntegrityError:
+            return Response(
+                {"error": "Ошибка при сохранении оценки"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        invalidate_responses()
         return Response(RatingSerializer(rating).data)
 
     def destroy(self, request, *args, **kwargs):
@@ -234,7 +370,13 @@ class EventViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class TagViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, GenericViewSet):
+class TagViewSet(
+    ConditionalGetMixin,
+    AsyncReadMixin,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    GenericViewSet,
+):
     queryset = Tag.objects.all()
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
@@ -0,0 +1,137 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Subquery
+from django.utils import timezone
+from rest_framework import status
+
+from notifications.models import Notification
+from notifications.services import create_notifications
+
+from . import live, object_cache, scheduler, seat_pool
+from .cache import invalidate_responses
+from .exceptions import BookingError
+from .models import Booking, Event, WaitlistEntry
+
+
+def join(user, event_id, quantity=1):
+    event = Event.objects.filter(id=event_id).first()
+    if event is None:
+        raise BookingError("Мероприятие не найдено", status.HTTP_404_NOT_FOUND)
+    if event.status != "upcoming":
+        raise BookingError("Нельзя бронировать прошедшие/отменённые мероприятия")
+    if Booking.objects.filter(user=user, event=event).exists():
+        raise BookingError("Вы уже зарегистрированы")
+    if quantity > event.seats:
+        raise BookingError(f"На мероприятии всего {event.seats} мест")
+    if event.free_seats >= quantity and not event.waitlist.exists():
+        raise BookingError("Есть свободные места: забронируйте их напрямую")
+    try:
+        with transaction.atomic():
+            entry = WaitlistEntry.objects.create(
+                user=user, event=event, quantity=quantity
+            )
+    except IntegrityError:
+        raise BookingError("Вы уже в листе ожидания")
+    return entry
+
+
+def position(entry):
+    return WaitlistEntry.objects.filter(
+        event_id=entry.event_id, id__lte=entry.id
+    ).count()
+
+
+def take_turn(event_id, user_id, quantity):
+    """Вызывается в транзакции брони после захвата quantity мест. Пока в
+    листе ожидания есть заявка, которой хватает освободившихся мест, они
+    принадлежат очереди: напрямую бронировать может только первый из таких,
+    и его заявка при этом удаляется. Заявки больше свободных мест никого
+    не задерживают."""
+    free_seats = Event.objects.filter(id=event_id).values(
+        free=F("seats") - F("booked_seats") + quantity
+    )
+    head = (
+        WaitlistEntry.objects.filter(
+            event_id=event_id, quantity__lte=Subquery(free_seats)
+        )
+        .order_by("id")
+        .values_list("id", "user_id")
+        .first()
+    )
+    if head is None:
+        return
+    if head[1] != user_id:
+        raise BookingError(
+            "Места достаются листу ожидания: встаньте в очередь",
+            status.HTTP_409_CONFLICT,
+        )
+    WaitlistEntry.objects.filter(id=head[0]).delete()
+
+
+def promote(event_id, batch_size):
+    """Переводит заявки листа ожидания в брони по порядку очереди, пропуская
+    те, которым не хватает мест. Брони и уведомления создаются пачками.
+    Возвращает (число переведённых заявок, остались ли в очереди заявки,
+    которые могут пройти)."""
+    with transaction.atomic():
+        event = (
+            Event.objects.select_for_update()
+            .filter(id=event_id, status="upcoming")
+            .first()
+        )
+        if event is None or event.free_seats <= 0:
+            return 0, False
+
+        entries = list(event.waitlist.order_by("id")[:batch_size])
+        booked_users = set(
+            Booking.objects.filter(
+                event=event, user_id__in=[entry.user_id for entry in entries]
+            ).values_list("user_id", flat=True)
+        )
+
+        free_seats = event.free_seats
+        promoted, stale = [], []
+        for entry in entries:
+            if entry.user_id in booked_users:
+                stale.append(entry.id)
+                continue
+            # Группа, которой не хватает мест, ждёт дальше, но не держит
+            # места тех, кто встал позже и помещается.
+            if entry.quantity > free_seats:
+                continue
+            free_seats -= entry.quantity
+            promoted.append(entry)
+
+        if promoted:
+            Booking.objects.bulk_create(
+                Booking(user_id=entry.user_id, event=event, quantity=entry.quantity)
+                for entry in promoted
+            )
+            Event.objects.filter(id=event.id).update(
+                booked_seats=F("booked_seats") + sum(e.quantity for e in promoted),
+                updated_at=timezone.now(),
+            )
+            create_notifications(
+                Notification(
+                    user_id=entry.user_id,
+                    event=event,
+                    type="waitlist",
+                    message=(
+                        "Освободилось место: вы переведены из листа ожидания "
+                        f'в участники мероприятия "{event.title}"'
+                    ),
+                )
+                for entry in promoted
+            )
+            invalidate_responses()
+            object_cache.invalidate([event.id])
+            live.seats_changed([event.id])
+            scheduler.remind_late_bookings([event])
+        WaitlistEntry.objects.filter(
+            id__in=stale + [entry.id for entry in promoted]
+        ).delete()
+
+        if promoted and event.high_demand and seat_pool.is_enabled():
+            transaction.on_commit(lambda: seat_pool.rebuild(event.id))
+
+    has_more = len(entries) == batch_size and free_seats > 0
+    return len(promoted), has_more
@@ -1,10 +1,23 @@
 from django.contrib import admin
 
 from notifications.models import Notification
+from notifications.services import count_unread, shift_unread
 
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ("user", "event", "type", "created_at", "message")
-    list_filter = ("user", "type")
+    list_display = ("user", "event", "type", "is_read", "created_at", "message")
+    list_filter = ("user", "type", "is_read")
     search_fields = ("user__username", "event__title")
+
+    def save_model(self, request, obj, form, change):
+        # Счётчик непрочитанных меняют только create_notifications и
+        # mark_read: правка в админке сдвигает его сама.
+        super().save_model(request, obj, form, change)
+        if not change:
+            count_unread([obj])
+        elif {"user", "is_read"} & set(form.changed_data):
+            if not form.initial["is_read"]:
+                shift_unread(form.initial["user"], -1)
+            if not obj.is_read:
+                shift_unread(obj.user_id, 1)
@@ -0,0 +1,134 @@
+"""Доставка новых уведомлений подключённым клиентам (server-sent events).
+
+Записавший уведомления процесс после коммита публикует их в канал Redis
+CHANNEL; каждый ASGI-процесс держит одну подписку на канал и раскладывает
+сообщения по очередям открытых потоков своих пользователей. Без REDIS_URL
+сообщения доставляются только внутри процесса-писателя."""
+
+import asyncio
+import json
+from collections import defaultdict
+
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from config.redis import get_redis
+
+CHANNEL = "notifications:live"
+
+
+class Hub:
+    """Очереди открытых потоков процесса по ключу (пользователю,
+    мероприятию) с подпиской на канал Redis channel."""
+
+    def __init__(self, channel, queue_size=None):
+        self.channel = channel
+        self.queue_size = queue_size
+        self._queues = defaultdict(set)
+        self._loop = None
+        self._listener = None
+
+    def subscribe(self, key):
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(
+            maxsize=self.queue_size or settings.NOTIFICATIONS_STREAM_QUEUE_SIZE
+        )
+        self._queues[key].add(queue)
+        if settings.REDIS_URL and (self._listener is None or self._listener.done()):
+            self._listener = self._loop.create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, key, queue):
+        queues = self._queues.get(key)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._queues[key]
+
+    def connections(self):
+        return sum(len(queues) for queues in self._queues.values())
+
+    def dispatch(self, key, data):
+        for queue in list(self._queues.get(key, ())):
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                # Клиент не успевает читать: поток закрывается, и клиент
+                # переподключается с Last-Event-ID, дочитывая пропущенное из БД.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def dispatch_threadsafe(self, key, data):
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.dispatch, key, data)
+
+    def publish(self, messages):
+        """Рассылает пары (ключ, данные) всем процессам одним сообщением
+        Redis, а без REDIS_URL — открытым потокам этого процесса."""
+        client = get_redis()
+        if client is None:
+            for key, data in messages:
+                self.dispatch_threadsafe(key, data)
+            return
+        client.publish(self.channel, json.dumps(messages))
+
+    async def _listen(self):
+        while True:
+            try:
+                client = aioredis.Redis.from_url(
+                    settings.REDIS_URL, decode_responses=True
+                )
+                async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        for key, data in json.loads(message["data"]):
+                            self.dispatch(key, data)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Пока подписка восстанавливается, пропущенное клиенты
+                # дочитают при переподключении.
+                await asyncio.sleep(1)
+
+
+hub = Hub(CHANNEL)
+
+
+def _datetime(value):
+    # Как DateTimeField DRF: в текущем часовом поясе, UTC — с суффиксом Z.
+    value = timezone.localtime(value).isoformat()
+    return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+
+def _payload(notification):
+    """Поля NotificationSerializer без накладных расходов DRF на пачку."""
+    return {
+        "id": notification.id,
+        "type_display": notification.get_type_display(),
+        "message": notification.message,
+        "is_read": notification.is_read,
+        "created_at": _datetime(notification.created_at),
+        "updated_at": _datetime(notification.updated_at),
+        "user": notification.user_id,
+        "event": notification.event_id,
+    }
+
+
+def publish(notifications):
+    """Рассылает уведомления после коммита транзакции, в которой они
+    записаны. Без потока уведомлений, а без REDIS_URL — и без открытых
+    потоков в процессе, ничего не делает."""
+    if not notifications or not settings.NOTIFICATIONS_STREAM:
+        return
+    if not settings.REDIS_URL and not hub.connections():
+        return
+
+    def send():
+        hub.publish([(n.user_id, _payload(n)) for n in notifications])
+
+    # Сбой публикации не должен ронять запрос или задачу, уже записавшие
+    # уведомления: клиенты дочитают их при переподключении.
+    transaction.on_commit(send, robust=True)
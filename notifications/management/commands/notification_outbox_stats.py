@@ -0,0 +1,16 @@
+from django.core.management import BaseCommand
+
+from notifications.outbox import get_stats
+
+
+class Command(BaseCommand):
+    help = "Показывает очередь outbox уведомлений и задержку их переноса"
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        self.stdout.write(
+            f"в очереди {stats['pending']}, старейшее ждёт {stats['lag']:.1f} с; "
+            f"перенесено {stats['relayed']} в {stats['batches']} пачках, "
+            f"задержка последней пачки {stats.get('last_lag', 0.0):.1f} с, "
+            f"максимальная {stats['max_lag']:.1f} с"
+        )
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0004_alter_notification_event"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="notification",
+            name="type",
+            field=models.CharField(
+                choices=[
+                    ("booking", "Забронировано"),
+                    ("cancel", "Бронирование отменено"),
+                    ("reminder", "Напоминание"),
+                    ("waitlist", "Место из листа ожидания"),
+                ],
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0017_scheduled_job"),
+        ("notifications", "0007_outbox_notification"),
+        ("users", "0002_alter_user_options_remove_user_city_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UnreadCounter",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("unread", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Счётчик непрочитанных уведомлений",
+                "verbose_name_plural": "Счётчики непрочитанных уведомлений",
+            },
+        ),
+        # Уведомления, созданные до появления статуса, считаются прочитанными:
+        # столбец добавляется со значением по умолчанию True без перезаписи
+        # таблицы, затем умолчание меняется для новых строк.
+        migrations.AddField(
+            model_name="notification",
+            name="is_read",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name="notification",
+            name="is_read",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(fields=["user", "-id"], name="notification_user_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("is_read", False)),
+                fields=["user", "id"],
+                name="notification_unread_idx",
+            ),
+        ),
+    ]
@@ -9,6 +9,7 @@ class Notification(models.Model):
         ("booking", "Забронировано"),
         ("cancel", "Бронирование отменено"),
         ("reminder", "Напоминание"),
+        ("waitlist", "Место из листа ожидания"),
     )
 
     user = models.ForeignKey(
@@ -23,11 +24,53 @@ class Notification(models.Model):
     )
     type = models.CharField(max_length=10, choices=NOTIFICATION_TYPES)
     message = models.TextField()
+    is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.username} - {self.type} - {self.event.title}"
 
     class Meta:
+        indexes = [
+            models.Index(fields=["user", "updated_at"]),
+            models.Index(fields=["user", "-id"], name="notification_user_id_idx"),
+            models.Index(
+                fields=["user", "id"],
+                condition=models.Q(is_read=False),
+                name="notification_unread_idx",
+            ),
+        ]
         verbose_name = "Уведомление"
         verbose_name_plural = "Уведомления"
+
+
+class OutboxNotification(models.Model):
+    """Уведомление, записанное в транзакции бронирования и ещё не
+    перенесённое в Notification задачей relay_outbox."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    event = models.ForeignKey(
+        Event, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    type = models.CharField(max_length=10, choices=Notification.NOTIFICATION_TYPES)
+    message = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Уведомление в очереди"
+        verbose_name_plural = "Очередь уведомлений"
+
+
+class UnreadCounter(models.Model):
+    """Число непрочитанных уведомлений пользователя. Отсутствие строки
+    означает ноль."""
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+    unread = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Счётчик непрочитанных уведомлений"
+        verbose_name_plural = "Счётчики непрочитанных уведомлений"
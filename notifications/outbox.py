@@ -0,0 +1,93 @@
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import Notification, OutboxNotification
+from .services import BATCH_SIZE, create_notifications
+
+RELAY_REQUESTED_KEY = "notifications:outbox:relay_requested"
+STATS_KEY = "notifications:outbox:stats"
+
+logger = logging.getLogger(__name__)
+
+
+def add(user_id, event_id, notification_type, message):
+    """Записывает уведомление в outbox. Вызывается внутри транзакции
+    бронирования: при её откате уведомление исчезнет вместе с бронью."""
+    add_many([(user_id, event_id, notification_type, message)])
+
+
+def add_many(items):
+    OutboxNotification.objects.bulk_create(
+        OutboxNotification(
+            user_id=user_id, event_id=event_id, type=notification_type, message=message
+        )
+        for user_id, event_id, notification_type, message in items
+    )
+
+
+def request_relay(relay_task):
+    """Ставит задачу переноса, если она ещё не стоит в очереди, чтобы поток
+    броней не превращался в поток одинаковых задач."""
+    if cache.add(RELAY_REQUESTED_KEY, 1, timeout=60):
+        try:
+            relay_task.delay()
+        except Exception:
+            # Задача не поставлена — следующая бронь попробует снова.
+            cache.delete(RELAY_REQUESTED_KEY)
+            raise
+
+
+def relay(batch_size=BATCH_SIZE):
+    """Переносит уведомления из outbox в Notification пачками. Параллельные
+    вызовы пропускают заблокированные строки. Возвращает число уведомлений."""
+    cache.delete(RELAY_REQUESTED_KEY)
+    relayed = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                OutboxNotification.objects.select_for_update(skip_locked=True)
+                .order_by("id")
+                .values_list(
+                    "id", "user_id", "event_id", "type", "message", "created_at"
+                )[:batch_size]
+            )
+            if not rows:
+                return relayed
+            create_notifications(
+                Notification(
+                    user_id=user_id,
+                    event_id=event_id,
+                    type=notification_type,
+                    message=message,
+                )
+                for _, user_id, event_id, notification_type, message, _ in rows
+            )
+            OutboxNotification.objects.filter(id__in=[row[0] for row in rows]).delete()
+        _record(len(rows), timezone.now() - rows[0][5])
+        logger.debug("Перенесено из outbox %s уведомлений", len(rows))
+        relayed += len(rows)
+        if len(rows) < batch_size:
+            return relayed
+
+
+def _record(count, lag):
+    stats = cache.get(STATS_KEY) or {"relayed": 0, "batches": 0, "max_lag": 0.0}
+    stats["relayed"] += count
+    stats["batches"] += 1
+    stats["last_lag"] = lag.total_seconds()
+    stats["max_lag"] = max(stats["max_lag"], stats["last_lag"])
+    cache.set(STATS_KEY, stats, timeout=None)
+
+
+def get_stats():
+    """Очередь outbox и задержка переноса: текущая — возраст самого старого
+    неперенесённого уведомления, last_lag и max_lag — для перенесённых пачек."""
+    oldest = OutboxNotification.objects.aggregate(oldest=Min("created_at"))["oldest"]
+    stats = cache.get(STATS_KEY) or {"relayed": 0, "batches": 0, "max_lag": 0.0}
+    stats["pending"] = OutboxNotification.objects.count()
+    stats["lag"] = (timezone.now() - oldest).total_seconds() if oldest else 0.0
+    return stats
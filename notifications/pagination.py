@@ -0,0 +1,7 @@
+from rest_framework.pagination import CursorPagination
+
+
+class NotificationCursorPagination(CursorPagination):
+    """Keyset-пагинация уведомлений пользователя по индексу (user, -id)."""
+
+    ordering = "-id"
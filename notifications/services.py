@@ -0,0 +1,76 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import live
+from .models import Notification, UnreadCounter
+
+BATCH_SIZE = 1000
+
+
+def create_notifications(notifications):
+    """Записывает уведомления одной пачкой вставок вместо отдельной задачи
+    send_notification на каждое."""
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create(
+            notifications, batch_size=BATCH_SIZE
+        )
+        count_unread(notifications)
+        live.publish(notifications)
+    return notifications
+
+
+def count_unread(notifications):
+    """Увеличивает счётчики непрочитанных на число новых уведомлений
+    каждого пользователя: по одному UPDATE на каждое различное приращение."""
+    per_user = Counter(n.user_id for n in notifications if not n.is_read)
+    if not per_user:
+        return
+    UnreadCounter.objects.bulk_create(
+        [UnreadCounter(user_id=user_id) for user_id in sorted(per_user)],
+        ignore_conflicts=True,
+    )
+    by_delta = {}
+    for user_id, delta in sorted(per_user.items()):
+        by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        UnreadCounter.objects.filter(user_id__in=user_ids).update(
+            unread=F("unread") + delta
+        )
+
+
+def shift_unread(user_id, delta):
+    """Сдвигает счётчик непрочитанных пользователя на delta, не ниже нуля:
+    для уведомлений, удалённых или изменённых мимо mark_read."""
+    if delta > 0:
+        UnreadCounter.objects.bulk_create(
+            [UnreadCounter(user_id=user_id)], ignore_conflicts=True
+        )
+    UnreadCounter.objects.filter(user_id=user_id).update(
+        unread=Greatest(F("unread") + delta, Value(0))
+    )
+
+
+def get_unread_count(user):
+    return (
+        UnreadCounter.objects.filter(user=user).values_list("unread", flat=True).first()
+        or 0
+    )
+
+
+def mark_read(user, up_to=None):
+    """Отмечает прочитанными все непрочитанные уведомления пользователя или
+    только с id не больше up_to. Возвращает число отмеченных."""
+    notifications = Notification.objects.filter(user=user, is_read=False)
+    if up_to is not None:
+        notifications = notifications.filter(id__lte=up_to)
+    with transaction.atomic():
+        marked = notifications.update(is_read=True, updated_at=timezone.now())
+        if marked:
+            UnreadCounter.objects.filter(user=user).update(
+                unread=Greatest(F("unread") - marked, Value(0))
+            )
+    return marked
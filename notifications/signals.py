@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Notification
+from .services import shift_unread
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    # Удаление в админке или каскадом не проходит через mark_read.
+    if not instance.is_read:
+        shift_unread(instance.user_id, -1)
@@ -0,0 +1,181 @@
+import atexit
+import logging
+import os
+import threading
+import time
+
+from celery.signals import worker_process_shutdown, worker_shutdown
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+from events.models import Event
+from users.models import User
+
+from . import live
+from .models import Notification
+from .services import count_unread, create_notifications
+
+logger = logging.getLogger(__name__)
+
+# Сколько пачек не записанных из-за ошибки уведомлений буфер держит для
+# повторной записи; более старые отбрасываются.
+REQUEUE_BATCHES = 10
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_wakeup = threading.Condition(_lock)
+_buffer = []
+_first_added_at = None
+_flusher_pid = None
+
+
+def add(user_id, event_id, notification_type, message):
+    """Кладёт уведомление в буфер процесса. Буфер записывается одной пачкой,
+    когда в нём набирается NOTIFICATIONS_SINK_BATCH_SIZE уведомлений или
+    самое старое из них ждёт дольше NOTIFICATIONS_SINK_FLUSH_MS."""
+    global _first_added_at
+    _ensure_flusher()
+    with _lock:
+        if not _buffer:
+            _first_added_at = time.monotonic()
+        _buffer.append(
+            Notification(
+                user_id=user_id,
+                event_id=event_id,
+                type=notification_type,
+                message=message,
+            )
+        )
+        full = len(_buffer) >= settings.NOTIFICATIONS_SINK_BATCH_SIZE
+        if len(_buffer) == 1:
+            _wakeup.notify()
+    if full:
+        flush()
+
+
+def _take():
+    global _first_added_at
+    with _lock:
+        batch = _buffer[:]
+        _buffer.clear()
+        _first_added_at = None
+    return batch
+
+
+def _requeue(batch):
+    """Возвращает не записанную пачку в начало буфера, чтобы следующий сброс
+    повторил запись."""
+    global _first_added_at
+    for notification in batch:
+        notification.pk = None
+        notification._state.adding = True
+    with _lock:
+        _buffer[:0] = batch
+        limit = settings.NOTIFICATIONS_SINK_BATCH_SIZE * REQUEUE_BATCHES
+        dropped = len(_buffer) - limit
+        if dropped > 0:
+            del _buffer[:dropped]
+            logger.error("Буфер уведомлений переполнен, отброшено %s", dropped)
+        _first_added_at = time.monotonic()
+
+
+def _write(batch):
+    try:
+        with transaction.atomic():
+            Notification.objects.bulk_create(batch)
+            # Внешние ключи проверяются сразу, а не при коммите внешней
+            # транзакции, чтобы ошибку можно было обработать здесь.
+            connection.check_constraints()
+            count_unread(batch)
+            live.publish(batch)
+    except IntegrityError:
+        # Пользователь или мероприятие удалены, пока уведомление было в очереди:
+        # такие уведомления отбрасываются или теряют ссылку на мероприятие,
+        # как при удалении после записи.
+        user_ids = set(
+            User.objects.filter(id__in={n.user_id for n in batch}).values_list(
+                "id", flat=True
+            )
+        )
+        event_ids = set(
+            Event.objects.filter(
+                id__in={n.event_id for n in batch if n.event_id}
+            ).values_list("id", flat=True)
+        )
+        batch = [n for n in batch if n.user_id in user_ids]
+        for notification in batch:
+            notification.pk = None
+            if notification.event_id not in event_ids:
+                notification.event_id = None
+        create_notifications(batch)
+    return batch
+
+
+def flush():
+    """Записывает накопленные уведомления. Возвращает их количество."""
+    with _flush_lock:
+        batch = _take()
+        if not batch:
+            return 0
+        try:
+            batch = _write(batch)
+        except Exception:
+            logger.exception("Не удалось записать %s уведомлений", len(batch))
+            _requeue(batch)
+            raise
+    logger.debug("Записано из буфера %s уведомлений", len(batch))
+    return len(batch)
+
+
+def pending():
+    with _lock:
+        return len(_buffer)
+
+
+def _run_flusher():
+    while True:
+        with _lock:
+            while True:
+                if not _buffer:
+                    _wakeup.wait()
+                    continue
+                delay = (
+                    _first_added_at
+                    + settings.NOTIFICATIONS_SINK_FLUSH_MS / 1000
+                    - time.monotonic()
+                )
+                if delay <= 0:
+                    break
+                _wakeup.wait(delay)
+        try:
+            flush()
+        except Exception:
+            # Пачка возвращена в буфер и будет записана следующим сбросом.
+            time.sleep(settings.NOTIFICATIONS_SINK_FLUSH_MS / 1000)
+        finally:
+            # По таймеру пишутся только редкие неполные пачки, держать
+            # для них отдельное соединение не нужно.
+            connection.close()
+
+
+def _ensure_flusher():
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+        # После fork буфер родителя принадлежит родителю.
+        _buffer.clear()
+    threading.Thread(target=_run_flusher, name="notification-sink", daemon=True).start()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def flush_on_shutdown(**kwargs):
+    if pending():
+        flush()
+
+
+atexit.register(flush_on_shutdown)
@@ -0,0 +1,204 @@
+"""Поток уведомлений /api/notifications/stream/ (server-sent events).
+
+Обслуживается ASGI-приложением напрямую, минуя стек Django: обработчик
+Django держит на каждый запрос отдельный поток для синхронного кода, и
+каждое открытое соединение занимало бы его, пока ждёт уведомлений. Здесь
+к БД обращаются только проверка токена и чтение пропущенных уведомлений,
+в общем пуле потоков, а ожидание — корутина на событийном цикле."""
+
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .live import hub
+from .models import Notification
+from .serializers import NotificationSerializer
+
+PATH = re.compile(r"^/api/notifications/stream/$")
+
+
+def _authenticate(header, token):
+    auth = JWTAuthentication()
+    try:
+        if token is None:
+            token = auth.get_raw_token(header.encode()) if header else None
+        if token is None:
+            return None
+        return auth.get_user(auth.get_validated_token(token)).id
+    except (AuthenticationFailed, InvalidToken):
+        return None
+    finally:
+        # Соединение с БД не держится за открытым потоком.
+        connection.close()
+
+
+def _backlog(user_id, last_id):
+    notifications = Notification.objects.filter(user_id=user_id, id__gt=last_id)
+    try:
+        return NotificationSerializer(
+            notifications.order_by("id")[: settings.NOTIFICATIONS_STREAM_BACKLOG],
+            many=True,
+        ).data
+    finally:
+        connection.close()
+
+
+def _event(data):
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"id: {data['id']}\nevent: notification\ndata: {payload}\n\n".encode()
+
+
+def cors_headers(headers):
+    origin = headers.get("origin")
+    if origin in settings.CORS_ALLOWED_ORIGINS:
+        return [
+            (b"access-control-allow-origin", origin.encode()),
+            (b"vary", b"Origin"),
+        ]
+    return []
+
+
+def parse_request(scope):
+    """Заголовки запроса словарём с именами в нижнем регистре и параметры
+    строки запроса."""
+    headers = {
+        name.decode("latin-1"): value.decode("latin-1")
+        for name, value in scope["headers"]
+    }
+    return headers, parse_qs(scope["query_string"].decode())
+
+
+async def respond(send, status, detail, headers):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json")] + headers,
+        }
+    )
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode()
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _once(body):
+    yield body
+
+
+async def _wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def pump(receive, send, queue, headers, encode, first=b""):
+    """Отдаёт клиенту поток: сначала first (байты или асинхронный итератор
+    частей), затем сообщения очереди, преобразованные encode (None —
+    пропустить), и комментарий-пинг раз в NOTIFICATIONS_STREAM_HEARTBEAT
+    секунд. Заканчивается, когда клиент отключился или в очереди появился
+    None."""
+    disconnect = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ]
+                + headers,
+            }
+        )
+        if isinstance(first, bytes):
+            first = _once(first)
+        async for body in first:
+            if body:
+                await send(
+                    {"type": "http.response.body", "body": body, "more_body": True}
+                )
+
+        while True:
+            get = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {get, disconnect},
+                timeout=settings.NOTIFICATIONS_STREAM_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnect in done:
+                get.cancel()
+                return
+            if get not in done:
+                get.cancel()
+                body = b": ping\n\n"
+            else:
+                data = get.result()
+                if data is None:
+                    break
+                body = encode(data)
+                if body is None:
+                    continue
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        disconnect.cancel()
+
+
+async def application(scope, receive, send):
+    """Открывает поток уведомлений пользователя. Токен передаётся заголовком
+    Authorization или параметром access_token (EventSource не умеет
+    заголовки). Клиент, переподключившийся с Last-Event-ID или ?last_id=,
+    сначала получает пропущенные уведомления."""
+    headers, query = parse_request(scope)
+    cors = cors_headers(headers)
+
+    user_id = await sync_to_async(_authenticate, thread_sensitive=False)(
+        headers.get("authorization"), query.get("access_token", [None])[0]
+    )
+    if user_id is None:
+        return await respond(send, 401, "Требуется действительный токен.", cors)
+    last_id = headers.get("last-event-id") or query.get("last_id", [None])[0]
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return await respond(send, 400, "last_id должен быть целым числом.", cors)
+
+    sent_id = 0
+
+    async def backlog():
+        # Страницы по NOTIFICATIONS_STREAM_BACKLOG читаются, пока не кончатся:
+        # живые уведомления идут только после всех пропущенных.
+        nonlocal sent_id
+        if last_id is None:
+            return
+        while True:
+            page = await sync_to_async(_backlog, thread_sensitive=False)(
+                user_id, max(last_id, sent_id)
+            )
+            if page:
+                sent_id = page[-1]["id"]
+                yield b"".join(_event(data) for data in page)
+            if len(page) < settings.NOTIFICATIONS_STREAM_BACKLOG:
+                return
+
+    # Подписка до чтения пропущенного: уведомление, записанное между ними,
+    # не потеряется, а повтор отсекается по id.
+    queue = hub.subscribe(user_id)
+    try:
+        await pump(
+            receive,
+            send,
+            queue,
+            cors,
+            lambda data: _event(data) if data["id"] > sent_id else None,
+            first=backlog(),
+        )
+    finally:
+        hub.unsubscribe(user_id, queue)
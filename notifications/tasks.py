@@ -1,41 +1,107 @@
 from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
 
-from events.models import Event
+from events.models import Booking, Event
 from users.models import User
 
+from . import outbox, sink
 from .models import Notification
+from .services import BATCH_SIZE, create_notifications
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def send_notification(user_id, event_id, notification_type, message):
+    if settings.NOTIFICATIONS_WRITE_MODE == "sink":
+        sink.add(user_id, event_id, notification_type, message)
+        return
+
     user = User.objects.get(id=user_id)
     event = None
     if event_id is not None:
         event = Event.objects.get(id=event_id)
 
-    Notification.objects.create(
-        user=user, event=event, type=notification_type, message=message
+    create_notifications(
+        [Notification(user=user, event=event, type=notification_type, message=message)]
     )
     print(f"Уведомление пользователю {user_id}: {message}")
 
 
+def notify(user_id, event_id, notification_type, message):
+    """Ставит уведомление в outbox в текущей транзакции; в Notification
+    его перенесёт relay_outbox после коммита."""
+    notify_many([(user_id, event_id, notification_type, message)])
+
+
+def notify_many(items):
+    outbox.add_many(items)
+    # Бронь уже закоммичена: недоступный брокер не должен превращать её в
+    # ошибку запроса, уведомления перенесёт relay_notification_outbox.
+    transaction.on_commit(lambda: outbox.request_relay(relay_outbox), robust=True)
+
+
+@shared_task(ignore_result=True)
+def relay_outbox():
+    return outbox.relay()
+
+
 @shared_task
 def send_reminder_notifications():
     now = timezone.now()
     one_hour_later = now + timezone.timedelta(hours=1)
 
-    events = Event.objects.prefetch_related("bookings").filter(
-        status="upcoming", start_time__range=(now, one_hour_later)
+    pending = Booking.objects.filter(
+        event_id=OuterRef("pk"), reminder_sent_at__isnull=True
+    )
+    event_ids = (
+        Event.objects.filter(status="upcoming", start_time__range=(now, one_hour_later))
+        .filter(Exists(pending))
+        .values_list("id", flat=True)
+    )
+    for event_id in event_ids:
+        send_event_reminders.delay(event_id)
+
+
+@shared_task(ignore_result=True)
+def send_event_reminders(event_id):
+    """Создаёт напоминания участникам мероприятия, которым они ещё не
+    отправлялись. Пачка броней помечается отправленной в одной транзакции
+    с записью уведомлений, поэтому повторный или параллельный запуск задачи
+    не создаёт дублей."""
+    event = Event.objects.filter(id=event_id).values("title", "start_time").first()
+    if event is None:
+        return 0
+    message = (
+        f"Напоминание: мероприятие {event['title']} начнется через час."
+        f"Время начала мероприятия: {timezone.localtime(event['start_time']).strftime('%H:%M')}."
     )
 
-    for event in events:
-        bookings = event.bookings.all()
-        for booking in bookings:
-            send_notification.delay(
-                booking.user.id,
-                event.id,
-                "reminder",
-                f"Напоминание: мероприятие {event.title} начнется через час."
-                f"Время начала мероприятия: {timezone.localtime(event.start_time).strftime('%H:%M')}.",
+    created = 0
+    while True:
+        with transaction.atomic():
+            bookings = list(
+                Booking.objects.filter(event_id=event_id, reminder_sent_at__isnull=True)
+                .select_for_update(skip_locked=True)
+                .values_list("id", "user_id", "quantity")[:BATCH_SIZE]
+            )
+            if not bookings:
+                return created
+            Booking.objects.filter(id__in=[row[0] for row in bookings]).update(
+                reminder_sent_at=timezone.now()
             )
+            notifications = []
+            for _, user_id, quantity in bookings:
+                text = message
+                if quantity > 1:
+                    text += f" Забронировано мест: {quantity}."
+                notifications.append(
+                    Notification(
+                        user_id=user_id,
+                        event_id=event_id,
+                        type="reminder",
+                        message=text,
+                    )
+                )
+            created += len(create_notifications(notifications))
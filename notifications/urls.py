@@ -1,6 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from events.async_views import async_read
+
 from .apps import NotificationsConfig
 from .views import NotificationViewSet
 
@@ -9,6 +11,18 @@ app_name = NotificationsConfig.name
 router = DefaultRouter()
 router.register("", NotificationViewSet, basename="notifications")
 
+async_urlpatterns = [
+    path(
+        "",
+        async_read(
+            NotificationViewSet,
+            {"get": "list"},
+            basename="notifications",
+            detail=False,
+        ),
+    ),
+]
+
 urlpatterns = [
     path("", include(router.urls)),
 ]
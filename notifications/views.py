@@ -1,13 +1,53 @@
-from rest_framework import permissions, viewsets
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from events.async_views import AsyncReadMixin
+from events.conditional import ConditionalGetMixin
+from events.pagination import wants_cursor
 
 from .models import Notification
+from .pagination import NotificationCursorPagination
 from .serializers import NotificationSerializer
+from .services import get_unread_count, mark_read
 
 
-class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+class NotificationViewSet(
+    ConditionalGetMixin, AsyncReadMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if wants_cursor(self.request):
+                self._paginator = NotificationCursorPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user)
+        queryset = self.queryset.filter(user=self.request.user).order_by("-id")
+        if self.request.query_params.get("unread") in ("1", "true"):
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+    @action(detail=False, methods=["get"])
+    def unread_count(self, request):
+        return Response({"unread": get_unread_count(request.user)})
+
+    @action(detail=False, methods=["post"])
+    def mark_read(self, request):
+        up_to = request.data.get("up_to")
+        if up_to is not None:
+            try:
+                up_to = int(up_to)
+            except (TypeError, ValueError):
+                return Response(
+                    {"error": "up_to должен быть целым числом"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        marked = mark_read(request.user, up_to)
+        return Response({"marked": marked, "unread": get_unread_count(request.user)})
@@ -1,9 +1,56 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+import fakeredis
 import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, router, transaction
+from django.db.models import F
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
 from django.utils import timezone
+from kombu.exceptions import OperationalError
+from psycopg_pool import ConnectionPool
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-from events.models import Event
+from config import db_pool, db_router
+from config import redis as config_redis
+from config.asgi import application
+from config.db_router import replica_reads_middleware
+from events import live, object_cache, seat_pool
+from events.cache import get_stats
+from events.models import (
+    Booking,
+    Event,
+    ScheduledJob,
+    Tag,
+    WaitlistEntry,
+    feed_key,
+    feed_key_expression,
+)
+from events.pagination import EventFeedCursorPagination
+from events.projection import rows, serialize
+from events.serializers import EventListSerializer
+from events.tasks import (
+    dispatch_scheduled_jobs,
+    persist_pool_booking,
+    promote_waitlist,
+    run_scheduled_job,
+    update_event_status,
+)
+from events.views import EventViewSet
+from notifications.models import Notification
+from notifications.tasks import relay_outbox, send_event_reminders
 from users.models import User
 
 pytestmark = pytest.mark.django_db
@@ -87,6 +134,53 @@ class TestEventAPI:
         assert response.status_code == status.HTTP_200_OK
         assert response.data["title"] == "Обновленное тестовое мероприятие"
 
+    def test_edit_keeps_concurrent_booked_seats(self):
+        stale = Event.objects.get(id=self.event.id)
+        # Бронь, закоммиченная между чтением и сохранением правки.
+        Event.objects.filter(id=self.event.id).update(
+            booked_seats=F("booked_seats") + 2
+        )
+        stale.title = "Правка организатора"
+        stale.save()
+        assert stale.booked_seats == 2
+        self.event.refresh_from_db()
+        assert self.event.booked_seats == 2
+        assert self.event.title == "Правка организатора"
+
+    def test_edit_keeps_concurrent_rating(self):
+        stale = Event.objects.get(id=self.event.id)
+        Event.objects.filter(id=self.event.id).update(
+            rating_sum=5, rating_count=1, avg_rating=5.0
+        )
+        stale.start_time += timezone.timedelta(hours=1)
+        stale.save()
+        self.event.refresh_from_db()
+        assert (self.event.rating_sum, self.event.rating_count) == (5, 1)
+        assert self.event.avg_rating == 5.0
+        assert self.event.feed_key == feed_key("upcoming", stale.start_time, 5.0)
+        assert stale.feed_key == self.event.feed_key
+
+    def test_internal_columns_are_hidden(self):
+        internal = {
+            "booked_seats",
+            "rating_sum",
+            "rating_count",
+            "feed_key",
+            "search_vector",
+            "tag_names",
+            "updated_at",
+        }
+        response = self.client.get(f"/api/events/{self.event.id}/")
+        assert not internal & response.data.keys()
+        assert response.data["free_seats"] == 2
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.patch(
+            f"/api/events/{self.event.id}/", {"title": "Без служебных полей"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert not internal & response.data.keys()
+
     def test_delete_event_within_hour(self):
         self.event.created_at = timezone.now() - timezone.timedelta(minutes=5)
         self.event.save()
@@ -201,3 +295,1452 @@ class TestEventAPI:
         assert response.status_code == status.HTTP_400_BAD_REQUEST
         assert response.data == {"error": "Оцените событие от 1 до 5 "}
 
+    def _create_events(self, count):
+        # Через save(), как в API: bulk_create не заполняет feed_key.
+        for i in range(count):
+            Event.objects.create(
+                title=f"Мероприятие {i}",
+                description="Описание",
+                start_time=timezone.now() + timezone.timedelta(days=2, minutes=i),
+                location="Москва",
+                seats=10,
+                organizer=self.organizer,
+            )
+
+    def _count_list_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/api/events/")
+        assert response.status_code == status.HTTP_200_OK
+        return len(context.captured_queries), len(response.data["results"])
+
+    def test_list_events_query_count_is_constant(self):
+        self.client.force_authenticate(user=self.user)
+        small_queries, small_page = self._count_list_queries()
+        self._create_events(20)
+        assert not Event.objects.filter(feed_key=0).exists()
+        full_queries, full_page = self._count_list_queries()
+        assert small_page == 1
+        assert full_page == 10
+        assert full_queries == small_queries
+
+    def test_booked_seats_counter(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.post(f"/api/events/{self.event.id}/book/")
+        self.event.refresh_from_db()
+        assert self.event.booked_seats == 1
+        assert self.event.free_seats == 1
+
+        self.client.post(f"/api/events/{self.event.id}/cancel_booking/")
+        self.event.refresh_from_db()
+        assert self.event.booked_seats == 0
+        assert self.event.free_seats == 2
+
+    def test_deleted_user_releases_booked_seats(self):
+        self.client.force_authenticate(user=self.organizer)
+        self.client.post(f"/api/events/{self.event.id}/book/", {"quantity": 2})
+        self.event.refresh_from_db()
+        assert self.event.booked_seats == 2
+
+        self.organizer.delete()
+        self.event.refresh_from_db()
+        assert self.event.booked_seats == 0
+        assert self.event.free_seats == 2
+
+    def test_recount_booked_seats_command(self):
+        Booking.objects.create(user=self.user, event=self.event)
+        Booking.objects.create(user=self.organizer, event=self.event)
+        call_command("recount_booked_seats", stdout=StringIO())
+        self.event.refresh_from_db()
+        assert self.event.booked_seats == 2
+        assert self.event.free_seats == 0
+
+    def test_conditional_book_event(self, settings):
+        settings.EVENTS_BOOKING_MODE = "conditional"
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(f"/api/events/{self.event.id}/book/")
+        assert response.status_code == status.HTTP_201_CREATED
+
+        response = self.client.post(f"/api/events/{self.event.id}/book/")
+        assert response.data == {"error": "Вы уже зарегистрированы"}
+        self.event.refresh_from_db()
+        assert self.event.booked_seats == 1
+
+    def test_conditional_book_rejections(self, settings):
+        settings.EVENTS_BOOKING_MODE = "conditional"
+        self.client.force_authenticate(user=self.user)
+        self.event.seats = 0
+        self.event.save()
+        response = self.client.post(f"/api/events/{self.event.id}/book/")
+        assert response.data == {"error": "Нет свободных мест"}
+        assert not Booking.objects.filter(event=self.event).exists()
+
+        self.event.status = "finished"
+        self.event.save()
+        response = self.client.post(f"/api/events/{self.event.id}/book/")
+        assert response.data == {
+            "error": "Нельзя бронировать прошедшие/отменённые мероприятия"
+        }
+
+        response = self.client.post(f"/api/events/{self.event.id + 1}/book/")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(config_redis, "_client", client)
+    return client
+
+
+class TestHighDemandBooking:
+    @pytest.fixture(autouse=True)
+    def setup(self, fake_redis, monkeypatch, django_capture_on_commit_callbacks):
+        self.redis = fake_redis
+        # Брокера в тестах нет: записываем поставленные задачи вместо отправки.
+        self.queued = []
+        monkeypatch.setattr(
+            persist_pool_booking, "delay", lambda *args: self.queued.append(args)
+        )
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="fan", password="fan")
+        self.other = User.objects.create_user(username="fan2", password="fan2")
+        with django_capture_on_commit_callbacks(execute=True):
+            self.event = Event.objects.create(
+                title="Концерт",
+                description="Аншлаг",
+                start_time=timezone.now() + timezone.timedelta(days=1),
+                location="Москва",
+                seats=1,
+                high_demand=True,
+                organizer=self.other,
+            )
+
+    def test_pool_is_loaded_on_save(self):
+        assert self.redis.get(f"seat_pool:{self.event.id}") == "1"
+
+    def test_book_is_queued_and_persisted(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(f"/api/events/{self.event.id}/book/")
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data["status_url"].endswith(
+            f"/api/events/{self.event.id}/booking_status/"
+        )
+        assert not Booking.objects.filter(event=self.event).exists()
+        response = self.client.get(response.data["status_url"])
+        assert response.data == {"status": "pending"}
+
+        assert self.queued == [(self.event.id, self.user.id, 1)]
+        persist_pool_booking(*self.queued[0])
+        self.event.refresh_from_db()
+        assert self.event.booked_seats == 1
+        response = self.client.get(f"/api/events/{self.event.id}/booking_status/")
+        assert response.data["status"] == "confirmed"
+
+    def test_sold_out_is_rejected_without_database(self, django_assert_num_queries):
+        self.client.force_authenticate(user=self.user)
+        self.client.post(f"/api/events/{self.event.id}/book/")
+        self.client.force_authenticate(user=self.other)
+        with django_assert_num_queries(0):
+            response = self.client.post(f"/api/events/{self.event.id}/book/")
+        assert response.data == {"error": "Нет свободных мест"}
+
+    def test_pool_is_rebuilt_from_bookings(self, settings):
+        settings.EVENTS_FLASH_SALE_PERSIST = "inline"
+        self.event.seats = 2
+        self.event.save()
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(f"/api/events/{self.event.id}/book/")
+        assert response.status_code == status.HTTP_201_CREATED
+
+        self.redis.flushall()
+        response = self.client.post(f"/api/events/{self.event.id}/book/")
+        assert response.data == {"error": "Вы уже зарегистрированы"}
+        assert self.redis.get(f"seat_pool:{self.event.id}") == "1"
+
+    def test_recount_refreshes_pool_and_cache(self, django_capture_on_commit_callbacks):
+        url = f"/api/events/{self.event.id}/"
+        assert self.client.get(url).data["free_seats"] == 1
+        Booking.objects.create(user=self.user, event=self.event)
+        with django_capture_on_commit_callbacks(execute=True):
+            call_command("recount_booked_seats", stdout=StringIO())
+        assert self.redis.get(f"seat_pool:{self.event.id}") == "0"
+        assert self.client.get(url).data["free_seats"] == 0
+
+    def test_cancel_returns_seat_to_pool(
+        self, settings, django_capture_on_commit_callbacks
+    ):
+        settings.EVENTS_FLASH_SALE_PERSIST = "inline"
+        self.client.force_authenticate(user=self.user)
+        self.client.post(f"/api/events/{self.event.id}/book/")
+        assert self.redis.get(f"seat_pool:{self.event.id}") == "0"
+        with django_capture_on_commit_callbacks(execute=True):
+            self.client.post(f"/api/events/{self.event.id}/cancel_booking/")
+        assert self.redis.get(f"seat_pool:{self.event.id}") == "1"
+
+    @pytest.mark.parametrize("deleted", ["booking", "user"])
+    def test_deleted_booking_returns_seat_to_pool(
+        self, settings, deleted, django_capture_on_commit_callbacks
+    ):
+        settings.EVENTS_FLASH_SALE_PERSIST = "inline"
+        user_id = self.user.id
+        self.client.force_authenticate(user=self.user)
+        self.client.post(f"/api/events/{self.event.id}/book/")
+        assert self.redis.get(f"seat_pool:{self.event.id}") == "0"
+        with django_capture_on_commit_callbacks(execute=True):
+            if deleted == "user":
+                self.user.delete()
+            else:
+                Booking.objects.get(user=self.user, event=self.event).delete()
+        assert self.redis.get(f"seat_pool:{self.event.id}") == "1"
+        assert seat_pool.claim_status(self.event.id, user_id) is None
+
+        if deleted == "booking":
+            response = self.client.post(f"/api/events/{self.event.id}/book/")
+            assert response.status_code == status.HTTP_201_CREATED
+
+    def test_regular_event_skips_pool(self, monkeypatch):
+        claims = []
+        monkeypatch.setattr(
+            seat_pool, "claim", lambda *args: claims.append(args) or seat_pool.CLAIMED
+        )
+        regular = Event.objects.create(
+            title="Лекция",
+            description="Обычный спрос",
+            start_time=timezone.now() + timezone.timedelta(days=1),
+            location="Москва",
+            organizer=self.other,
+        )
+        for user in (self.user, self.other):
+            self.client.force_authenticate(user=user)
+            response = self.client.post(f"/api/events/{regular.id}/book/")
+            assert response.status_code == status.HTTP_201_CREATED
+        assert claims == []
+
+    def test_broker_outage_persists_inline(self, monkeypatch):
+        def unreachable(*args):
+            raise OperationalError("Брокер недоступен")
+
+        monkeypatch.setattr(persist_pool_booking, "delay", unreachable)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(f"/api/events/{self.event.id}/book/")
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Booking.objects.filter(event=self.event, user=self.user).exists()
+        assert seat_pool.claim_status(self.event.id, self.user.id) == "confirmed"
+        assert self.redis.get(f"seat_pool:{self.event.id}") == "0"
+
+    def test_pool_seat_is_kept_for_waitlist(
+        self, settings, django_capture_on_commit_callbacks
+    ):
+        settings.EVENTS_FLASH_SALE_PERSIST = "inline"
+        self.client.force_authenticate(user=self.user)
+        self.client.post(f"/api/events/{self.event.id}/book/")
+        WaitlistEntry.objects.create(user=self.other, event=self.event)
+        with django_capture_on_commit_callbacks(execute=True):
+            self.client.post(f"/api/events/{self.event.id}/cancel_booking/")
+
+        outsider = User.objects.create_user(username="fan3", password="fan3")
+        self.client.force_authenticate(user=outsider)
+        response = self.client.post(f"/api/events/{self.event.id}/book/")
+        assert response.data == {"error": "Нет свободных мест"}
+        assert not Booking.objects.filter(event=self.event).exists()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            promote_waitlist(self.event.id)
+        assert Booking.objects.get(event=self.event).user == self.other
+        assert self.redis.get(f"seat_pool:{self.event.id}") == "0"
+
+
+class TestGroupBooking:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="group", password="group")
+        self.client.force_authenticate(user=self.user)
+        self.event, self.other_event = Event.objects.bulk_create(
+            Event(
+                title=title,
+                description="Описание",
+                start_time=timezone.now() + timezone.timedelta(days=1),
+                location="Москва",
+                seats=5,
+                organizer=self.user,
+            )
+            for title in ("Конференция", "Митап")
+        )
+
+    @pytest.mark.parametrize("mode", ["lock", "conditional"])
+    def test_book_several_seats(self, settings, mode):
+        settings.EVENTS_BOOKING_MODE = mode
+        response = self.client.post(
+            f"/api/events/{self.event.id}/book/", {"quantity": 4}
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["quantity"] == 4
+        self.event.refresh_from_db()
+        assert self.event.free_seats == 1
+
+        other = User.objects.create_user(username="late", password="late")
+        self.client.force_authenticate(user=other)
+        response = self.client.post(
+            f"/api/events/{self.event.id}/book/", {"quantity": 2}
+        )
+        assert response.data == {"error": "Нет свободных мест"}
+
+    def test_book_invalid_quantity(self):
+        response = self.client.post(
+            f"/api/events/{self.event.id}/book/", {"quantity": 0}
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_cancel_part_of_group_booking(self):
+        self.client.post(f"/api/events/{self.event.id}/book/", {"quantity": 4})
+        response = self.client.post(
+            f"/api/events/{self.event.id}/cancel_booking/", {"quantity": 3}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert Booking.objects.get(user=self.user, event=self.event).quantity == 1
+
+        self.client.post(f"/api/events/{self.event.id}/cancel_booking/")
+        self.event.refresh_from_db()
+        assert self.event.booked_seats == 0
+        assert not Booking.objects.filter(event=self.event).exists()
+
+    def test_bulk_book(self):
+        response = self.client.post(
+            "/api/events/bulk_book/",
+            {
+                "bookings": [
+                    {"event": self.event.id, "quantity": 2},
+                    {"event": self.other_event.id},
+                ]
+            },
+            format="json",
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert [item["quantity"] for item in response.data["bookings"]] == [2, 1]
+        self.other_event.refresh_from_db()
+        assert self.other_event.booked_seats == 1
+
+    def test_bulk_book_is_all_or_nothing(self):
+        response = self.client.post(
+            "/api/events/bulk_book/",
+            {
+                "bookings": [
+                    {"event": self.event.id, "quantity": 2},
+                    {"event": self.other_event.id, "quantity": 6},
+                ]
+            },
+            format="json",
+        )
+        assert response.data == {"error": 'Нет свободных мест: "Митап"'}
+        self.event.refresh_from_db()
+        assert self.event.booked_seats == 0
+        assert not Booking.objects.exists()
+
+
+class TestWaitlist:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        self.queued = []
+        monkeypatch.setattr(promote_waitlist, "delay", self.queued.append)
+        self.client = APIClient()
+        self.organizer = User.objects.create_user(username="org", password="org")
+        self.users = [
+            User.objects.create_user(username=f"wait{i}", password="wait")
+            for i in range(3)
+        ]
+        self.event = Event.objects.create(
+            title="Лекция",
+            description="Описание",
+            start_time=timezone.now() + timezone.timedelta(days=1),
+            location="Москва",
+            seats=1,
+            organizer=self.organizer,
+        )
+        self.client.force_authenticate(user=self.users[0])
+        self.client.post(f"/api/events/{self.event.id}/book/")
+
+    def _join(self, user, **data):
+        self.client.force_authenticate(user=user)
+        return self.client.post(f"/api/events/{self.event.id}/waitlist/", data)
+
+    def test_join_waitlist_in_order(self):
+        assert self._join(self.users[1]).data == {"position": 1, "quantity": 1}
+        assert self._join(self.users[2]).data == {"position": 2, "quantity": 1}
+        response = self._join(self.users[2])
+        assert response.data == {"error": "Вы уже в листе ожидания"}
+        response = self._join(self.users[0])
+        assert response.data == {"error": "Вы уже зарегистрированы"}
+
+    def test_cancel_promotes_waitlist_in_batch(
+        self, django_capture_on_commit_callbacks
+    ):
+        self._join(self.users[1])
+        self._join(self.users[2])
+        self.client.force_authenticate(user=self.users[0])
+        with django_capture_on_commit_callbacks(execute=True):
+            self.client.post(f"/api/events/{self.event.id}/cancel_booking/")
+        assert self.queued == [self.event.id]
+
+        promote_waitlist(self.event.id)
+        assert list(
+            Booking.objects.filter(event=self.event).values_list("user", flat=True)
+        ) == [self.users[1].id]
+        assert Notification.objects.filter(user=self.users[1], type="waitlist").exists()
+        self.event.refresh_from_db()
+        assert self.event.booked_seats == 1
+        assert list(self.event.waitlist.values_list("user", flat=True)) == [
+            self.users[2].id
+        ]
+
+    @pytest.mark.parametrize("mode", ["lock", "conditional"])
+    def test_freed_seat_is_kept_for_waitlist(self, settings, mode):
+        settings.EVENTS_BOOKING_MODE = mode
+        outsider = User.objects.create_user(username="outsider", password="o")
+        self._join(self.users[1])
+        self._join(self.users[2])
+        self.client.force_authenticate(user=self.users[0])
+        self.client.post(f"/api/events/{self.event.id}/cancel_booking/")
+
+        # Повторная попытка до promote_waitlist не обходит очередь.
+        for user in (outsider, self.users[2]):
+            self.client.force_authenticate(user=user)
+            response = self.client.post(f"/api/events/{self.event.id}/book/")
+            assert response.status_code == status.HTTP_409_CONFLICT
+        response = self.client.post(
+            "/api/events/bulk_book/",
+            {"bookings": [{"event": self.event.id}]},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_409_CONFLICT
+        self.event.refresh_from_db()
+        assert self.event.booked_seats == 0
+
+        # Первый в очереди может забрать место сам.
+        self.client.force_authenticate(user=self.users[1])
+        response = self.client.post(f"/api/events/{self.event.id}/book/")
+        assert response.status_code == status.HTTP_201_CREATED
+        assert list(self.event.waitlist.values_list("user", flat=True)) == [
+            self.users[2].id
+        ]
+
+    def test_seats_increase_promotes_waitlist(self, django_capture_on_commit_callbacks):
+        Event.objects.filter(id=self.event.id).update(seats=2, booked_seats=2)
+        Booking.objects.filter(event=self.event).update(quantity=2)
+        self._join(self.users[1], quantity=2)
+        self._join(self.users[2])
+        self.client.force_authenticate(user=self.organizer)
+        with django_capture_on_commit_callbacks(execute=True):
+            self.client.patch(f"/api/events/{self.event.id}/", {"seats": 5})
+        assert self.queued == [self.event.id]
+
+        promote_waitlist(self.event.id)
+        self.event.refresh_from_db()
+        assert self.event.booked_seats == 5
+        assert not self.event.waitlist.exists()
+        assert Notification.objects.filter(type="waitlist").count() == 2
+
+    def test_oversized_entry_does_not_block_queue(self):
+        outsider = User.objects.create_user(username="outsider", password="o")
+        response = self._join(self.users[1], quantity=100000)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not self.event.waitlist.exists()
+
+        Event.objects.filter(id=self.event.id).update(seats=4)
+        response = self._join(self.users[1])
+        assert response.data == {
+            "error": "Есть свободные места: забронируйте их напрямую"
+        }
+        # Группе не хватает трёх свободных мест: она ждёт, но не держит их.
+        assert self._join(self.users[1], quantity=4).status_code == 201
+        self.client.force_authenticate(user=self.users[2])
+        response = self.client.post(f"/api/events/{self.event.id}/book/")
+        assert response.status_code == status.HTTP_201_CREATED
+
+        assert self._join(outsider, quantity=2).status_code == 201
+        promote_waitlist(self.event.id)
+        assert Booking.objects.filter(event=self.event, user=outsider).exists()
+        assert list(self.event.waitlist.values_list("user", flat=True)) == [
+            self.users[1].id
+        ]
+        self.event.refresh_from_db()
+        assert self.event.free_seats == 0
+
+
+class TestRatingAggregates:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.client = APIClient()
+        self.organizer = User.objects.create_user(username="org", password="org")
+        self.users = [
+            User.objects.create_user(username=f"guest{i}", password="guest")
+            for i in range(2)
+        ]
+        self.events = [
+            Event.objects.create(
+                title=f"Концерт {i}",
+                description="Описание",
+                start_time=timezone.now() - timezone.timedelta(days=1),
+                location="Москва",
+                seats=10,
+                status="finished",
+                organizer=self.organizer,
+            )
+            for i in range(2)
+        ]
+        for event in self.events:
+            for user in self.users:
+                Booking.objects.create(user=user, event=event)
+
+    def _rate(self, user, event, score):
+        self.client.force_authenticate(user=user)
+        return self.client.post(f"/api/events/{event.id}/rate/", {"score": score})
+
+    def test_rate_updates_aggregates_by_delta(self):
+        event = self.events[0]
+        self._rate(self.users[0], event, 5)
+        self._rate(self.users[0], event, 3)
+        event.refresh_from_db()
+        assert (event.rating_sum, event.rating_count, event.avg_rating) == (3, 1, 3.0)
+
+        self._rate(self.users[1], event, 4)
+        event.refresh_from_db()
+        assert (event.rating_sum, event.rating_count, event.avg_rating) == (7, 2, 3.5)
+        assert event.average_rating() == 3.5
+
+    def test_filter_and_order_by_stored_rating(self):
+        self._rate(self.users[0], self.events[0], 2)
+        self._rate(self.users[0], self.events[1], 5)
+        response = self.client.get("/api/events/", {"avg_rating__gte": 4})
+        assert [event["id"] for event in response.data["results"]] == [
+            self.events[1].id
+        ]
+
+        response = self.client.get("/api/events/")
+        assert [event["id"] for event in response.data["results"]] == [
+            self.events[1].id,
+            self.events[0].id,
+        ]
+
+
+class TestEventFeed:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="reader", password="reader")
+        now = timezone.now()
+        self.events = {}
+        for name, days, status_ in [
+            ("past_old", -3, "finished"),
+            ("soon", 1, "upcoming"),
+            ("past_recent", -1, "finished"),
+            ("later", 2, "upcoming"),
+            ("cancelled", -2, "cancelled"),
+        ]:
+            self.events[name] = Event.objects.create(
+                title=name,
+                description="Описание",
+                start_time=now + timezone.timedelta(days=days),
+                location="Москва",
+                seats=10,
+                status=status_,
+                organizer=self.user,
+            )
+        self.expected = ["soon", "later", "past_recent", "cancelled", "past_old"]
+
+    def _titles(self, response):
+        return [event["title"] for event in response.data["results"]]
+
+    def test_feed_order(self):
+        response = self.client.get("/api/events/")
+        assert response.data["count"] == 5
+        assert self._titles(response) == self.expected
+
+    def test_cursor_pages(self, monkeypatch):
+        monkeypatch.setattr(EventFeedCursorPagination, "page_size", 2)
+        titles, pages = [], 0
+        url = "/api/events/?pagination=cursor"
+        while url:
+            response = self.client.get(url)
+            assert "count" not in response.data
+            titles += self._titles(response)
+            url = response.data["next"]
+            pages += 1
+        assert titles == self.expected
+        assert pages == 3
+
+    def test_rating_breaks_ties(self):
+        start_time = self.events["past_old"].start_time
+        best = Event.objects.create(
+            title="best",
+            description="Описание",
+            start_time=start_time,
+            location="Москва",
+            seats=10,
+            status="finished",
+            organizer=self.user,
+        )
+        Booking.objects.create(user=self.user, event=best)
+        self.client.force_authenticate(user=self.user)
+        self.client.post(f"/api/events/{best.id}/rate/", {"score": 5})
+        response = self.client.get("/api/events/")
+        assert self._titles(response)[-2:] == ["best", "past_old"]
+
+    def test_sql_key_matches_python_key(self):
+        keys = Event.objects.annotate(sql_key=feed_key_expression()).values_list(
+            "feed_key", "sql_key"
+        )
+        assert all(key == sql_key for key, sql_key in keys)
+
+    def test_status_update_moves_event_in_feed(self):
+        Event.objects.filter(id=self.events["soon"].id).update(
+            start_time=timezone.now() - timezone.timedelta(hours=3)
+        )
+        update_event_status()
+        response = self.client.get("/api/events/")
+        assert self._titles(response) == [
+            "later",
+            "soon",
+            "past_recent",
+            "cancelled",
+            "past_old",
+        ]
+
+    def test_my_upcoming_events_cursor(self):
+        for name in ["later", "soon"]:
+            Booking.objects.create(user=self.user, event=self.events[name])
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(
+            "/api/events/my_upcoming_events/", {"pagination": "cursor"}
+        )
+        assert self._titles(response) == ["soon", "later"]
+        assert response.data["next"] is None
+
+
+class TestEventSearch:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.client = APIClient()
+        organizer = User.objects.create_user(username="org", password="org")
+        self.jazz = Tag.objects.create(name="джаз")
+        self.events = {}
+        for title, description in [
+            ("Джазовый концерт", "Вечер живой музыки"),
+            ("Лекция о музыке", "Расскажем, как устроен концерт"),
+            ("Open air festival", "Music under the sky"),
+        ]:
+            self.events[title] = Event.objects.create(
+                title=title,
+                description=description,
+                start_time=timezone.now() + timezone.timedelta(days=1),
+                location="Москва",
+                seats=10,
+                organizer=organizer,
+            )
+        self.events["Лекция о музыке"].tags.add(self.jazz)
+
+    def _search(self, terms):
+        response = self.client.get("/api/events/", {"search": terms})
+        return [event["title"] for event in response.data["results"]]
+
+    def test_search_is_ranked_and_stemmed(self):
+        assert self._search("концерты") == ["Джазовый концерт", "Лекция о музыке"]
+        assert self._search("festivals") == ["Open air festival"]
+
+    def test_search_by_tag_follows_tag_changes(self):
+        assert self._search("джаз") == ["Лекция о музыке"]
+
+        self.jazz.name = "блюз"
+        self.jazz.save()
+        assert self._search("блюз") == ["Лекция о музыке"]
+
+        self.events["Лекция о музыке"].tags.clear()
+        assert self._search("блюз") == []
+
+        self.jazz.events.add(self.events["Open air festival"])
+        assert self._search("блюз") == ["Open air festival"]
+
+    def test_cursor_pagination_keeps_relevance_order(self):
+        # По ключу ленты лекция шла бы первой.
+        lecture = self.events["Лекция о музыке"]
+        lecture.start_time -= timezone.timedelta(hours=12)
+        lecture.save()
+
+        response = self.client.get(
+            "/api/events/", {"search": "концерты", "pagination": "cursor"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == 2
+        assert [event["title"] for event in response.data["results"]] == [
+            "Джазовый концерт",
+            "Лекция о музыке",
+        ]
+
+    def test_search_vector_is_not_serialized(self):
+        event = self.events["Open air festival"]
+        response = self.client.get(f"/api/events/{event.id}/")
+        assert "search_vector" not in response.data
+        assert "feed_key" not in response.data
+
+
+class TestTagFilter:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.client = APIClient()
+        organizer = User.objects.create_user(username="org", password="org")
+        self.python = Tag.objects.create(name="Python")
+        self.ml = Tag.objects.create(name="ML")
+        self.events = {}
+        for title, tags in [
+            ("both", [self.python, self.ml]),
+            ("python", [self.python]),
+            ("none", []),
+        ]:
+            event = Event.objects.create(
+                title=title,
+                description="Описание",
+                start_time=timezone.now() + timezone.timedelta(days=1),
+                location="Москва",
+                seats=10,
+                organizer=organizer,
+            )
+            event.tags.set(tags)
+            self.events[title] = event
+
+    def _titles(self, **params):
+        response = self.client.get("/api/events/", params)
+        assert response.status_code == status.HTTP_200_OK
+        return sorted(event["title"] for event in response.data["results"])
+
+    def test_tag_names_are_synced(self):
+        self.events["both"].refresh_from_db()
+        assert sorted(self.events["both"].tag_names) == ["ml", "python"]
+
+        self.ml.name = "AI"
+        self.ml.save()
+        self.events["both"].refresh_from_db()
+        assert sorted(self.events["both"].tag_names) == ["ai", "python"]
+
+    def test_edit_keeps_tag_names(self):
+        event = Event.objects.get(id=self.events["none"].id)
+        event.tags.add(self.python)
+        self.python.name = "Py"
+        self.python.save()
+        event.title = "Правка организатора"
+        event.save()
+        assert event.tag_names == ["py"]
+        event.refresh_from_db()
+        assert event.tag_names == ["py"]
+        assert self._titles(tags="py") == ["both", "python", "Правка организатора"]
+
+    def test_match_any_and_all(self):
+        assert self._titles(tags="python,ml") == ["both", "python"]
+        assert self._titles(tags=" PYTHON , ml", match="all") == ["both"]
+        assert self._titles(tags="ml", match="any") == ["both"]
+        assert self._titles(tags="rust") == []
+
+
+class TestResponseCache:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="guest", password="guest")
+        self.event = Event.objects.create(
+            title="Спектакль",
+            description="Описание",
+            start_time=timezone.now() + timezone.timedelta(days=1),
+            location="Москва",
+            seats=5,
+            organizer=self.user,
+        )
+
+    def test_anonymous_reads_are_cached(self, django_assert_num_queries):
+        response = self.client.get("/api/events/", {"status": "upcoming", "page": 1})
+        assert response["X-Cache"] == "MISS"
+        with django_assert_num_queries(0):
+            response = self.client.get(
+                "/api/events/", {"page": 1, "status": "upcoming"}
+            )
+        assert response["X-Cache"] == "HIT"
+        assert response.data["results"][0]["title"] == "Спектакль"
+
+        self.client.get(f"/api/events/{self.event.id}/")
+        response = self.client.get(f"/api/events/{self.event.id}/")
+        assert response["X-Cache"] == "HIT"
+        assert get_stats() == {
+            "list": {"hit": 1, "miss": 1},
+            "retrieve": {"hit": 1, "miss": 1},
+        }
+
+    def test_writes_bump_generation(self):
+        self.client.get(f"/api/events/{self.event.id}/")
+        self.client.force_authenticate(user=self.user)
+        self.client.post(f"/api/events/{self.event.id}/book/")
+        self.client.force_authenticate(user=None)
+        response = self.client.get(f"/api/events/{self.event.id}/")
+        assert response["X-Cache"] == "MISS"
+        assert response.data["free_seats"] == 4
+
+        self.event.title = "Опера"
+        self.event.save()
+        response = self.client.get(f"/api/events/{self.event.id}/")
+        assert response.data["title"] == "Опера"
+
+    def test_authenticated_reads_are_not_cached(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get("/api/events/")
+        response = self.client.get("/api/events/")
+        assert "X-Cache" not in response
+
+
+class TestEventObjectCache:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="fan", password="fan")
+        self.event = Event.objects.create(
+            title="Премьера",
+            description="Описание",
+            start_time=timezone.now() + timezone.timedelta(days=1),
+            location="Москва",
+            seats=3,
+            organizer=self.user,
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_concurrent_misses_load_once(self):
+        loads = []
+        started = threading.Event()
+
+        def loader():
+            loads.append(1)
+            started.set()
+            time.sleep(0.1)
+            return {"id": 0}
+
+        def read():
+            return object_cache.get_or_load(10**9, loader)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            first = pool.submit(read)
+            started.wait()
+            results = [pool.submit(read) for _ in range(7)]
+        assert len(loads) == 1
+        assert all(result.result() == {"id": 0} for result in [first, *results])
+        object_cache.evict_local(10**9)
+
+    def test_detail_is_served_from_cache_and_invalidated(
+        self, django_assert_num_queries
+    ):
+        url = f"/api/events/{self.event.id}/"
+        etag = self.client.get(url)["ETag"]
+        # Версия для ETag хранится в записи кэша.
+        with django_assert_num_queries(0):
+            response = self.client.get(url)
+            assert response.data["free_seats"] == 3
+            assert response["ETag"] == etag
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        self.client.post(f"/api/events/{self.event.id}/book/")
+        response = self.client.get(url)
+        assert response.data["free_seats"] == 2
+
+    def test_invalidation_is_published(self, fake_redis):
+        pubsub = fake_redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(object_cache.CHANNEL)
+        object_cache.invalidate([self.event.id])
+        messages = [pubsub.get_message(timeout=0.1) for _ in range(3)]
+        assert [m["data"] for m in messages if m] == [str(self.event.id)]
+
+    def test_cache_stats_for_staff_only(self):
+        response = self.client.get("/api/events/cache_stats/")
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(f"/api/events/{self.event.id}/")
+        response = self.client.get("/api/events/cache_stats/")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["object_cache"]["load"] >= 1
+        assert set(response.data["response_cache"]) == {"list", "retrieve"}
+
+
+class TestConditionalGet:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="poller", password="poller")
+        self.event = Event.objects.create(
+            title="Квиз",
+            description="Описание",
+            start_time=timezone.now() + timezone.timedelta(days=1),
+            location="Москва",
+            seats=5,
+            organizer=self.user,
+        )
+        Tag.objects.create(name="игры")
+
+    def _revalidate(self, url, **params):
+        response = self.client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        assert "Last-Modified" in response
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    @pytest.mark.parametrize(
+        "url", ["/api/events/", "/api/tags/", "/api/notifications/"]
+    )
+    def test_unchanged_scope_returns_304(self, url, django_assert_num_queries):
+        self.client.force_authenticate(user=self.user)
+        Notification.objects.create(
+            user=self.user, event=self.event, type="booking", message="Бронь"
+        )
+        response = self.client.get(url)
+        with django_assert_num_queries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"]
+
+    def test_anonymous_cached_list_returns_304(self, django_assert_num_queries):
+        response = self.client.get("/api/events/")
+        with django_assert_num_queries(0):
+            response = self.client.get(
+                "/api/events/", HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_writes_change_etag(self):
+        self.client.force_authenticate(user=self.user)
+        url = f"/api/events/{self.event.id}/"
+        etag = self.client.get(url)["ETag"]
+        self.event.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+
+        etag = self.client.get("/api/events/", {"location": "Москва"})["ETag"]
+        self.client.post(f"/api/events/{self.event.id}/book/")
+        response = self.client.get(
+            "/api/events/", {"location": "Москва"}, HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["results"][0]["free_seats"] == 4
+
+    @pytest.mark.parametrize(
+        ("url", "authenticated"),
+        [
+            ("/api/events/abc/", False),
+            ("/api/events/abc/", True),
+            ("/api/notifications/abc/", True),
+        ],
+    )
+    def test_non_numeric_id_is_not_found(self, url, authenticated):
+        if authenticated:
+            self.client.force_authenticate(user=self.user)
+        response = self.client.get(url)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.parametrize("detail", [False, True])
+    def test_organizer_rename_changes_etag(self, detail):
+        url = f"/api/events/{self.event.id}/" if detail else "/api/events/"
+        etag = self.client.get(url)["ETag"]
+        self.user.username = "quizmaster"
+        self.user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        event = response.data if detail else response.data["results"][0]
+        assert event["organizer"]["username"] == "quizmaster"
+
+    def test_delete_changes_list_etag(self):
+        self.client.force_authenticate(user=self.user)
+        Event.objects.create(
+            title="Второй квиз",
+            description="Описание",
+            start_time=self.event.start_time,
+            location="Москва",
+            organizer=self.user,
+        )
+        etag = self.client.get("/api/events/")["ETag"]
+        self.event.delete()
+        response = self.client.get("/api/events/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+
+    @pytest.mark.parametrize("url", ["/api/events/", "/api/notifications/"])
+    def test_cursor_pages_skip_validators(self, url):
+        self.client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"pagination": "cursor"})
+        assert response.status_code == status.HTTP_200_OK
+        assert "ETag" not in response
+        assert not [q for q in queries if "MAX(" in q["sql"]]
+
+
+class TestEventScheduler:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        self.organizer = User.objects.create_user(username="scheduler", password="x")
+        self.queued = []
+        monkeypatch.setattr(
+            run_scheduled_job,
+            "apply_async",
+            lambda args, eta: self.queued.append((*args, eta)),
+        )
+
+    def _event(self, start_time, **kwargs):
+        return Event.objects.create(
+            title="Запланированное",
+            description="Описание",
+            start_time=start_time,
+            location="Москва",
+            organizer=self.organizer,
+            **kwargs,
+        )
+
+    def _jobs(self, event):
+        return dict(
+            ScheduledJob.objects.filter(event=event).values_list("kind", "due_at")
+        )
+
+    def test_jobs_follow_event_changes(self):
+        start_time = timezone.now() + timezone.timedelta(days=2)
+        event = self._event(start_time)
+        assert self._jobs(event) == {
+            "reminder": start_time - timezone.timedelta(hours=1),
+            "finish": start_time + timezone.timedelta(hours=2),
+        }
+
+        event.start_time += timezone.timedelta(days=1)
+        event.save()
+        finish = event.start_time + timezone.timedelta(hours=2)
+        assert self._jobs(event)["finish"] == finish
+
+        event.status = "cancelled"
+        event.save()
+        assert self._jobs(event) == {}
+
+    def test_due_jobs_are_queued_with_eta(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            soon = self._event(timezone.now() + timezone.timedelta(minutes=61))
+        assert [job[1] for job in self.queued] == ["reminder"]
+        assert self.queued[0][3] == soon.start_time - timezone.timedelta(hours=1)
+        assert list(self._jobs(soon)) == ["finish"]
+
+        later = self._event(timezone.now() + timezone.timedelta(days=1))
+        ScheduledJob.objects.filter(event=soon).update(due_at=timezone.now())
+        self.queued.clear()
+        dispatch_scheduled_jobs()
+        assert [(job[0], job[1]) for job in self.queued] == [(soon.id, "finish")]
+        assert self._jobs(soon) == {}
+        assert len(self._jobs(later)) == 2
+
+    def test_stale_jobs_are_skipped(self):
+        event = self._event(timezone.now() - timezone.timedelta(hours=3))
+        due_at = event.start_time + timezone.timedelta(hours=2)
+
+        stale = due_at - timezone.timedelta(hours=1)
+        run_scheduled_job(event.id, "finish", stale.isoformat())
+        event.refresh_from_db()
+        assert event.status == "upcoming"
+
+        run_scheduled_job(event.id, "finish", due_at.isoformat())
+        event.refresh_from_db()
+        assert event.status == "finished"
+        assert self._jobs(event) == {}
+
+    def test_late_booking_gets_reminder(
+        self, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        reminded = []
+        monkeypatch.setattr(send_event_reminders, "delay", reminded.append)
+        monkeypatch.setattr(relay_outbox, "delay", lambda: None)
+        started = self._event(timezone.now() + timezone.timedelta(minutes=30))
+        later = self._event(timezone.now() + timezone.timedelta(days=1))
+        client = APIClient()
+        client.force_authenticate(user=self.organizer)
+        with django_capture_on_commit_callbacks(execute=True):
+            for event in (started, later):
+                response = client.post(f"/api/events/{event.id}/book/")
+                assert response.status_code == status.HTTP_201_CREATED
+        # Напоминание этого мероприятия уже разослано, новую бронь оно не
+        # застало.
+        assert reminded == [started.id]
+
+        send_event_reminders(started.id)
+        assert Notification.objects.get(
+            user=self.organizer, event=started, type="reminder"
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSeatStream:
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, monkeypatch):
+        # Интервал с запасом перекрывает два запроса подряд, чтобы их
+        # изменения гарантированно схлопнулись.
+        settings.EVENTS_SEATS_STREAM_INTERVAL_MS = 1000
+        # Брокера в тестах нет: перенос уведомлений из outbox не ставится.
+        monkeypatch.setattr(relay_outbox, "delay", lambda: None)
+        self.user = User.objects.create_user(username="seats", password="seats")
+        self.event = Event.objects.create(
+            title="Почти распродано",
+            description="Описание",
+            start_time=timezone.now() + timezone.timedelta(days=1),
+            location="Москва",
+            seats=3,
+            organizer=self.user,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    async def _open(self, event_id):
+        communicator = ApplicationCommunicator(
+            application,
+            {
+                "type": "http",
+                "method": "GET",
+                "path": f"/api/events/{event_id}/seats/stream/",
+                "query_string": b"",
+                "headers": [],
+            },
+        )
+        await communicator.send_input({"type": "http.request", "body": b""})
+        return communicator, await communicator.receive_output(5)
+
+    async def _seats(self, communicator):
+        message = await communicator.receive_output(5)
+        data = message["body"].decode().split("data: ")[1]
+        return json.loads(data)["free_seats"]
+
+    def _post(self, url, data=None):
+        try:
+            return self.client.post(url, data)
+        finally:
+            # Запрос выполняется в потоке пула, его соединение закрывается.
+            connection.close()
+
+    def test_unknown_event(self):
+        async def scenario():
+            _, start = await self._open(self.event.id + 1)
+            assert start["status"] == 404
+
+        async_to_sync(scenario)()
+
+    def test_book_and_cancel_are_broadcast_and_coalesced(self):
+        book = sync_to_async(self._post, thread_sensitive=False)
+        url = f"/api/events/{self.event.id}/"
+
+        async def scenario():
+            communicator, start = await self._open(self.event.id)
+            assert start["status"] == 200
+            assert await self._seats(communicator) == 3
+
+            response = await book(url + "book/", {"quantity": 2})
+            assert response.status_code == status.HTTP_201_CREATED
+            assert await self._seats(communicator) == 1
+
+            # Изменения внутри интервала приходят одним последним значением.
+            response = await book(url + "cancel_booking/", {"quantity": 1})
+            assert response.status_code == status.HTTP_200_OK
+            response = await book(url + "cancel_booking/")
+            assert response.status_code == status.HTTP_200_OK
+            assert await self._seats(communicator) == 3
+            assert await communicator.receive_nothing(0.5)
+
+            await communicator.send_input({"type": "http.disconnect"})
+            await communicator.wait(5)
+            assert live.hub.connections() == 0
+
+        async_to_sync(scenario)()
+
+
+# С заданными POSTGRES_REPLICA_HOSTS чтения идут через алиасы реплик.
+@pytest.mark.django_db(transaction=True, databases="__all__")
+class TestAsyncReads:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.user = User.objects.create_user(username="reader", password="reader")
+        self.event = Event.objects.create(
+            title="Асинхронное",
+            description="Описание",
+            start_time=timezone.now() + timezone.timedelta(days=1),
+            location="Москва",
+            organizer=self.user,
+        )
+        Booking.objects.create(user=self.user, event=self.event)
+        Notification.objects.create(user=self.user, type="booking", message="Бронь")
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "/api/events/",
+            "/api/events/1/",
+            "/api/events/my_upcoming_events/",
+            "/api/tags/",
+            "/api/notifications/",
+        ],
+    )
+    def test_read_routes_are_async(self, url):
+        assert iscoroutinefunction(resolve(url, urlconf="config.asgi_urls").func)
+        assert not iscoroutinefunction(
+            resolve("/api/events/bulk_book/", urlconf="config.asgi_urls").func
+        )
+        # Под WSGI остаются синхронные вьюсеты
+        assert not iscoroutinefunction(resolve(url).func)
+
+    async def _get(self, path, token=None):
+        headers = []
+        if token is not None:
+            headers.append((b"authorization", f"Bearer {token}".encode()))
+        communicator = ApplicationCommunicator(
+            application,
+            {
+                "type": "http",
+                "method": "GET",
+                "path": path,
+                "query_string": b"",
+                "headers": headers,
+            },
+        )
+        await communicator.send_input({"type": "http.request", "body": b""})
+        start = await communicator.receive_output(5)
+        body = await communicator.receive_output(5)
+        await communicator.wait(5)
+        return start["status"], json.loads(body["body"])
+
+    def test_asgi_reads_with_jwt(self):
+        token = str(AccessToken.for_user(self.user))
+
+        async def scenario():
+            status_code, data = await self._get("/api/notifications/", token)
+            assert status_code == 200
+            assert [n["message"] for n in data["results"]] == ["Бронь"]
+
+            status_code, data = await self._get(
+                "/api/events/my_upcoming_events/", token
+            )
+            assert status_code == 200
+            assert [e["id"] for e in data] == [self.event.id]
+
+            status_code, data = await self._get(f"/api/events/{self.event.id}/")
+            assert status_code == 200
+            assert data["title"] == "Асинхронное"
+
+            status_code, _ = await self._get("/api/notifications/", "invalid")
+            assert status_code == 401
+            status_code, _ = await self._get("/api/notifications/")
+            assert status_code == 401
+
+        async_to_sync(scenario)()
+
+    def test_writes_stay_on_viewset(self, settings):
+        settings.ROOT_URLCONF = "config.asgi_urls"
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post("/api/tags/", {"name": "новый"})
+        assert response.status_code == status.HTTP_201_CREATED
+        response = client.patch(
+            f"/api/events/{self.event.id}/", {"title": "Изменено"}, format="json"
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert client.get(f"/api/events/{self.event.id}/").data["title"] == "Изменено"
+
+
+def _events_db():
+    return Event.objects.all().db
+
+
+@pytest.mark.django_db(transaction=True)
+class TestReplicaRouter:
+    @pytest.fixture(autouse=True)
+    def setup(self, settings):
+        settings.DATABASE_REPLICAS = ["replica1", "replica2"]
+        cache.clear()
+        self.user = User.objects.create_user(username="replica", password="replica")
+        self.event = Event.objects.create(
+            title="Реплика",
+            description="Описание",
+            start_time=timezone.now() + timezone.timedelta(days=1),
+            location="Москва",
+            organizer=self.user,
+        )
+        self.factory = RequestFactory()
+
+    def _db(self, read, method="get", path="/api/events/", user=None):
+        """БД, в которую middleware направит чтение read() внутри запроса."""
+        headers = {}
+        if user is not None:
+            headers["HTTP_AUTHORIZATION"] = f"Bearer {AccessToken.for_user(user)}"
+        request = getattr(self.factory, method)(path, **headers)
+        return replica_reads_middleware(lambda request: read())(request)
+
+    def test_api_reads_go_to_replica(self):
+        assert self._db(_events_db) in ("replica1", "replica2")
+        assert self._db(_events_db, "head") in ("replica1", "replica2")
+
+    def test_one_replica_per_request(self):
+        def read():
+            return {Event.objects.all().db for _ in range(20)}
+
+        assert len(self._db(read)) == 1
+
+    def test_primary_reads(self, settings):
+        assert Event.objects.all().db == "default"
+        assert self._db(_events_db, "post") == "default"
+        assert self._db(_events_db, path="/admin/") == "default"
+        assert self._db(lambda: Event.objects.select_for_update().db) == "default"
+
+        def in_transaction():
+            with transaction.atomic():
+                return Event.objects.all().db
+
+        assert self._db(in_transaction) == "default"
+
+        def fill_cache():
+            with db_router.primary():
+                return Event.objects.all().db
+
+        assert self._db(fill_cache) == "default"
+
+        settings.DATABASE_REPLICAS = []
+        assert self._db(_events_db) == "default"
+
+    def test_reads_after_write_in_request(self):
+        def write_then_read():
+            router.db_for_write(Event)
+            return Event.objects.all().db
+
+        assert self._db(write_then_read) == "default"
+
+    def test_user_pinned_after_write(self):
+        other = User.objects.create_user(username="other", password="other")
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(f"/api/events/{self.event.id}/book/")
+        assert response.status_code == status.HTTP_201_CREATED
+
+        assert self._db(_events_db, user=self.user) == "default"
+        assert self._db(_events_db, user=other) != "default"
+
+        cache.delete(f"db:pinned:{self.user.id}")
+        assert self._db(_events_db, user=self.user) != "default"
+
+
+class TestDatabasePool:
+    def test_pool_stats(self):
+        # Отдельный пул: пул Django общий для всех соединений алиаса.
+        pool = ConnectionPool(
+            kwargs=connection.get_connection_params(), min_size=2, max_size=2
+        )
+        try:
+            pool.wait()
+            with pool.connection() as conn:
+                conn.execute("SELECT 1")
+                stats = db_pool.pool_stats(pool)
+                assert stats["in_use"] == 1
+                assert stats["max_size"] == 2
+            stats = db_pool.pool_stats(pool)
+            assert stats["in_use"] == 0
+            assert stats["requests"] >= 1
+        finally:
+            pool.close()
+
+    def test_report_and_collect(self, fake_redis, settings, monkeypatch):
+        settings.POSTGRES_CONNECTIONS = "pool"
+        stats = {"default": {"in_use": 3, "size": 5}}
+        monkeypatch.setattr(db_pool, "get_stats", lambda: stats)
+        monkeypatch.setattr(db_pool, "_reported_at", float("-inf"))
+        fake_redis.hset(
+            db_pool.STATS_KEY, "web:old:1", json.dumps({"at": 0, "pools": {}})
+        )
+
+        db_pool.report()
+        processes = db_pool.collect()
+        assert list(processes.values()) == [stats]
+        assert next(iter(processes)).startswith("web:")
+        assert not fake_redis.hexists(db_pool.STATS_KEY, "web:old:1")
+
+        # Следующий отчёт не раньше чем через REPORT_INTERVAL секунд.
+        monkeypatch.setattr(db_pool, "get_stats", dict)
+        db_pool.report()
+        assert list(db_pool.collect().values()) == [stats]
+
+        settings.POSTGRES_CONNECTIONS = "none"
+        fake_redis.delete(db_pool.STATS_KEY)
+        db_pool.report(force=True)
+        assert db_pool.collect() == {}
+
+    def test_worker_sizes(self, settings, monkeypatch):
+        monkeypatch.setattr(db_pool, "_role", "web")
+        settings.DATABASES = {
+            "default": {"OPTIONS": {"pool": {"min_size": 2, "max_size": 10}}},
+            "replica1": {"OPTIONS": {"pool": {"min_size": 2, "max_size": 10}}},
+        }
+        settings.POSTGRES_WORKER_POOL_MIN_SIZE = 1
+        settings.POSTGRES_WORKER_POOL_MAX_SIZE = 2
+        db_pool.use_worker_sizes()
+        assert db_pool._role == "celery"
+        for database in settings.DATABASES.values():
+            assert database["OPTIONS"]["pool"] == {"min_size": 1, "max_size": 2}
+
+
+class TestProjectedList:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="projection", password="projection", email="p@example.com"
+        )
+        self.other = User.objects.create_user(username="other", password="other")
+        tags = [Tag.objects.create(name=name) for name in ("b", "a", "c")]
+        now = timezone.now()
+        for i, (status_, event_tags) in enumerate(
+            [
+                ("upcoming", [tags[2], tags[0]]),
+                ("cancelled", [tags[1]]),
+                ("finished", []),
+                ("upcoming", tags),
+            ]
+        ):
+            event = Event.objects.create(
+                title=f"Проекция {i}",
+                description="Описание",
+                start_time=now + timezone.timedelta(days=i + 1, microseconds=i),
+                location="Москва",
+                seats=10,
+                status=status_,
+                organizer=self.other if i % 2 else self.user,
+            )
+            event.tags.set(event_tags)
+            Booking.objects.create(user=self.user, event=event, quantity=i + 1)
+        Event.objects.update(avg_rating=4.5, booked_seats=F("id") % 3)
+        self.queryset = EventViewSet.queryset.order_by("feed_key", "id")
+
+    def _expected(self, queryset):
+        return JSONRenderer().render(EventListSerializer(queryset, many=True).data)
+
+    def test_byte_compatible(self):
+        assert JSONRenderer().render(serialize(rows(self.queryset))) == (
+            self._expected(self.queryset)
+        )
+        assert serialize(rows(self.queryset.none())) == []
+
+    def test_list_and_upcoming(self):
+        response = self.client.get("/api/events/")
+        assert JSONRenderer().render(response.data["results"]) == self._expected(
+            self.queryset
+        )
+
+        self.client.force_authenticate(self.user)
+        upcoming = self.queryset.filter(status="upcoming").order_by("start_time")
+        response = self.client.get("/api/events/my_upcoming_events/")
+        assert response.content == self._expected(upcoming)
+        response = self.client.get(
+            "/api/events/my_upcoming_events/", {"pagination": "cursor"}
+        )
+        assert JSONRenderer().render(response.data["results"]) == self._expected(
+            upcoming.order_by("feed_key", "id")
+        )
@@ -1,15 +1,39 @@
+import json
+import time
+
+import fakeredis
 import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
+from kombu.exceptions import OperationalError
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-from events.models import Event
-from notifications.models import Notification
+from config import redis as config_redis
+from config.asgi import application
+from events.models import Booking, Event
+from notifications import live, outbox, sink
+from notifications.models import Notification, OutboxNotification
+from notifications.pagination import NotificationCursorPagination
+from notifications.serializers import NotificationSerializer
+from notifications.services import create_notifications, get_unread_count
+from notifications.tasks import (
+    relay_outbox,
+    send_event_reminders,
+    send_notification,
+    send_reminder_notifications,
+)
 from users.models import User
 
+
 @pytest.mark.django_db
 class TestNotificationAPI:
-
     @pytest.fixture
     def user(self):
         return User.objects.create_user(username="test_user", password="password")
@@ -72,4 +96,482 @@ class TestNotificationAPI:
         response = auth_client.get("/api/notifications/")
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data) == 4
-        assert response.data["results"][0]["message"] == "Вы отменили бронь на событие"
\ No newline at end of file
+        assert response.data["results"][0]["message"] == "Вы отменили бронь на событие"
+
+
+@pytest.mark.django_db
+class TestReminderNotifications:
+    @pytest.fixture
+    def event(self):
+        organizer = User.objects.create_user(username="organizer", password="password")
+        return Event.objects.create(
+            title="Скоро начнется",
+            description="Тестовое описание",
+            start_time=timezone.now() + timezone.timedelta(minutes=30),
+            location="Москва",
+            seats=10,
+            status="upcoming",
+            organizer=organizer,
+        )
+
+    def test_one_task_per_event(self, event, monkeypatch):
+        calls = []
+        monkeypatch.setattr(send_event_reminders, "delay", calls.append)
+        later = Event.objects.create(
+            title="Нескоро",
+            description="Тестовое описание",
+            start_time=timezone.now() + timezone.timedelta(days=1),
+            location="Москва",
+            organizer=event.organizer,
+        )
+        Booking.objects.create(user=event.organizer, event=event)
+        Booking.objects.create(user=event.organizer, event=later)
+        send_reminder_notifications()
+        assert calls == [event.id]
+
+    def test_reminders_are_written_in_bulk(self, event, django_assert_max_num_queries):
+        users = User.objects.bulk_create(
+            User(username=f"attendee{i}", email=f"attendee{i}@example.com")
+            for i in range(5)
+        )
+        Booking.objects.bulk_create(
+            Booking(user=user, event=event, quantity=1 + i % 2)
+            for i, user in enumerate(users)
+        )
+
+        with django_assert_max_num_queries(14):
+            assert send_event_reminders(event.id) == 5
+
+        notifications = Notification.objects.filter(event=event, type="reminder")
+        assert notifications.count() == 5
+        messages = dict(notifications.values_list("user_id", "message"))
+        assert messages[users[0].id].startswith("Напоминание: мероприятие Скоро")
+        assert "Забронировано мест" not in messages[users[0].id]
+        assert messages[users[1].id].endswith("Забронировано мест: 2.")
+
+    def test_reminders_are_sent_once(self, event, monkeypatch):
+        user = User.objects.create_user(username="attendee", password="password")
+        Booking.objects.create(user=user, event=event)
+        calls = []
+        monkeypatch.setattr(send_event_reminders, "delay", calls.append)
+
+        send_reminder_notifications()
+        assert calls == [event.id]
+        assert send_event_reminders(event.id) == 1
+        assert send_event_reminders(event.id) == 0
+
+        calls.clear()
+        send_reminder_notifications()
+        assert calls == []
+        assert Notification.objects.filter(user=user, type="reminder").count() == 1
+        assert Booking.objects.get(user=user).reminder_sent_at is not None
+
+
+@pytest.mark.django_db
+class TestNotificationSink:
+    @pytest.fixture(autouse=True)
+    def sink_mode(self, settings):
+        settings.NOTIFICATIONS_WRITE_MODE = "sink"
+        settings.NOTIFICATIONS_SINK_BATCH_SIZE = 3
+        settings.NOTIFICATIONS_SINK_FLUSH_MS = 60_000
+
+    @pytest.fixture
+    def user(self):
+        return User.objects.create_user(username="sink_user", password="password")
+
+    @pytest.fixture
+    def event(self, user):
+        return Event.objects.create(
+            title="Тестовое мероприятие",
+            description="Тестовое описание",
+            start_time=timezone.now() + timezone.timedelta(days=1),
+            location="Москва",
+            organizer=user,
+        )
+
+    def test_flushes_full_batch_without_lookups(
+        self, user, event, django_assert_num_queries
+    ):
+        with django_assert_num_queries(0):
+            send_notification(user.id, event.id, "booking", "Первое")
+            send_notification(user.id, event.id, "booking", "Второе")
+        assert sink.pending() == 2
+
+        with CaptureQueriesContext(connection) as queries:
+            send_notification(user.id, None, "cancel", "Третье")
+        inserts = [
+            q
+            for q in queries
+            if q["sql"].startswith('INSERT INTO "notifications_notification"')
+        ]
+        assert len(inserts) == 1
+        assert sink.pending() == 0
+        assert Notification.objects.filter(user=user).count() == 3
+
+    def test_flush_on_shutdown(self, user, event):
+        send_notification(user.id, event.id, "booking", "Перед остановкой")
+        sink.flush_on_shutdown()
+        assert sink.pending() == 0
+        assert Notification.objects.get(user=user).message == "Перед остановкой"
+
+    def test_missing_event_is_not_lost(self, user, event):
+        event_id = event.id
+        event.delete()
+        send_notification(user.id, event_id, "cancel", "Мероприятие удалено")
+        assert sink.flush() == 1
+        assert Notification.objects.get(user=user).event is None
+
+    def test_failed_batch_is_requeued(self, user, monkeypatch):
+        def broken(batch):
+            raise DatabaseError("БД недоступна")
+
+        send_notification(user.id, None, "booking", "Первое")
+        send_notification(user.id, None, "booking", "Второе")
+        with monkeypatch.context() as patch:
+            patch.setattr(sink, "_write", broken)
+            with pytest.raises(DatabaseError):
+                sink.flush()
+        assert sink.pending() == 2
+
+        assert sink.flush() == 2
+        assert list(
+            Notification.objects.filter(user=user)
+            .order_by("id")
+            .values_list("message", flat=True)
+        ) == ["Первое", "Второе"]
+
+    def test_requeue_is_bounded(self, user, settings, monkeypatch):
+        settings.NOTIFICATIONS_SINK_BATCH_SIZE = 2
+        monkeypatch.setattr(sink, "REQUEUE_BATCHES", 1)
+        monkeypatch.setattr(sink, "_write", lambda batch: 1 / 0)
+        send_notification(user.id, None, "booking", "Первое")
+        for message in ("Второе", "Третье"):
+            with pytest.raises(ZeroDivisionError):
+                send_notification(user.id, None, "booking", message)
+        assert [n.message for n in sink._take()] == ["Второе", "Третье"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_notification_sink_flushes_by_time(settings):
+    settings.NOTIFICATIONS_WRITE_MODE = "sink"
+    settings.NOTIFICATIONS_SINK_FLUSH_MS = 50
+    user = User.objects.create_user(username="sink_timer", password="password")
+
+    send_notification(user.id, None, "booking", "По таймеру")
+    deadline = time.monotonic() + 5
+    while sink.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    assert Notification.objects.filter(user=user).count() == 1
+
+
+@pytest.mark.django_db
+class TestNotificationOutbox:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        cache.clear()
+        self.relays = []
+        monkeypatch.setattr(relay_outbox, "delay", lambda: self.relays.append(1))
+        self.user = User.objects.create_user(username="outbox", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.events = [
+            Event.objects.create(
+                title=f"Мероприятие {i}",
+                description="Тестовое описание",
+                start_time=timezone.now() + timezone.timedelta(days=1),
+                location="Москва",
+                seats=1,
+                organizer=self.user,
+            )
+            for i in range(2)
+        ]
+
+    def test_bookings_go_through_outbox(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            for event in self.events:
+                response = self.client.post(f"/api/events/{event.id}/book/")
+                assert response.status_code == status.HTTP_201_CREATED
+        assert OutboxNotification.objects.count() == 2
+        assert not Notification.objects.exists()
+        assert self.relays == [1]
+
+        assert relay_outbox() == 2
+        assert not OutboxNotification.objects.exists()
+        assert list(
+            Notification.objects.filter(user=self.user).values_list("type", flat=True)
+        ) == ["booking", "booking"]
+        stats = outbox.get_stats()
+        assert stats["relayed"] == 2
+        assert stats["pending"] == 0
+
+    def test_relay_writes_in_its_transaction_in_sink_mode(
+        self, settings, django_capture_on_commit_callbacks
+    ):
+        settings.NOTIFICATIONS_WRITE_MODE = "sink"
+        settings.NOTIFICATIONS_SINK_FLUSH_MS = 60_000
+        with django_capture_on_commit_callbacks(execute=True):
+            for event in self.events:
+                self.client.post(f"/api/events/{event.id}/book/")
+
+        assert relay_outbox() == 2
+        assert not OutboxNotification.objects.exists()
+        assert sink.pending() == 0
+        assert Notification.objects.filter(user=self.user).count() == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_booking_survives_broker_outage(self, monkeypatch):
+        def unreachable():
+            raise OperationalError("Брокер недоступен")
+
+        monkeypatch.setattr(relay_outbox, "delay", unreachable)
+        event = self.events[0]
+        response = self.client.post(f"/api/events/{event.id}/book/")
+        assert response.status_code == status.HTTP_201_CREATED
+        event.refresh_from_db()
+        assert event.booked_seats == 1
+        assert OutboxNotification.objects.count() == 1
+        # Следующая бронь снова попробует поставить задачу переноса.
+        assert cache.get(outbox.RELAY_REQUESTED_KEY) is None
+
+        # Уведомление заберёт периодическая задача.
+        assert relay_outbox() == 1
+        assert Notification.objects.filter(user=self.user, event=event).exists()
+
+    def test_rolled_back_booking_leaves_no_notification(self):
+        Booking.objects.create(user=self.user, event=self.events[1])
+        response = self.client.post(
+            "/api/events/bulk_book/",
+            {"bookings": [{"event": event.id} for event in self.events]},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not OutboxNotification.objects.exists()
+
+
+@pytest.mark.django_db
+class TestNotificationInbox:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.user = User.objects.create_user(username="inbox", password="password")
+        self.other = User.objects.create_user(username="other", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.notifications = create_notifications(
+            [
+                Notification(user=user, type="booking", message=f"Уведомление {i}")
+                for i in range(4)
+                for user in (self.user, self.other)
+            ]
+        )
+        self.own = [n for n in self.notifications if n.user_id == self.user.id]
+
+    def _unread(self):
+        response = self.client.get("/api/notifications/unread_count/")
+        assert response.status_code == status.HTTP_200_OK
+        return response.data["unread"]
+
+    def test_unread_count_is_one_query(self, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            assert get_unread_count(self.user) == 4
+        assert self._unread() == 4
+
+    def test_mark_read_up_to_and_all(self):
+        response = self.client.post(
+            "/api/notifications/mark_read/", {"up_to": self.own[1].id}
+        )
+        assert response.data == {"marked": 2, "unread": 2}
+
+        response = self.client.get("/api/notifications/", {"unread": "true"})
+        assert [n["id"] for n in response.data["results"]] == [
+            self.own[3].id,
+            self.own[2].id,
+        ]
+
+        response = self.client.post("/api/notifications/mark_read/")
+        assert response.data == {"marked": 2, "unread": 0}
+        assert get_unread_count(self.other) == 4
+
+        response = self.client.post("/api/notifications/mark_read/", {"up_to": "x"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_delete_and_admin_edit_keep_counter(self):
+        self.own[0].delete()
+        self.own[1].is_read = True
+        self.own[1].save()
+        self.own[1].delete()
+        assert get_unread_count(self.user) == 3
+
+        admin_user = User.objects.create_superuser(username="root", password="root")
+        event = Event.objects.create(
+            title="Концерт",
+            description="Описание",
+            start_time=timezone.now() + timezone.timedelta(days=1),
+            location="Москва",
+            organizer=admin_user,
+        )
+        Notification.objects.filter(id=self.own[2].id).update(event=event)
+        client = Client()
+        client.force_login(admin_user)
+        url = f"/admin/notifications/notification/{self.own[2].id}/change/"
+        data = {
+            "user": self.other.id,
+            "event": event.id,
+            "type": "booking",
+            "message": "Перенесено",
+        }
+        response = client.post(url, {**data, "is_read": "on"})
+        assert response.status_code == status.HTTP_302_FOUND
+        assert (get_unread_count(self.user), get_unread_count(self.other)) == (2, 4)
+
+        response = client.post(url, data)
+        assert response.status_code == status.HTTP_302_FOUND
+        assert get_unread_count(self.other) == 5
+
+    def test_cursor_pages_newest_first(self, monkeypatch):
+        monkeypatch.setattr(NotificationCursorPagination, "page_size", 3)
+        response = self.client.get("/api/notifications/", {"pagination": "cursor"})
+        ids = [n["id"] for n in response.data["results"]]
+        response = self.client.get(response.data["next"])
+        ids += [n["id"] for n in response.data["results"]]
+        assert ids == [n.id for n in reversed(self.own)]
+        assert response.data["next"] is None
+
+
+@pytest.mark.django_db(transaction=True)
+class TestNotificationStream:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.user = User.objects.create_user(username="stream", password="password")
+        self.token = str(AccessToken.for_user(self.user))
+        self.old = create_notifications(
+            [Notification(user=self.user, type="booking", message="Пропущенное")]
+        )[0]
+
+    async def _open(self, query):
+        communicator = ApplicationCommunicator(
+            application,
+            {
+                "type": "http",
+                "method": "GET",
+                "path": "/api/notifications/stream/",
+                "query_string": query.encode(),
+                "headers": [],
+            },
+        )
+        await communicator.send_input({"type": "http.request", "body": b""})
+        return communicator, await communicator.receive_output(5)
+
+    def test_requires_token(self):
+        async def scenario():
+            _, start = await self._open("")
+            assert start["status"] == 401
+
+        async_to_sync(scenario)()
+
+    def test_resume_reads_backlog_past_one_page(self, settings):
+        settings.NOTIFICATIONS_STREAM_BACKLOG = 2
+        missed = [self.old] + create_notifications(
+            [
+                Notification(user=self.user, type="booking", message=f"Пропущенное {i}")
+                for i in range(4)
+            ]
+        )
+
+        async def scenario():
+            communicator, start = await self._open(
+                f"access_token={self.token}&last_id={self.old.id - 1}"
+            )
+            assert start["status"] == 200
+            body = b""
+            for _ in range(3):
+                body += (await communicator.receive_output(5))["body"]
+            assert [
+                int(line.split()[1])
+                for line in body.decode().splitlines()
+                if line.startswith("id: ")
+            ] == [n.id for n in missed]
+
+            fresh = await sync_to_async(Notification.objects.create)(
+                user=self.user, type="cancel", message="Новое"
+            )
+            live.hub.publish([(self.user.id, NotificationSerializer(fresh).data)])
+            pushed = await communicator.receive_output(5)
+            assert pushed["body"].startswith(f"id: {fresh.id}\n".encode())
+
+            await communicator.send_input({"type": "http.disconnect"})
+            await communicator.wait(5)
+
+        async_to_sync(scenario)()
+
+    def test_resume_and_live_push(self):
+        async def scenario():
+            communicator, start = await self._open(
+                f"access_token={self.token}&last_id={self.old.id - 1}"
+            )
+            assert start["status"] == 200
+            backlog = await communicator.receive_output(5)
+            assert f"id: {self.old.id}\n".encode() in backlog["body"]
+
+            fresh = await sync_to_async(Notification.objects.create)(
+                user=self.user, type="cancel", message="Новое"
+            )
+
+            live.hub.publish([(self.user.id, NotificationSerializer(fresh).data)])
+            pushed = await communicator.receive_output(5)
+            assert pushed["body"].startswith(f"id: {fresh.id}\n".encode())
+            assert "Новое" in pushed["body"].decode()
+            assert live.hub.connections() == 1
+
+            await communicator.send_input({"type": "http.disconnect"})
+            await communicator.wait(5)
+            assert live.hub.connections() == 0
+
+        async_to_sync(scenario)()
+
+
+@pytest.mark.django_db
+class TestNotificationPublish:
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, monkeypatch):
+        settings.REDIS_URL = "redis://localhost:6379/1"
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        monkeypatch.setattr(config_redis, "_client", self.redis)
+        self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(live.CHANNEL)
+        # Подтверждение подписки
+        self.pubsub.get_message(timeout=0.1)
+        self.user = User.objects.create_user(username="publish", password="password")
+
+    def _create(self, count):
+        return create_notifications(
+            [
+                Notification(user=self.user, type="booking", message=f"Бронь {i}")
+                for i in range(count)
+            ]
+        )
+
+    def test_batch_is_one_message_in_serializer_format(
+        self, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            created = self._create(3)
+
+        message = self.pubsub.get_message(timeout=0.1)
+        assert json.loads(message["data"]) == [
+            [self.user.id, data]
+            for data in json.loads(
+                json.dumps(NotificationSerializer(created, many=True).data)
+            )
+        ]
+        assert self.pubsub.get_message(timeout=0.1) is None
+
+    def test_disabled_stream_publishes_nothing(
+        self, settings, django_capture_on_commit_callbacks
+    ):
+        settings.NOTIFICATIONS_STREAM = False
+        with django_capture_on_commit_callbacks() as callbacks:
+            self._create(2)
+
+        assert callbacks == []
+        assert self.pubsub.get_message(timeout=0.1) is None
@@ -0,0 +1,135 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from events.models import Booking, Event
+from users.authentication import TokenUserAuthentication
+from users.models import TokenUser, User
+
+pytestmark = pytest.mark.django_db
+
+
+def _user_queries(queries):
+    return [q["sql"] for q in queries if 'FROM "users_user"' in q["sql"]]
+
+
+class TestTokenUserAuthentication:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="jwt", password="jwt")
+        self.organizer = User.objects.create_user(username="org", password="org")
+        self.event = Event.objects.create(
+            title="Без запроса пользователя",
+            description="Описание",
+            start_time=timezone.now() + timezone.timedelta(days=1),
+            location="Москва",
+            organizer=self.organizer,
+        )
+
+    def _client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        return client
+
+    def test_book_without_user_query(self):
+        client = self._client(self.user)
+        # Первый запрос заполняет снимок пользователя.
+        client.get("/api/events/")
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(f"/api/events/{self.event.id}/book/")
+        assert response.status_code == status.HTTP_201_CREATED
+        assert _user_queries(queries.captured_queries) == []
+        assert Booking.objects.filter(user=self.user, event=self.event).exists()
+
+    def test_fields_from_snapshot(self):
+        user = TokenUser.from_token(str(self.user.id))
+        assert user.is_authenticated
+        assert user == self.user
+        with CaptureQueriesContext(connection) as queries:
+            assert user.username == "jwt"
+        assert len(_user_queries(queries.captured_queries)) == 1
+
+        # Снимок уже в кэше; пароля в нём нет.
+        other = TokenUser.from_token(self.user.id)
+        with CaptureQueriesContext(connection) as queries:
+            assert other.username == "jwt"
+            assert not other.is_staff
+        assert _user_queries(queries.captured_queries) == []
+        assert other.check_password("jwt")
+
+    def test_snapshot_invalidated_on_save(self):
+        assert not TokenUser.from_token(self.user.id).is_staff
+        self.user.is_staff = True
+        self.user.save()
+        assert TokenUser.from_token(self.user.id).is_staff
+
+        response = self._client(self.user).get("/api/events/cache_stats/")
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_token_user_save_invalidates(self):
+        # Прокси-модель шлёт сигналы со своим sender.
+        updated_at = self.event.updated_at
+        user = TokenUser.from_token(self.organizer.id)
+        user.username = "org2"
+        user.is_staff = True
+        user.save(update_fields=["username", "is_staff"])
+        assert TokenUser.from_token(self.organizer.id).is_staff
+        self.event.refresh_from_db()
+        assert self.event.updated_at > updated_at
+
+    def test_organizer_permission_by_id(self):
+        url = f"/api/events/{self.event.id}/"
+        response = self._client(self.user).patch(url, {"title": "Чужое"})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        response = self._client(self.organizer).patch(url, {"title": "Своё"})
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_inactive_or_deleted_user_is_rejected(self):
+        client = self._client(self.user)
+        assert client.get("/api/events/my_upcoming_events/").status_code == 200
+
+        self.user.is_active = False
+        self.user.save()
+        response = client.post(f"/api/events/{self.event.id}/book/")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.data["code"] == "user_inactive"
+
+        authentication = TokenUserAuthentication()
+        token = AccessToken.for_user(self.user)
+        with pytest.raises(AuthenticationFailed):
+            async_to_sync(authentication.aget_user)(token)
+
+        self.user.delete()
+        response = client.post(f"/api/events/{self.event.id}/book/")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.data["code"] == "user_not_found"
+        assert not Booking.objects.exists()
+
+    def test_revoked_token_is_rejected(self, monkeypatch):
+        monkeypatch.setattr(api_settings, "CHECK_REVOKE_TOKEN", True)
+        client = self._client(self.user)
+        assert client.get("/api/events/my_upcoming_events/").status_code == 200
+
+        self.user.set_password("new")
+        self.user.save()
+        response = client.get("/api/events/my_upcoming_events/")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert (
+            self._client(self.user).get("/api/events/my_upcoming_events/").status_code
+            == status.HTTP_200_OK
+        )
+
+    def test_invalid_token(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Bearer invalid")
+        response = client.post(f"/api/events/{self.event.id}/book/")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,100 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import cache
+from .models import TokenUser
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """JWT-аутентификация simplejwt с асинхронным вариантом для асинхронных
+    обработчиков чтения: пользователь загружается через async ORM."""
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+        try:
+            user = await self.user_model.objects.aget(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            ) from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
+
+
+class TokenUserAuthentication(JWTAuthentication):
+    """JWT-аутентификация без запроса к БД: пользователь строится из id в
+    токене (TokenUser), активность проверяется по снимку users.cache, из него
+    же загружаются остальные поля, если они нужны."""
+
+    def get_user(self, validated_token):
+        user = self._token_user(validated_token)
+        self._check_snapshot(cache.get(user.pk), validated_token)
+        return user
+
+    async def aget_user(self, validated_token):
+        user = self._token_user(validated_token)
+        self._check_snapshot(await cache.aget(user.pk), validated_token)
+        return user
+
+    def _token_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+        return TokenUser.from_token(user_id)
+
+    def _check_snapshot(self, data, validated_token):
+        """Те же проверки, что у simplejwt, по снимку users.cache: удалённый
+        или деактивированный пользователь теряет доступ сразу после
+        сохранения (в других процессах — через USERS_CACHE_LOCAL_TTL)."""
+        if data is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not data["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if (
+                validated_token.get(api_settings.REVOKE_TOKEN_CLAIM)
+                != data[cache.PASSWORD_HASH]
+            ):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
@@ -0,0 +1,101 @@
+"""Снимок полей пользователя для TokenUser: локальный LRU процесса, затем
+кэш Django (Redis), затем БД.
+
+Сохранение или удаление пользователя удаляет запись из кэша и из LRU
+своего процесса; в остальных процессах локальная копия живёт не дольше
+USERS_CACHE_LOCAL_TTL секунд. Хеш пароля в снимок не попадает: для
+проверки отзыва токенов (CHECK_REVOKE_TOKEN) хранится только его md5."""
+
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from config import db_router
+
+from .models import User
+
+_lock = threading.Lock()
+_local = OrderedDict()
+# Чтение из БД, начатое до инвалидации, не должно положить в кэш старое.
+_epoch = 0
+
+FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields if field.name != "password"
+)
+# Ключ снимка с md5 хеша пароля, как в REVOKE_TOKEN_CLAIM токена.
+PASSWORD_HASH = "password_md5"
+
+
+def _key(user_id):
+    return f"users:snapshot:{user_id}"
+
+
+def _get_local(user_id):
+    with _lock:
+        entry = _local.get(user_id)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            del _local[user_id]
+            return None
+        _local.move_to_end(user_id)
+        return data
+
+
+def _set_local(user_id, data):
+    with _lock:
+        _local[user_id] = (time.monotonic() + settings.USERS_CACHE_LOCAL_TTL, data)
+        _local.move_to_end(user_id)
+        while len(_local) > settings.USERS_CACHE_LOCAL_SIZE:
+            _local.popitem(last=False)
+
+
+def get(user_id):
+    """Поля пользователя без пароля и PASSWORD_HASH или None, если
+    пользователя нет."""
+    data = _get_local(user_id)
+    if data is not None:
+        return data
+    epoch = _epoch
+    data = cache.get(_key(user_id))
+    if data is None:
+        with db_router.primary():
+            data = User.objects.filter(pk=user_id).values(*FIELDS, "password").first()
+        if data is None:
+            return None
+        data[PASSWORD_HASH] = get_md5_hash_password(data.pop("password"))
+        if epoch == _epoch:
+            cache.set(_key(user_id), data, settings.USERS_CACHE_TTL)
+    if epoch == _epoch:
+        _set_local(user_id, data)
+    return data
+
+
+async def aget(user_id):
+    """get для асинхронного кода: локальная копия без перехода в поток."""
+    data = _get_local(user_id)
+    if data is not None:
+        return data
+    return await sync_to_async(get)(user_id)
+
+
+def _evict(user_id):
+    global _epoch
+    with _lock:
+        _epoch += 1
+        _local.pop(user_id, None)
+    cache.delete(_key(user_id))
+
+
+def invalidate(user_id):
+    """Сбрасывает снимок сразу и ещё раз после коммита, когда изменение
+    станет видно другим соединениям."""
+    _evict(user_id)
+    transaction.on_commit(lambda: _evict(user_id))
@@ -3,3 +3,29 @@ from django.contrib.auth.models import AbstractUser
 
 class User(AbstractUser):
     pass
+
+
+class TokenUser(User):
+    """Пользователь из JWT без запроса к БД: известен только id, остальные
+    поля при первом обращении берутся из снимка users.cache."""
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_token(cls, user_id):
+        return cls.from_db(None, ["id"], [cls._meta.pk.to_python(user_id)])
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        from . import cache
+
+        data = cache.get(self.pk) if fields else None
+        if data is None:
+            return super().refresh_from_db(using, fields, from_queryset)
+        deferred = self.get_deferred_fields()
+        for name, value in data.items():
+            if name in deferred:
+                setattr(self, name, value)
+        missing = [name for name in fields if name not in data]
+        if missing:
+            super().refresh_from_db(using, missing, from_queryset)